@@ -1,5 +1,5 @@
 # LangChain and LangGraph imports
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, SystemMessage
 from langchain.chat_models import init_chat_model
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
@@ -13,15 +13,24 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 
 # ENV = load_env_config()
 from saop_core.agent_config import load_config
+from saop_core.llm.prompt import sorted_by_name, stable_prefix
+from saop_core.llm.ratelimit import limiter_for
+from saop_core.llm.usage import record_usage, usage_tokens
 
 import pathlib
+from typing import Optional
+
+import httpx
 
 # 2) Load config for THIS template folder (where agent.yaml lives)
 TEMPLATE_DIR = pathlib.Path(__file__).resolve().parent
 CFG = load_config(TEMPLATE_DIR)
 
-# 3) Pull system prompt from YAML (legal agent.yaml)
-SYSTEM_PROMPT = (CFG.raw_yaml.get("agent") or {}).get("prompt_template", "")
+# 3) Pull system prompt from YAML (legal agent.yaml), normalized once so the
+#    prefix sent to the provider is byte-identical (prompt-cache friendly)
+SYSTEM_PROMPT = stable_prefix(
+    (CFG.raw_yaml.get("agent") or {}).get("prompt_template", "")
+)
 
 # 4) Tool allow-list from YAML
 DECLARED_TOOLS = {
@@ -29,12 +38,19 @@ DECLARED_TOOLS = {
 }
 
 
-async def build_tool_graph(_: dict | None = None):
+async def build_tool_graph(
+    _: dict | None = None, http_client: Optional[httpx.AsyncClient] = None
+):
     """
     Build and return a compiled LangGraph for the *legal* agent.
     - Uses centralized CFG for model + MCP settings
+    - Reuses `http_client` (e.g. LLMClient.http_client) for model calls when given,
+      so the graph and direct LLMClient calls share one connection pool
+    - Routes every model call through the per-model rate limiter shared with LLMClient
     - Filters discovered tools to the allow-list declared in agent.yaml
     - Injects the system prompt as the first message once per run
+    - Binds tools in name order so tool schemas + system prompt form a stable,
+      provider-cacheable prefix
     """
     # Guardrails: ensure model creds exist
     if not CFG.model.name or not CFG.model.api_key:
@@ -46,6 +62,7 @@ async def build_tool_graph(_: dict | None = None):
         openai_api_key=CFG.model.api_key,
         model_provider=CFG.model.provider,
         base_url=CFG.model.base_url or None,
+        **({"http_async_client": http_client} if http_client is not None else {}),
     )
 
     # --- Discover MCP tools (if configured) ---
@@ -56,19 +73,25 @@ async def build_tool_graph(_: dict | None = None):
         client = MultiServerMCPClient(client_config)
         discovered = await client.get_tools()
         # 5) Filter to YAML-declared tools only (safety rail)
-        tools = [t for t in discovered if t.name in DECLARED_TOOLS]
+        tools = sorted_by_name([t for t in discovered if t.name in DECLARED_TOOLS])
 
     model_with_tools = model.bind_tools(tools)
+    limiter = limiter_for(CFG.model.name, CFG.ratelimit)
     tool_node = ToolNode(tools) if tools else None
+    system_message = SystemMessage(content=SYSTEM_PROMPT)
 
     # Inject the system prompt ONCE at the start of the conversation
     async def call_model(state: MessagesState) -> dict[str, list[BaseMessage]]:
         messages = state["messages"]
-        if not messages or (getattr(messages[0], "role", None) != "system"):
-            from langchain_core.messages import SystemMessage
-
-            messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
-        response = await model_with_tools.ainvoke(messages)
+        if not messages or getattr(messages[0], "type", None) != "system":
+            messages = [system_message] + messages
+        # ~4 chars/token until the real usage_metadata is charged
+        estimate = sum(len(str(getattr(m, "content", ""))) for m in messages) // 4
+        async with limiter.slot(estimate) as permit:
+            response = await model_with_tools.ainvoke(messages)
+            usage = getattr(response, "usage_metadata", None)
+            permit.charge(usage_tokens(usage))
+        record_usage(CFG.model.name, usage)
         return {"messages": [response]}
 
     # --- Graph wiring (same as before) ---
@@ -0,0 +1,67 @@
+# benchmarks/bench_bm25.py
+"""
+BM25 index (search_prior_summaries) at scale: build, merge, reload, query.
+
+    cd saop && python -m benchmarks.bench_bm25 [--docs 1000000] [--queries 200]
+
+Synthetic summaries: Zipf-distributed words from a 50k vocabulary, 60 words
+each. Reports add throughput, merge and startup time, and query latency
+percentiles.
+"""
+
+from __future__ import annotations
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from saop_core.mcp.search_index import BM25Index
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=1_000_000)
+    ap.add_argument("--words", type=int, default=60)
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(7)
+    vocab = np.array([f"term{i}" for i in range(50_000)])
+    folder = tempfile.mkdtemp(prefix="bm25-")
+    try:
+        ix = BM25Index(folder, compact_every=args.docs + 1)
+        t0 = time.perf_counter()
+        batch = 10_000
+        for start in range(0, args.docs, batch):
+            n = min(batch, args.docs - start)
+            ranks = np.minimum(rng.zipf(1.3, size=(n, args.words)), len(vocab)) - 1
+            for i, row in enumerate(vocab[ranks]):
+                doc = start + i
+                ix.add(f"s{doc}", f"c{doc}", " ".join(row), title=f"Contract {doc}")
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ix.compact()
+        merge = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ix = BM25Index(folder)
+        load = time.perf_counter() - t0
+
+        lat = []
+        for _ in range(args.queries):
+            q = " ".join(vocab[rng.integers(0, 2_000, size=3)])
+            t0 = time.perf_counter()
+            ix.search(q, 5)
+            lat.append((time.perf_counter() - t0) * 1000)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(
+            f"docs={len(ix)} add={args.docs / build:,.0f}/s merge={merge:.1f}s load={load:.2f}s"
+        )
+        print(f"query ms: p50={p50:.2f} p95={p95:.2f} p99={p99:.2f}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_facets.py
+"""
+Facet index (query_gdpr_tags): build, reload, filtered queries with counts.
+
+    cd saop && python -m benchmarks.bench_facets [--docs 1000000] [--queries 50]
+
+Documents are synthetic gdpr_tags drawn from small vocabularies (a few
+thousand processor names, some free-text transfer clauses). Reports add
+throughput, reload time, and per-query latency for a few compliance
+filters with a page of 20 and facet counts, against scanning every
+gdpr_json in memory (what answering them took before).
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from saop_core.mcp.facet_index import FacetIndex
+
+DATA = ["email", "name", "address", "phone", "ip address", "health data",
+        "payment card", "location", "biometric", "employee records"]  # fmt: skip
+BASES = ["contract", "consent", "legitimate interests", "legal obligation"]
+TRANSFERS = ["US", "UK", "India", "transfers to the US under SCCs",
+             "EU only", "Switzerland", "transfers to India (BCRs)"]  # fmt: skip
+SECURITY = [f"measure {i}" for i in range(40)]
+
+
+def _tags(rng: random.Random, vendors: List[str]) -> Dict[str, Any]:
+    return {
+        "personal_data_types": rng.sample(DATA, rng.randint(1, 4)),
+        "lawful_basis_candidates": rng.sample(BASES, rng.randint(0, 2)),
+        "processors_or_subprocessors": rng.sample(vendors, rng.randint(0, 3)),
+        "controller": [rng.choice(vendors)],
+        "dpa_present": rng.choice([True, False, None]),
+        "cross_border_transfers": rng.sample(TRANSFERS, rng.randint(0, 2)),
+        "security_measures": rng.sample(SECURITY, rng.randint(0, 3)),
+        "data_retention": None,
+    }
+
+
+QUERIES = {
+    "US transfer, no DPA": {
+        "and": [
+            {"field": "cross_border_transfers", "term": "us"},
+            {"not": {"field": "dpa_present", "value": True}},
+        ]
+    },
+    "health or biometric, consent": {
+        "and": [
+            {"field": "personal_data_types", "any": ["health data", "biometric"]},
+            {"field": "lawful_basis_candidates", "value": "consent"},
+        ]
+    },
+    "one vendor": {"field": "processors_or_subprocessors", "value": "vendor 17"},
+}
+
+
+def _scan(docs: List[Dict[str, Any]], name: str) -> int:
+    match: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+        "US transfer, no DPA": lambda t: t["dpa_present"] is not True
+        and any("us" in x.lower().split() for x in t["cross_border_transfers"]),
+        "health or biometric, consent": lambda t: "consent"
+        in t["lawful_basis_candidates"]
+        and bool({"health data", "biometric"} & set(t["personal_data_types"])),
+        "one vendor": lambda t: "vendor 17" in t["processors_or_subprocessors"],
+    }
+    return sum(1 for t in docs if match[name](t))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = random.Random(11)
+    vendors = [f"vendor {i}" for i in range(5000)]
+    docs = [_tags(rng, vendors) for _ in range(args.docs)]
+
+    folder = tempfile.mkdtemp(prefix="facets-")
+    try:
+        ix = FacetIndex(folder)
+        t0 = time.perf_counter()
+        for i, tags in enumerate(docs):
+            ix.add(f"s{i}", f"c{i}", tags, i)
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ix = FacetIndex(folder)
+        load = time.perf_counter() - t0
+        print(f"docs={args.docs:,} add={args.docs / build:,.0f}/s reload={load:.1f}s")
+
+        facets = ["personal_data_types", "dpa_present"]
+        for name, f in QUERIES.items():
+            ix.query(f, facet_keys=facets)  # first use builds the bitmaps
+            lat = []
+            for _ in range(args.queries):
+                t0 = time.perf_counter()
+                res = ix.query(f, limit=20, facet_keys=facets)
+                lat.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            assert _scan(docs, name) == res["total"]
+            scan = (time.perf_counter() - t0) * 1000
+            p50, p99 = np.percentile(lat, [50, 99])
+            print(
+                f"{name:<30} total={res['total']:>8,} "
+                f"ms p50={p50:.1f} p99={p99:.1f}  scan={scan:,.0f}ms"
+            )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
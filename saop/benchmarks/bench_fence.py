@@ -0,0 +1,94 @@
+# benchmarks/bench_fence.py
+"""
+Trailing fenced-JSON extraction on large synthetic model outputs.
+
+    cd saop && python -m benchmarks.bench_fence [--size-kb 512] [--repeat 5]
+
+Compares the old rfind/slice/json.loads loop with saop_core.llm.fence
+(whole text, and fed in small streamed deltas).
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+from saop_core.llm.fence import FenceScanner, extract_json_block
+
+TAGS = {
+    "personal_data_types": ["email address", "IP address"],
+    "dpa_present": True,
+    "cross_border_transfers": ["Standard Contractual Clauses"],
+}
+
+
+def legacy_extract(md: str) -> Optional[Dict[str, Any]]:
+    fence = "```"
+    i = md.rfind(fence)
+    while i != -1:
+        block = md[i + len(fence) :].strip()
+        if block.startswith("json"):
+            block = block[len("json") :].lstrip()
+        try:
+            return json.loads(block)
+        except Exception:
+            md = md[:i]
+            i = md.rfind(fence)
+    return None
+
+
+def streamed(md: str, delta: int = 24) -> Optional[Any]:
+    scanner = FenceScanner()
+    for i in range(0, len(md), delta):
+        scanner.feed(md[i : i + delta])
+    return scanner.close()
+
+
+def outputs(size: int, seed: int = 7) -> Dict[str, str]:
+    rnd = random.Random(seed)
+    words = "the supplier shall process personal data under clause term".split()
+    prose = " ".join(rnd.choice(words) for _ in range(size // 6))[:size]
+    block = "```json\n" + json.dumps(TAGS) + "\n```"
+    snippet = "```python\nprint('x')\n```\n"
+    return {
+        "prose+block": f"- {prose}\n\n{block}",
+        # many fenced non-JSON blocks after the real one: the old loop re-parses
+        # ever longer suffixes
+        "block+many_fences": block
+        + "\n"
+        + "".join(f"{prose[:200]}\n{snippet}" for _ in range(size // 230)),
+        "unterminated": f"- {prose}\n\n```json\n" + json.dumps(TAGS),
+    }
+
+
+def _time(fn: Callable[[str], Any], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-kb", type=int, default=512)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    impls = {
+        "legacy": legacy_extract,
+        "scanner": extract_json_block,
+        "scanner_stream": streamed,
+    }
+    print(f"{'case':<20}{'impl':<16}{'ms':>10}  found")
+    for case, text in outputs(args.size_kb * 1024).items():
+        for name, fn in impls.items():
+            ms = _time(fn, text, args.repeat) * 1000
+            print(f"{case:<20}{name:<16}{ms:>10.2f}  {fn(text) == TAGS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_lsh.py
+"""
+MinHash LSH (find_near_duplicates): signature cost, index build, query.
+
+    cd saop && python -m benchmarks.bench_lsh [--contracts 200000] [--queries 500]
+
+Stored signatures are random except for `--templates` template contracts
+(real signatures of synthetic ~3K-word texts); queries are edited copies of
+a template (`--edits` words replaced at random, like party names and dates)
+and must find it. Reports signature time per contract, append throughput,
+query latency and recall at the 0.8 threshold (over the queries whose
+estimated similarity to their template is >= 0.8).
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import string
+import tempfile
+import shutil
+import time
+
+import numpy as np
+
+from saop_core.minhash import signature, similarity
+from saop_core.mcp.lsh_index import LSHIndex
+
+
+def _text(rng: random.Random, vocab: list[str], words: int) -> list[str]:
+    return [rng.choice(vocab) for _ in range(words)]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--contracts", type=int, default=200_000)
+    ap.add_argument("--templates", type=int, default=50)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--edits", type=int, default=30, help="words replaced per query")
+    args = ap.parse_args()
+
+    rng = random.Random(5)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=7)) for _ in range(20_000)]
+    templates = [_text(rng, vocab, 3000) for _ in range(args.templates)]
+    t0 = time.perf_counter()
+    sigs = [signature(" ".join(t)) for t in templates]
+    print(
+        f"signature: {(time.perf_counter() - t0) / len(sigs) * 1000:.1f} ms / 3K words"
+    )
+
+    folder = tempfile.mkdtemp(prefix="lsh-")
+    try:
+        ix = LSHIndex(folder)
+        nprng = np.random.default_rng(5)
+        t0 = time.perf_counter()
+        for i in range(args.contracts):
+            if i < args.templates:
+                ix.add(f"s{i}", f"t{i}", sigs[i])
+            else:
+                ix.add(f"s{i}", f"c{i}", nprng.integers(0, 1 << 32, 128).tolist())
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ix = LSHIndex(folder)
+        load = time.perf_counter() - t0
+
+        lat, found, sims = [], [], []
+        for _ in range(args.queries):
+            t = rng.randrange(args.templates)
+            words = list(templates[t])
+            for j in rng.sample(range(len(words)), args.edits):
+                words[j] = rng.choice(vocab)
+            q = signature(" ".join(words))
+            sims.append(similarity(q, sigs[t]))
+            t0 = time.perf_counter()
+            hits = ix.near(q, 0.8, 1)
+            lat.append((time.perf_counter() - t0) * 1000)
+            if sims[-1] >= 0.8:
+                found.append(bool(hits) and hits[0]["contract_id"] == f"t{t}")
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(
+            f"contracts={args.contracts:,} append={args.contracts / build:,.0f}/s "
+            f"load={load:.2f}s"
+        )
+        print(f"query ms: p50={p50:.3f} p95={p95:.3f} p99={p99:.3f}")
+        print(
+            f"edited copies: mean similarity={np.mean(sims):.3f} "
+            f"recall={np.mean(found):.3f}"
+        )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
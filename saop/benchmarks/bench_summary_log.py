@@ -0,0 +1,116 @@
+# benchmarks/bench_summary_log.py
+"""
+Summary log (store_summary persistence): append throughput and latency.
+
+    cd saop && python -m benchmarks.bench_summary_log [--records 20000] [--concurrency 64]
+
+`--concurrency` asyncio tasks store ~3KB summaries through SummaryLog.put
+(durable: fsync-ed group commit) and, for comparison, the previous layout:
+one pretty-printed JSON file per summary written inline (no fsync, blocking
+the event loop). Reports records/s, append latency percentiles, records per
+fsync and lookup-by-id latency.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+from saop_core.mcp.summary_log import LOG_BATCH, SummaryLog
+
+
+def _record(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"legal_{i}",
+        "contract_id": f"contract-{i % 5000}",
+        "hash": f"{i:064x}",
+        "summary_md": "The processor engages sub-processors under a DPA. " * 60,
+        "gdpr_json": {"dpa_present": True, "personal_data_types": ["email", "name"]},
+        "created_at": int(time.time()),
+    }
+
+
+async def _drive(
+    n: int, concurrency: int, put: Callable[[int], Awaitable[None]]
+) -> List[float]:
+    lat: List[float] = []
+    counter = iter(range(n))
+
+    async def worker() -> None:
+        for i in counter:
+            t0 = time.perf_counter()
+            await put(i)
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return lat
+
+
+def _report(name: str, n: int, elapsed: float, lat: List[float]) -> None:
+    p50, p99 = np.percentile(lat, [50, 99])
+    print(
+        f"{name:<18} {n / elapsed:>9,.0f} rec/s  "
+        f"append ms p50={p50:.2f} p99={p99:.2f}"
+    )
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=20_000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    args = ap.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="sumlog-")
+    try:
+        log = SummaryLog(os.path.join(folder, "log"))
+
+        async def put_log(i: int) -> None:
+            r = _record(i)
+            await log.put([f"id:{r['id']}", f"contract:{r['contract_id']}"], r)
+
+        t0 = time.perf_counter()
+        lat = await _drive(args.records, args.concurrency, put_log)
+        _report("log (fsync)", args.records, time.perf_counter() - t0, lat)
+        commits = next(
+            s.value for s in LOG_BATCH.collect()[0].samples if s.name.endswith("_count")
+        )
+        print(f"{'':<18} {args.records / max(commits, 1):.1f} records per fsync")
+
+        reads = []
+        for i in np.random.default_rng(1).integers(0, args.records, 2000).tolist():
+            t0 = time.perf_counter()
+            assert log.get(f"id:legal_{i}") is not None
+            reads.append((time.perf_counter() - t0) * 1000)
+        p50, p99 = np.percentile(reads, [50, 99])
+        print(f"{'get by id':<18} ms p50={p50:.3f} p99={p99:.3f}")
+        log.close()
+        t0 = time.perf_counter()
+        SummaryLog(os.path.join(folder, "log")).close()
+        print(f"{'reopen':<18} {time.perf_counter() - t0:.2f}s")
+
+        files = os.path.join(folder, "files")
+        os.makedirs(files)
+
+        async def put_file(i: int) -> None:
+            r = _record(i)
+            with open(
+                os.path.join(files, f"{r['id']}.json"), "w", encoding="utf-8"
+            ) as f:
+                json.dump(r, f, ensure_ascii=False, indent=2)
+
+        t0 = time.perf_counter()
+        lat = await _drive(args.records, args.concurrency, put_file)
+        _report("file per summary", args.records, time.perf_counter() - t0, lat)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
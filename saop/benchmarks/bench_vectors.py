@@ -0,0 +1,89 @@
+# benchmarks/bench_vectors.py
+"""
+Vector index (semantic search_prior_summaries): append, IVF training, query.
+
+    cd saop && python -m benchmarks.bench_vectors [--rows 1000000] [--nlist 1024]
+
+Rows are synthetic unit vectors drawn around 4096 random topics (embedding a
+million texts would time the embedder, which is reported separately on a
+sample). Reports append throughput, training time, flat and IVF query
+latency, and IVF recall@10 against the exact result.
+"""
+
+from __future__ import annotations
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from saop_core.mcp.embedding import HashingEmbedder
+from saop_core.mcp.vector_index import VectorIndex
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--nlist", type=int, default=1024)
+    ap.add_argument("--nprobe", type=int, default=16)
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    emb = HashingEmbedder(args.dim)
+    text = "The processor shall engage sub-processors only with prior consent. " * 40
+    t0 = time.perf_counter()
+    emb.embed([text] * 200)
+    print(f"embed: {(time.perf_counter() - t0) / 200 * 1000:.2f} ms per 2.7KB text")
+
+    rng = np.random.default_rng(7)
+    topics = rng.normal(size=(4096, args.dim)).astype(np.float32)
+
+    def sample(n: int) -> np.ndarray:
+        v = topics[rng.integers(0, len(topics), n)]
+        v = v + rng.normal(scale=0.6, size=v.shape).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    folder = tempfile.mkdtemp(prefix="vec-")
+    try:
+        ix = VectorIndex(folder, emb, nlist=0)
+        t0 = time.perf_counter()
+        batch = 4
+        for start in range(0, args.rows, batch):
+            vecs = sample(batch)
+            contract = f"c{start // batch}"
+            meta = (f"s{start}", contract, "summary", "", "", "", "")
+            ix.add_embedded(contract, vecs, [meta] * batch)
+        build = time.perf_counter() - t0
+
+        ix = VectorIndex(folder, emb, nlist=args.nlist, nprobe=args.nprobe)
+        t0 = time.perf_counter()
+        if ix._training is not None:
+            ix._training.join()
+        train = time.perf_counter() - t0
+
+        queries = sample(args.queries)
+        flat_ms, ivf_ms, recall = [], [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            exact_rows, exact_scores = ix._search_flat(q, 10)
+            flat_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            rows, _ = ix._search_ivf(q, 10)
+            ivf_ms.append((time.perf_counter() - t0) * 1000)
+            recall.append(len(set(rows.tolist()) & set(exact_rows.tolist())) / 10)
+        print(
+            f"rows={args.rows:,} append={args.rows / build:,.0f} rows/s "
+            f"ivf train={train:.1f}s (nlist={args.nlist})"
+        )
+        for name, lat in (("flat", flat_ms), (f"ivf nprobe={args.nprobe}", ivf_ms)):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            print(f"{name} query ms: p50={p50:.2f} p95={p95:.2f} p99={p99:.2f}")
+        print(f"ivf recall@10={np.mean(recall):.3f}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -103,11 +103,25 @@ from __future__ import annotations
 import os
 import pathlib
 import yaml  # type: ignore[import-untyped]
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 
+@dataclass
+class ModelEndpoint:
+    name: str
+    base_url: str
+    api_key: str
+
+
+@dataclass
+class RouterConfig:
+    ewma_alpha: float = 0.3  # weight of the newest latency/error sample
+    eject_after: int = 3  # consecutive failures before an endpoint is ejected
+    cooldown_seconds: float = 30.0  # ejection time before it is probed again
+
+
 @dataclass
 class ModelConfig:
     provider: str
@@ -116,6 +130,77 @@ class ModelConfig:
     max_tokens: int
     base_url: str
     api_key: str
+    context_window: int = 128_000  # input + output tokens the model accepts
+    # routing pool; defaults to the single base_url/api_key endpoint above
+    endpoints: List[ModelEndpoint] = field(default_factory=list)
+    router: RouterConfig = field(default_factory=RouterConfig)
+
+
+@dataclass
+class HTTPPoolConfig:
+    http2: bool = True  # only honoured when the `h2` package is importable
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # seconds an idle connection stays pooled
+    timeout: float = 60.0
+
+
+@dataclass
+class CacheConfig:
+    enabled: bool = True
+    directory: str = ""  # empty -> memory tier only
+    ttl_seconds: float = 86400.0
+    max_entries: int = 1024  # memory tier
+    max_memory_bytes: int = 64 * 1024 * 1024
+    max_disk_bytes: int = 1024 * 1024 * 1024
+
+
+@dataclass
+class RateLimitConfig:
+    rpm: int = 0  # requests per minute per model; 0 = unlimited
+    tpm: int = 0  # tokens per minute per model; 0 = unlimited
+    max_concurrency: int = 16  # AIMD ceiling (and starting point)
+    min_concurrency: int = 1  # AIMD floor after repeated 429s
+
+
+@dataclass
+class CallPolicyConfig:
+    max_attempts: int = 3  # 1 = no retries
+    backoff_base: float = 0.5  # seconds; full-jitter exponential
+    backoff_max: float = 8.0
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95  # hedge once an attempt is slower than this
+    hedge_max_ratio: float = 0.1  # at most ~10% extra requests
+    hedge_min_samples: int = 20  # latencies needed before hedging kicks in
+
+
+@dataclass
+class PipelineConfig:
+    # per-stage timeouts in seconds; 0 = no stage timeout
+    fetch_timeout: float = 30.0
+    context_timeout: float = 10.0  # prior-context search; on timeout run without it
+    model_timeout: float = 0.0
+    # chunked (map-reduce) mode for contracts that do not fit the window
+    chunk_tokens: int = 12_000  # per-chunk contract budget
+    chunk_concurrency: int = 4  # chunk summaries in flight at once
+    # focused mode: GDPR keyword scan -> only matched passages + outline
+    focus_tokens: int = 6_000  # budget for the matched passages
+    focus_radius: int = 400  # chars of context kept around each match
+    # near-duplicate contracts (MinHash similarity to a stored one; 0 = off):
+    # >= reuse returns its summary with a diff note, >= delta sends the model
+    # that summary plus only the sections that differ
+    near_dup_reuse: float = 0.95
+    near_dup_delta: float = 0.8
+
+
+@dataclass
+class WriteBehindConfig:
+    journal_dir: str = ""  # empty -> memory only (lost on restart)
+    workers: int = 2
+    max_attempts: int = 8  # then the job moves to <journal_dir>/dead/
+    backoff_base: float = 1.0  # seconds; full-jitter exponential
+    backoff_max: float = 300.0
+    drain_timeout: float = 10.0  # seconds to flush the queue on shutdown
 
 
 @dataclass
@@ -144,6 +229,12 @@ class AppConfig:
     service: ServiceConfig
     mcp: MCPConfig
     obs: ObservabilityConfig
+    http: HTTPPoolConfig
+    cache: CacheConfig
+    ratelimit: RateLimitConfig
+    policy: CallPolicyConfig
+    pipeline: PipelineConfig
+    writebehind: WriteBehindConfig
     raw_yaml: Dict[
         str, Any
     ]  # the loaded agent.yaml (useful for prompt_template & tools)
@@ -156,6 +247,46 @@ def _load_yaml(yaml_path: pathlib.Path) -> Dict[str, Any]:
         return yaml.safe_load(f) or {}
 
 
+def _as_bool(value: Any) -> bool:
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _model_endpoints(
+    yaml_model: Dict[str, Any], base_url: str, api_key: str
+) -> List[ModelEndpoint]:
+    """
+    Endpoint pool from MODEL_ENDPOINTS ("name=url,name=url") or agent.model.endpoints
+    ([{name, base_url, api_key_env}]). A key is read from MODEL_API_KEY_<NAME>
+    (or api_key_env) and falls back to MODEL_API_KEY.
+    """
+    specs: List[Dict[str, Any]] = []
+    env_spec = os.getenv("MODEL_ENDPOINTS", "").strip()
+    if env_spec:
+        for item in env_spec.split(","):
+            name, sep, url = item.strip().partition("=")
+            if sep and url:
+                specs.append({"name": name.strip(), "base_url": url.strip()})
+    else:
+        specs = list(yaml_model.get("endpoints") or [])
+
+    endpoints: List[ModelEndpoint] = []
+    for spec in specs:
+        name = str(spec.get("name") or f"endpoint-{len(endpoints)}")
+        key_env = spec.get("api_key_env") or "MODEL_API_KEY_" + "".join(
+            c if c.isalnum() else "_" for c in name.upper()
+        )
+        endpoints.append(
+            ModelEndpoint(
+                name=name,
+                base_url=str(spec.get("base_url") or base_url),
+                api_key=os.getenv(key_env) or api_key,
+            )
+        )
+    return endpoints or [
+        ModelEndpoint(name="default", base_url=base_url, api_key=api_key)
+    ]
+
+
 def load_config(template_dir: pathlib.Path) -> AppConfig:
     """
     Load .env (in template_dir), then agent.yaml (in template_dir), then build a merged config.
@@ -176,6 +307,7 @@ def load_config(template_dir: pathlib.Path) -> AppConfig:
         or "https://api.openai.com/v1"
     )
     api_key = os.getenv("MODEL_API_KEY") or os.getenv("OPENAI_API_KEY") or ""
+    yaml_router = yaml_model.get("router") or {}
 
     model = ModelConfig(
         provider=os.getenv("MODEL_PROVIDER", yaml_model.get("provider", "openai")),
@@ -188,6 +320,24 @@ def load_config(template_dir: pathlib.Path) -> AppConfig:
         ),
         base_url=base_url,
         api_key=api_key,
+        context_window=int(
+            os.getenv("MODEL_CONTEXT_WINDOW", yaml_model.get("context_window", 128_000))
+        ),
+        endpoints=_model_endpoints(yaml_model, base_url, api_key),
+        router=RouterConfig(
+            ewma_alpha=float(
+                os.getenv("MODEL_ROUTER_EWMA_ALPHA", yaml_router.get("ewma_alpha", 0.3))
+            ),
+            eject_after=int(
+                os.getenv("MODEL_ROUTER_EJECT_AFTER", yaml_router.get("eject_after", 3))
+            ),
+            cooldown_seconds=float(
+                os.getenv(
+                    "MODEL_ROUTER_COOLDOWN_SECONDS",
+                    yaml_router.get("cooldown_seconds", 30.0),
+                )
+            ),
+        ),
     )
 
     service = ServiceConfig(
@@ -213,4 +363,158 @@ def load_config(template_dir: pathlib.Path) -> AppConfig:
         )
     )
 
-    return AppConfig(model=model, service=service, mcp=mcp, obs=obs, raw_yaml=raw)
+    yaml_http = yaml_agent.get("http") or {}
+    http = HTTPPoolConfig(
+        http2=_as_bool(os.getenv("HTTP_POOL_HTTP2", yaml_http.get("http2", True))),
+        max_connections=int(
+            os.getenv(
+                "HTTP_POOL_MAX_CONNECTIONS", yaml_http.get("max_connections", 100)
+            )
+        ),
+        max_keepalive_connections=int(
+            os.getenv(
+                "HTTP_POOL_MAX_KEEPALIVE",
+                yaml_http.get("max_keepalive_connections", 20),
+            )
+        ),
+        keepalive_expiry=float(
+            os.getenv(
+                "HTTP_POOL_KEEPALIVE_EXPIRY", yaml_http.get("keepalive_expiry", 30.0)
+            )
+        ),
+        timeout=float(
+            os.getenv("HTTP_TIMEOUT_SECONDS", yaml_http.get("timeout", 60.0))
+        ),
+    )
+
+    yaml_cache = yaml_agent.get("cache") or {}
+    cache = CacheConfig(
+        enabled=_as_bool(
+            os.getenv("LLM_CACHE_ENABLED", yaml_cache.get("enabled", True))
+        ),
+        directory=os.getenv("LLM_CACHE_DIR", yaml_cache.get("directory", "")),
+        ttl_seconds=float(
+            os.getenv("LLM_CACHE_TTL_SECONDS", yaml_cache.get("ttl_seconds", 86400))
+        ),
+        max_entries=int(
+            os.getenv("LLM_CACHE_MAX_ENTRIES", yaml_cache.get("max_entries", 1024))
+        ),
+        max_memory_bytes=int(
+            os.getenv(
+                "LLM_CACHE_MAX_MEMORY_BYTES",
+                yaml_cache.get("max_memory_bytes", 64 * 1024 * 1024),
+            )
+        ),
+        max_disk_bytes=int(
+            os.getenv(
+                "LLM_CACHE_MAX_DISK_BYTES",
+                yaml_cache.get("max_disk_bytes", 1024 * 1024 * 1024),
+            )
+        ),
+    )
+
+    yaml_rl = yaml_model.get("rate_limit") or {}
+    ratelimit = RateLimitConfig(
+        rpm=int(os.getenv("MODEL_RPM", yaml_rl.get("rpm", 0))),
+        tpm=int(os.getenv("MODEL_TPM", yaml_rl.get("tpm", 0))),
+        max_concurrency=int(
+            os.getenv("MODEL_MAX_CONCURRENCY", yaml_rl.get("max_concurrency", 16))
+        ),
+        min_concurrency=int(
+            os.getenv("MODEL_MIN_CONCURRENCY", yaml_rl.get("min_concurrency", 1))
+        ),
+    )
+
+    yaml_policy = yaml_model.get("policy") or {}
+    policy = CallPolicyConfig(
+        max_attempts=int(
+            os.getenv("MODEL_RETRY_ATTEMPTS", yaml_policy.get("max_attempts", 3))
+        ),
+        backoff_base=float(
+            os.getenv("MODEL_RETRY_BACKOFF", yaml_policy.get("backoff_base", 0.5))
+        ),
+        backoff_max=float(
+            os.getenv("MODEL_RETRY_BACKOFF_MAX", yaml_policy.get("backoff_max", 8.0))
+        ),
+        hedge_enabled=_as_bool(
+            os.getenv("MODEL_HEDGE_ENABLED", yaml_policy.get("hedge_enabled", False))
+        ),
+        hedge_percentile=float(
+            os.getenv(
+                "MODEL_HEDGE_PERCENTILE", yaml_policy.get("hedge_percentile", 0.95)
+            )
+        ),
+        hedge_max_ratio=float(
+            os.getenv("MODEL_HEDGE_MAX_RATIO", yaml_policy.get("hedge_max_ratio", 0.1))
+        ),
+        hedge_min_samples=int(
+            os.getenv(
+                "MODEL_HEDGE_MIN_SAMPLES", yaml_policy.get("hedge_min_samples", 20)
+            )
+        ),
+    )
+
+    yaml_pipeline = yaml_agent.get("pipeline") or {}
+    pipeline = PipelineConfig(
+        fetch_timeout=float(
+            os.getenv("STAGE_FETCH_TIMEOUT", yaml_pipeline.get("fetch_timeout", 30.0))
+        ),
+        context_timeout=float(
+            os.getenv(
+                "STAGE_CONTEXT_TIMEOUT", yaml_pipeline.get("context_timeout", 10.0)
+            )
+        ),
+        model_timeout=float(
+            os.getenv("STAGE_MODEL_TIMEOUT", yaml_pipeline.get("model_timeout", 0.0))
+        ),
+        chunk_tokens=int(
+            os.getenv("CHUNK_TOKENS", yaml_pipeline.get("chunk_tokens", 12_000))
+        ),
+        chunk_concurrency=int(
+            os.getenv("CHUNK_CONCURRENCY", yaml_pipeline.get("chunk_concurrency", 4))
+        ),
+        focus_tokens=int(
+            os.getenv("FOCUS_TOKENS", yaml_pipeline.get("focus_tokens", 6_000))
+        ),
+        focus_radius=int(
+            os.getenv("FOCUS_RADIUS", yaml_pipeline.get("focus_radius", 400))
+        ),
+        near_dup_reuse=float(
+            os.getenv("NEAR_DUP_REUSE", yaml_pipeline.get("near_dup_reuse", 0.95))
+        ),
+        near_dup_delta=float(
+            os.getenv("NEAR_DUP_DELTA", yaml_pipeline.get("near_dup_delta", 0.8))
+        ),
+    )
+
+    yaml_wb = yaml_agent.get("writebehind") or {}
+    writebehind = WriteBehindConfig(
+        journal_dir=os.getenv("WRITEBEHIND_DIR", yaml_wb.get("journal_dir", "")),
+        workers=int(os.getenv("WRITEBEHIND_WORKERS", yaml_wb.get("workers", 2))),
+        max_attempts=int(
+            os.getenv("WRITEBEHIND_MAX_ATTEMPTS", yaml_wb.get("max_attempts", 8))
+        ),
+        backoff_base=float(
+            os.getenv("WRITEBEHIND_BACKOFF", yaml_wb.get("backoff_base", 1.0))
+        ),
+        backoff_max=float(
+            os.getenv("WRITEBEHIND_BACKOFF_MAX", yaml_wb.get("backoff_max", 300.0))
+        ),
+        drain_timeout=float(
+            os.getenv("WRITEBEHIND_DRAIN_TIMEOUT", yaml_wb.get("drain_timeout", 10.0))
+        ),
+    )
+
+    return AppConfig(
+        model=model,
+        service=service,
+        mcp=mcp,
+        obs=obs,
+        http=http,
+        cache=cache,
+        ratelimit=ratelimit,
+        policy=policy,
+        pipeline=pipeline,
+        writebehind=writebehind,
+        raw_yaml=raw,
+    )
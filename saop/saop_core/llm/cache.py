@@ -0,0 +1,209 @@
+# saop_core/llm/cache.py
+"""
+Content-addressed cache for LLM responses.
+
+Key = sha256(model, temperature, max_output_tokens, system, user,
+prompt_version), so the same contract run through the same prompt/model hits
+regardless of who sent it.
+
+Two tiers:
+  - memory: bounded LRU (entry count + bytes)
+  - disk:   one JSON file per key under <directory>/<key[:2]>/<key>.json,
+            survives restarts, trimmed oldest-first (by mtime) past a byte budget
+Both tiers honour the same TTL.
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from prometheus_client import Counter, Gauge
+
+from ..agent_config import CacheConfig
+
+CACHE_LOOKUPS = Counter(
+    "saop_llm_cache_lookups_total",
+    "LLM response cache lookups by tier and result",
+    ["tier", "result"],  # tier=memory|disk|none, result=hit|miss|bypass
+)
+CACHE_BYTES = Gauge(
+    "saop_llm_cache_bytes", "Bytes held by the LLM response cache", ["tier"]
+)
+CACHE_BYTES_SERVED = Counter(
+    "saop_llm_cache_bytes_served_total",
+    "Response bytes served from the LLM cache instead of the model",
+)
+
+
+def cache_key(
+    model: str,
+    temperature: float,
+    system: str,
+    user: str,
+    prompt_version: str = "",
+    max_output_tokens: Optional[int] = None,
+) -> str:
+    h = hashlib.sha256()
+    limit = repr(max_output_tokens or None)  # 0 and None both mean "no cap"
+    for part in (model, repr(float(temperature)), limit, prompt_version, system, user):
+        data = part.encode("utf-8", errors="ignore")
+        # length-prefix each field so ("ab", "c") != ("a", "bc")
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, cfg: CacheConfig):
+        self.cfg = cfg
+        self._mem: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes: Optional[int] = None  # computed lazily (dir scan)
+        self._disk_lock = asyncio.Lock()
+
+    # ---------- memory tier ----------
+    def _mem_get(self, key: str) -> Optional[bytes]:
+        item = self._mem.get(key)
+        if item is None:
+            return None
+        expires_at, blob = item
+        if expires_at < time.time():
+            self._mem_drop(key)
+            return None
+        self._mem.move_to_end(key)
+        return blob
+
+    def _mem_put(self, key: str, expires_at: float, blob: bytes) -> None:
+        if len(blob) > self.cfg.max_memory_bytes:
+            return
+        self._mem_drop(key)
+        self._mem[key] = (expires_at, blob)
+        self._mem_bytes += len(blob)
+        while self._mem and (
+            len(self._mem) > self.cfg.max_entries
+            or self._mem_bytes > self.cfg.max_memory_bytes
+        ):
+            oldest = next(iter(self._mem))
+            self._mem_drop(oldest)
+        CACHE_BYTES.labels(tier="memory").set(self._mem_bytes)
+
+    def _mem_drop(self, key: str) -> None:
+        item = self._mem.pop(key, None)
+        if item is not None:
+            self._mem_bytes -= len(item[1])
+
+    # ---------- disk tier (blocking; run via asyncio.to_thread) ----------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cfg.directory, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                record = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        expires_at = float(record.get("expires_at", 0))
+        if expires_at < time.time():
+            self._disk_remove(path)
+            return None
+        try:
+            os.utime(path)  # mtime doubles as last-access for LRU trimming
+        except OSError:
+            pass
+        return expires_at, orjson.dumps(record.get("value"))
+
+    def _disk_put(self, key: str, expires_at: float, blob: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = b'{"expires_at":' + str(expires_at).encode() + b',"value":' + blob + b"}"
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.path.getsize(path)  # overwrite: its bytes go away
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+        if self._disk_bytes is None:
+            self._disk_bytes = self._disk_scan_bytes()
+        else:
+            self._disk_bytes += len(data) - replaced
+        if self._disk_bytes > self.cfg.max_disk_bytes:
+            self._disk_trim()
+        CACHE_BYTES.labels(tier="disk").set(self._disk_bytes)
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cfg.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _disk_scan_bytes(self) -> int:
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _disk_remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        if self._disk_bytes is not None:
+            self._disk_bytes -= size
+
+    def _disk_trim(self) -> None:
+        # Trim to 90% of budget so we don't rescan on every put.
+        now = time.time()
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.cfg.max_disk_bytes * 0.9)
+        for path, size, mtime in entries:
+            if total <= target and mtime + self.cfg.ttl_seconds >= now:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    # ---------- public API ----------
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        blob = self._mem_get(key)
+        if blob is not None:
+            CACHE_LOOKUPS.labels(tier="memory", result="hit").inc()
+            CACHE_BYTES_SERVED.inc(len(blob))
+            return orjson.loads(blob)
+        if self.cfg.directory:
+            async with self._disk_lock:
+                found = await asyncio.to_thread(self._disk_get, key)
+            if found is not None:
+                expires_at, blob = found
+                self._mem_put(key, expires_at, blob)  # promote
+                CACHE_LOOKUPS.labels(tier="disk", result="hit").inc()
+                CACHE_BYTES_SERVED.inc(len(blob))
+                return orjson.loads(blob)
+        CACHE_LOOKUPS.labels(tier="none", result="miss").inc()
+        return None
+
+    async def put(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.cfg.ttl_seconds
+        blob = orjson.dumps(value)
+        self._mem_put(key, expires_at, blob)
+        if self.cfg.directory:
+            async with self._disk_lock:
+                await asyncio.to_thread(self._disk_put, key, expires_at, blob)
+
+    @staticmethod
+    def record_bypass() -> None:
+        CACHE_LOOKUPS.labels(tier="none", result="bypass").inc()
@@ -0,0 +1,118 @@
+# saop_core/llm/chunking.py
+"""
+Split long documents into token-budgeted chunks on structural boundaries.
+
+Boundaries, best first: headings (ARTICLE / Section / SCHEDULE / ANNEX /
+numbered "12.3 Title" / markdown # / short ALL-CAPS lines), then blank-line
+paragraphs, then a hard token cut for a single oversized paragraph.
+Consecutive sections are packed greedily, so chunks stay close to the budget
+and a heading normally starts a chunk.
+"""
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .tokens import estimate_tokens, token_windows
+
+_HEADING = re.compile(
+    r"^[ \t]*(?:"
+    r"#{1,6}[ \t]+\S"
+    r"|(?:ARTICLE|Article|SECTION|Section|SCHEDULE|Schedule|ANNEX|Annex"
+    r"|APPENDIX|Appendix|EXHIBIT|Exhibit|PART|Part)\b"
+    r"|\d+(?:\.\d+)*\.?[ \t]+[A-Z]"
+    r"|[A-Z][A-Z0-9 ,;:&()'/-]{3,80}$"
+    r")",
+    re.MULTILINE,
+)
+_PARAGRAPH = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass
+class Chunk:
+    index: int
+    heading: str  # first heading line in the chunk ("" if none)
+    text: str
+    start: int  # offsets into the original text
+    end: int
+    tokens: int
+
+
+def _spans(text: str, pattern: re.Pattern[str]) -> List[Tuple[int, int]]:
+    """Cut `text` before every match of `pattern` -> [(start, end), ...]."""
+    cuts = [m.start() for m in pattern.finditer(text) if m.start() > 0]
+    bounds = [0, *cuts, len(text)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def _pieces(text: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Break [start, end) into spans of <= max_tokens, paragraphs first."""
+    if estimate_tokens(text[start:end]) <= max_tokens:
+        return [(start, end)]
+    out: List[Tuple[int, int]] = []
+    for a, b in _spans(text[start:end], _PARAGRAPH):
+        a, b = start + a, start + b
+        if estimate_tokens(text[a:b]) <= max_tokens:
+            out.append((a, b))
+        else:  # one oversized paragraph: hard cuts in a single pass
+            out.extend(token_windows(text, max_tokens, a, b))
+    return out
+
+
+def _heading(segment: str) -> str:
+    m = _HEADING.search(segment)
+    if not m:
+        return ""
+    line_end = segment.find("\n", m.start())
+    return segment[m.start() : line_end if line_end != -1 else None].strip()[:120]
+
+
+def outline(text: str, max_items: int = 200) -> List[Tuple[int, str]]:
+    """Heading lines in document order -> [(offset, heading), ...]."""
+    out: List[Tuple[int, str]] = []
+    for m in _HEADING.finditer(text):
+        line_end = text.find("\n", m.start())
+        line = text[m.start() : line_end if line_end != -1 else None].strip()[:120]
+        if line:
+            out.append((m.start(), line))
+            if len(out) >= max_items:
+                break
+    return out
+
+
+def sections(text: str) -> List[Tuple[int, int, str]]:
+    """Text cut before every heading -> [(start, end, heading), ...]."""
+    return [(a, b, _heading(text[a:b])) for a, b in _spans(text, _HEADING)]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[Chunk]:
+    if not text:
+        return []
+    spans: List[Tuple[int, int]] = []
+    for a, b in _spans(text, _HEADING):
+        spans.extend(_pieces(text, a, b, max_tokens))
+
+    chunks: List[Chunk] = []
+    cur_start, cur_end, cur_tokens = spans[0][0], spans[0][0], 0
+    for a, b in spans:
+        tokens = estimate_tokens(text[a:b])
+        if cur_end > cur_start and cur_tokens + tokens > max_tokens:
+            chunks.append(_chunk(text, len(chunks), cur_start, cur_end, cur_tokens))
+            cur_start, cur_tokens = a, 0
+        cur_end = b
+        cur_tokens += tokens
+    chunks.append(_chunk(text, len(chunks), cur_start, cur_end, cur_tokens))
+    return chunks
+
+
+def _chunk(text: str, index: int, start: int, end: int, tokens: int) -> Chunk:
+    segment = text[start:end]
+    return Chunk(
+        index=index,
+        heading=_heading(segment),
+        text=segment,
+        start=start,
+        end=end,
+        tokens=tokens,
+    )
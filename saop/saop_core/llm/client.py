@@ -1,21 +1,94 @@
 # saop_core/llm/client.py
 from __future__ import annotations
-from typing import Any, Dict
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 import httpx
 
+from ..agent_config import HTTPPoolConfig, ModelEndpoint, RateLimitConfig, RouterConfig
+from ..singleflight import SingleFlight
+from ..transport import build_async_client, register_pool
+from .cache import ResponseCache, cache_key
+from .policy import CallPolicy
+from .ratelimit import Permit, limiter_for
+from .router import Endpoint, EndpointRouter
+from .usage import cached_tokens, record_usage, usage_tokens
+
 
 class LLMClient:
-    def __init__(self, base_url: str, api_key: str):
+    """
+    Thin client for an OpenAI-compatible /responses endpoint.
+
+    Keeps one pooled httpx.AsyncClient for the lifetime of the app. Pass
+    `http_client` to share an existing pool (e.g. with init_chat_model via
+    `http_async_client=llm.http_client`); otherwise one is built lazily from
+    `http` and closed by `aclose()`.
+
+    With a `cache`, identical (model, temperature, max_output_tokens, prompts,
+    prompt_version) calls are answered from ResponseCache; pass `use_cache=False` to bypass.
+    Identical non-streaming calls already in flight are coalesced into one
+    upstream request (SingleFlight), cache or not.
+    With `ratelimit`, every upstream call goes through the per-model limiter
+    (RPM/TPM budgets, AIMD concurrency, FIFO queueing).
+    With `policy`, non-streaming calls get jittered retries and optional hedging.
+    With `endpoints`, calls are routed across the pool by EndpointRouter and fail
+    over to another endpoint on transport errors, 429s and 5xx; `base_url` and
+    `api_key` are the single default endpoint otherwise.
+    `max_output_tokens` caps every completion (the output reserve used when
+    budgeting the prompt, see llm.tokens).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        http: Optional[HTTPPoolConfig] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResponseCache] = None,
+        ratelimit: Optional[RateLimitConfig] = None,
+        policy: Optional[CallPolicy] = None,
+        endpoints: Optional[Sequence[ModelEndpoint]] = None,
+        router: Optional[RouterConfig] = None,
+        max_output_tokens: Optional[int] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
+        self.router = EndpointRouter(
+            endpoints or [ModelEndpoint("default", base_url, api_key)],
+            router or RouterConfig(),
+        )
+        self.max_output_tokens = max_output_tokens
+        self.cache = cache
+        self._flights = SingleFlight("llm")
+        self.ratelimit = ratelimit
+        self.policy = policy
+        self._http_cfg = http or HTTPPoolConfig()
+        self._client = http_client
+        self._owns_client = http_client is None
 
-    def _headers(self) -> Dict[str, str]:
-        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = build_async_client(self._http_cfg)
+            self._owns_client = True
+            register_pool("llm", self._client)
+        return self._client
 
-    async def responses(
-        self, system: str, user: str, model: str, temperature: float = 0.1
+    async def aclose(self) -> None:
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+
+    @staticmethod
+    def _headers(ep: Endpoint) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {ep.api_key}"} if ep.api_key else {}
+
+    def _payload(
+        self, system: str, user: str, model: str, temperature: float
     ) -> Dict[str, Any]:
-        payload = {
+        # Stable prefix first: `system` should be built once (see llm.prompt) so
+        # it is byte-identical across calls and hits the provider's prefix cache.
+        payload: Dict[str, Any] = {
             "model": model,
             "temperature": temperature,
             "input": [
@@ -23,9 +96,75 @@ class LLMClient:
                 {"role": "user", "content": user},
             ],
         }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            r = await client.post(
-                f"{self.base_url}/responses", headers=self._headers(), json=payload
+        if self.max_output_tokens:
+            payload["max_output_tokens"] = self.max_output_tokens
+        return payload
+
+    async def _cache_get(self, key: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        if not use_cache:
+            self.cache.record_bypass()
+            return None
+        return await self.cache.get(key)
+
+    async def responses(
+        self,
+        system: str,
+        user: str,
+        model: str,
+        temperature: float = 0.1,
+        prompt_version: str = "",
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        key = cache_key(
+            model, temperature, system, user, prompt_version, self.max_output_tokens
+        )
+        cached = await self._cache_get(key, use_cache)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        async def call() -> Dict[str, Any]:
+            async def attempt() -> Dict[str, Any]:
+                return await self._responses(system, user, model, temperature)
+
+            if self.policy is not None:
+                result = await self.policy.run(attempt)
+            else:
+                result = await attempt()
+            if self.cache is not None:
+                await self.cache.put(key, result)
+            return result
+
+        # copy: coalesced callers must not share one mutable dict
+        return dict(await self._flights.do(key, call))
+
+    @asynccontextmanager
+    async def _slot(
+        self, model: str, system: str, user: str
+    ) -> AsyncIterator[Optional[Permit]]:
+        if self.ratelimit is None:
+            yield None
+            return
+        estimate = (len(system) + len(user)) // 4  # ~4 chars/token until charged
+        async with limiter_for(model, self.ratelimit).slot(estimate) as permit:
+            yield permit
+
+    async def _responses(
+        self, system: str, user: str, model: str, temperature: float
+    ) -> Dict[str, Any]:
+        async def at(ep: Endpoint) -> Dict[str, Any]:
+            return await self._responses_at(ep, system, user, model, temperature)
+
+        return await self.router.call(at)
+
+    async def _responses_at(
+        self, ep: Endpoint, system: str, user: str, model: str, temperature: float
+    ) -> Dict[str, Any]:
+        payload = self._payload(system, user, model, temperature)
+        async with self._slot(model, system, user) as permit:
+            r = await self.http_client.post(
+                f"{ep.base_url}/responses", headers=self._headers(ep), json=payload
             )
             r.raise_for_status()
             data = r.json()
@@ -35,4 +174,112 @@ class LLMClient:
             except Exception:
                 content = str(data)
             usage = data.get("usage", {}) or data.get("usage_metadata", {})
-            return {"content": content, "usage_metadata": usage}
+            usage["cached_tokens"] = cached_tokens(usage)
+            if permit is not None:
+                permit.charge(usage_tokens(usage))
+        record_usage(model, usage)
+        return {"content": content, "usage_metadata": usage}
+
+    async def responses_stream(
+        self,
+        system: str,
+        user: str,
+        model: str,
+        temperature: float = 0.1,
+        prompt_version: str = "",
+        use_cache: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `responses` over the provider's SSE stream.
+        Yields {"type": "delta", "text": ...} per text chunk, then one
+        {"type": "done", "content": <full text>, "usage_metadata": {...}}.
+        A cache hit is replayed as a single delta.
+        """
+        key = cache_key(
+            model, temperature, system, user, prompt_version, self.max_output_tokens
+        )
+        cached = await self._cache_get(key, use_cache)
+        if cached is not None:
+            yield {"type": "delta", "text": cached.get("content", "")}
+            yield {"type": "done", **cached, "cached": True}
+            return
+        async for ev in self._responses_stream(system, user, model, temperature):
+            if ev["type"] == "done" and self.cache is not None:
+                await self.cache.put(
+                    key,
+                    {"content": ev["content"], "usage_metadata": ev["usage_metadata"]},
+                )
+            yield ev
+
+    async def _responses_stream(
+        self, system: str, user: str, model: str, temperature: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Fail over only until the first delta: a half-streamed answer can't be
+        # replayed on another endpoint. Latency is time to first token.
+        tried: List[Endpoint] = []
+        while True:
+            ep = self.router.pick(exclude=tried)
+            tried.append(ep)
+            started = self.router.begin(ep)
+            first = True
+            try:
+                async for ev in self._responses_stream_at(
+                    ep, system, user, model, temperature
+                ):
+                    if first:
+                        first = False
+                        self.router.end(ep, started, None)
+                    yield ev
+                return
+            except Exception as e:
+                if not first:
+                    raise
+                first = False
+                self.router.end(ep, started, e)
+                if not self.router.can_failover(e, tried):
+                    raise
+            finally:
+                if first:  # cancelled or closed before the first event
+                    ep.in_flight -= 1
+
+    async def _responses_stream_at(
+        self, ep: Endpoint, system: str, user: str, model: str, temperature: float
+    ) -> AsyncIterator[Dict[str, Any]]:
+        payload = self._payload(system, user, model, temperature)
+        payload["stream"] = True
+        parts: list[str] = []
+        usage: Dict[str, Any] = {}
+        async with self._slot(model, system, user) as permit:
+            async with self.http_client.stream(
+                "POST",
+                f"{ep.base_url}/responses",
+                headers=self._headers(ep),
+                json=payload,
+            ) as r:
+                if r.is_error:
+                    await r.aread()
+                    r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    try:
+                        event = json.loads(data)
+                    except ValueError:
+                        continue
+                    etype = event.get("type", "")
+                    if etype == "response.output_text.delta":
+                        delta = event.get("delta") or ""
+                        parts.append(delta)
+                        yield {"type": "delta", "text": delta}
+                    elif etype == "response.completed":
+                        usage = (event.get("response") or {}).get("usage") or {}
+                        usage["cached_tokens"] = cached_tokens(usage)
+                    elif etype in {"response.failed", "error"}:
+                        raise RuntimeError(f"model stream failed: {str(event)[:200]}")
+            if permit is not None:
+                permit.charge(usage_tokens(usage))
+        record_usage(model, usage)
+        yield {"type": "done", "content": "".join(parts), "usage_metadata": usage}
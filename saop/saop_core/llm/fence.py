@@ -0,0 +1,135 @@
+# saop_core/llm/fence.py
+"""
+Single-pass extraction of fenced JSON blocks from model output.
+
+    scanner = FenceScanner()
+    for delta in stream:
+        scanner.feed(delta)
+    tags = scanner.close()  # last ```json block that parsed, or None
+
+Only ``` at the start of a line (up to 3 spaces of indent, as in CommonMark)
+is a fence; ``` inside prose is inline code and cannot open or close a block.
+Fences are paired left to right as they arrive; each closed block is joined
+and parsed once (orjson), so the whole output is scanned and parsed at most
+once: O(n), however many fences or broken blocks it contains. A fence split
+across deltas is carried over, and an unterminated last block is still tried
+at close() (models often stop right after the closing brace).
+
+`prose_end` is the offset of the first fence: the Markdown before it is the
+summary proper.
+"""
+
+from __future__ import annotations
+import re
+from typing import Any, List, Optional
+
+import orjson
+
+FENCE = "```"
+_LANG = re.compile(r"[A-Za-z0-9_+.-]{0,20}")
+
+_OUT, _LANG_STATE, _BODY = 0, 1, 2
+
+
+class FenceScanner:
+    def __init__(self, langs: tuple[str, ...] = ("json", "")):
+        self.langs = langs
+        self.result: Optional[Any] = None  # last parsed block
+        self.blocks = 0  # fenced blocks seen
+        self.prose_end: Optional[int] = None
+        self._state = _OUT
+        self._lang = ""
+        self._body: List[str] = []
+        self._carry = ""
+        self._offset = 0  # chars consumed before _carry
+        self._indent: Optional[int] = 0  # blanks since the last newline; None: text
+
+    def feed(self, text: str) -> None:
+        data = self._carry + text
+        base = self._offset
+        self._carry = ""
+        pos, search, n = 0, 0, len(data)
+        while pos < n:
+            if self._state == _LANG_STATE:
+                m = _LANG.match(data, pos)
+                end = m.end() if m is not None else pos
+                if end == n:  # info string may continue in the next delta
+                    break
+                self._lang = data[pos:end].lower()
+                self._state = _BODY
+                pos = search = end
+                continue
+            i = data.find(FENCE, search)
+            if i != -1 and not self._line_start(data, i):
+                search = i + len(FENCE)  # inline code span, not a fence
+                continue
+            if i == -1:
+                # keep trailing backticks: they may be the start of a fence
+                keep = min(len(data) - len(data.rstrip("`")), len(FENCE) - 1, n - pos)
+                if self._state == _BODY:
+                    self._body.append(data[pos : n - keep])
+                pos = n - keep
+                break
+            if self._state == _BODY:
+                self._body.append(data[pos:i])
+                self._finish_block()
+                self._state = _OUT
+            else:
+                if self.prose_end is None:
+                    self.prose_end = base + i
+                self._state = _LANG_STATE
+                self._lang, self._body = "", []
+            pos = search = i + len(FENCE)
+        self._track_indent(data[:pos])
+        self._carry = data[pos:]
+        self._offset = base + pos
+
+    def _line_start(self, data: str, i: int) -> bool:
+        """Is data[i] preceded on its line by at most 3 spaces?"""
+        lead = data[max(0, i - 4) : i]
+        nl = lead.rfind("\n")
+        if nl != -1:
+            return not lead[nl + 1 :].strip(" ")
+        if i >= 4 or self._indent is None:
+            return False
+        return not lead.strip(" ") and self._indent + i <= 3
+
+    def _track_indent(self, consumed: str) -> None:
+        nl = consumed.rfind("\n")
+        tail = consumed[nl + 1 :] if nl != -1 else consumed
+        if tail.strip(" "):
+            self._indent = None
+        elif nl != -1:
+            self._indent = len(tail)
+        elif self._indent is not None:
+            self._indent += len(tail)
+
+    def close(self) -> Optional[Any]:
+        """Flush: an unterminated last block counts if it parses."""
+        if self._state == _LANG_STATE:
+            self._lang, self._carry = self._carry.lower(), ""
+            self._state = _BODY
+        if self._state == _BODY:
+            self._body.append(self._carry)
+            self._finish_block()
+        self._state, self._carry = _OUT, ""
+        return self.result
+
+    def _finish_block(self) -> None:
+        self.blocks += 1
+        body, self._body = "".join(self._body).strip(), []
+        if self._lang not in self.langs:
+            return
+        if not body.startswith(("{", "[")):
+            return
+        try:
+            self.result = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+
+
+def extract_json_block(md: str) -> Optional[Any]:
+    """Last fenced JSON block in `md` that parses, or None."""
+    scanner = FenceScanner()
+    scanner.feed(md)
+    return scanner.close()
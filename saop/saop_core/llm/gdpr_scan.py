@@ -0,0 +1,361 @@
+# saop_core/llm/gdpr_scan.py
+"""
+Deterministic GDPR signal scan, ahead of the model call.
+
+One Aho-Corasick pass (saop_core.textscan) over the contract finds the phrases
+behind the `gdpr_tags` keys. The hits are used twice:
+
+- `passages()` cuts +/- radius chars around them (merged, word-aligned), so a
+  focused prompt can send just those windows plus the heading outline instead
+  of the whole contract;
+- `prefill` holds the tags a phrase settles on its own ("standard contractual
+  clauses" -> cross_border_transfers, "date of birth" -> personal_data_types),
+  merged into the model's tags afterwards. Keys that need judgement (controller,
+  processors, retention periods) only get passages, never prefilled values.
+  A boolean (dpa_present) is only a default for when the model gives none: a
+  phrase can be negated ("no data processing agreement is required").
+
+Linear in the text length; safe to run on multi-megabyte contracts (call it in
+a thread, it is CPU-bound).
+"""
+
+from __future__ import annotations
+import collections
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from ..textscan import AhoCorasick
+
+# gdpr_tags schema (see the agent.yaml prompt): every key is a list of strings
+# except dpa_present; null = unknown
+GDPR_TAG_KEYS: Dict[str, type] = {
+    "personal_data_types": list,
+    "lawful_basis_candidates": list,
+    "processors_or_subprocessors": list,
+    "controller": list,
+    "dpa_present": bool,
+    "data_retention": list,
+    "cross_border_transfers": list,
+    "data_subject_rights_mentions": list,
+    "security_measures": list,
+    "breach_notification": list,
+}
+
+GDPR_TAGS = Counter(
+    "saop_llm_gdpr_tags_total",
+    "gdpr_tags blocks from model output by outcome (valid, repaired, invalid, missing)",
+    ["outcome"],
+)
+
+# key -> {canonical value: [patterns]}; "*" = prefix pattern (see textscan)
+LEXICON: Dict[str, Dict[str, List[str]]] = {
+    "personal_data_types": {
+        "name": ["full name*", "first name*", "last name*", "surname*"],
+        "email address": ["email address*", "e-mail address*"],
+        "phone number": ["phone number*", "telephone number*", "mobile number*"],
+        "postal address": ["postal address*", "home address*"],
+        "date of birth": ["date of birth", "birth date*"],
+        "IP address": ["ip address*"],
+        "online identifiers": [
+            "online identifier*",
+            "device identifier*",
+            "device id*",
+            "cookie identifier*",
+        ],
+        "location data": ["location data", "geolocation*"],
+        "financial data": [
+            "bank account*",
+            "credit card*",
+            "payment card*",
+            "financial information",
+        ],
+        "government identifiers": [
+            "social security number*",
+            "national insurance number*",
+            "passport number*",
+            "national identification number*",
+        ],
+        "health data": [
+            "health data",
+            "data concerning health",
+            "medical record*",
+            "medical information",
+        ],
+        "biometric data": ["biometric*"],
+        "genetic data": ["genetic data"],
+        "special category data": [
+            "special categories of personal data",
+            "special category data",
+            "sensitive personal data",
+            "racial or ethnic origin",
+            "political opinion*",
+            "religious or philosophical belief*",
+            "trade union membership",
+            "sexual orientation",
+        ],
+        "criminal records": ["criminal conviction*", "criminal offence*"],
+        "employee data": ["employee data", "hr data", "personnel data"],
+    },
+    "lawful_basis_candidates": {
+        "consent": ["consent of the data subject", "explicit consent", "freely given"],
+        "contract": ["performance of a contract", "performance of the contract"],
+        "legal obligation": ["legal obligation*", "article 6(1)(c)", "art. 6(1)(c)"],
+        "vital interests": ["vital interest*"],
+        "public task": ["public interest", "official authority"],
+        "legitimate interests": ["legitimate interest*"],
+    },
+    "processors_or_subprocessors": {
+        "": [
+            "data processor*",
+            "processor*",
+            "sub-processor*",
+            "subprocessor*",
+            "service provider*",
+        ],
+    },
+    "controller": {
+        "": ["data controller*", "controller*", "joint controller*"],
+    },
+    "dpa_present": {
+        "true": [
+            "data processing agreement*",
+            "data processing addendum*",
+            "data protection agreement*",
+            "data protection addendum*",
+            "article 28",
+            "art. 28",
+        ],
+        "": ["dpa"],
+    },
+    "data_retention": {
+        "": [
+            "retention period*",
+            "data retention",
+            "retain*",
+            "storage limitation",
+            "return or delete",
+            "delete or return",
+            "deletion",
+            "destroy*",
+        ],
+    },
+    "cross_border_transfers": {
+        "Standard Contractual Clauses": ["standard contractual clauses", "sccs"],
+        "Binding Corporate Rules": ["binding corporate rules"],
+        "Adequacy decision": ["adequacy decision*"],
+        "EU-US Data Privacy Framework": ["data privacy framework"],
+        "UK International Data Transfer Agreement": [
+            "international data transfer agreement",
+            "international data transfer addendum",
+            "idta",
+        ],
+        "Transfer impact assessment": ["transfer impact assessment*"],
+        "": [
+            "third country",
+            "third countries",
+            "international transfer*",
+            "outside the eea",
+            "outside the european economic area",
+            "outside the european union",
+            "chapter v",
+        ],
+    },
+    "data_subject_rights_mentions": {
+        "access": ["right of access", "right to access", "subject access request*"],
+        "rectification": ["rectification"],
+        "erasure": ["right to erasure", "right to be forgotten"],
+        "restriction": ["restriction of processing", "right to restriction"],
+        "portability": ["data portability"],
+        "objection": ["right to object"],
+        "automated decision-making": ["automated decision-making", "profiling"],
+        "": ["data subject request*", "data subject right*"],
+    },
+    "security_measures": {
+        "encryption": ["encrypt*"],
+        "pseudonymisation": ["pseudonymi*"],
+        "anonymisation": ["anonymi*"],
+        "access controls": ["access control*"],
+        "multi-factor authentication": [
+            "multi-factor authentication",
+            "two-factor authentication",
+        ],
+        "ISO 27001": ["iso 27001", "iso/iec 27001", "iso27001"],
+        "SOC 2": ["soc 2", "soc2"],
+        "penetration testing": ["penetration test*"],
+        "business continuity": ["business continuity", "disaster recovery"],
+        "backups": ["backup*", "back-up*"],
+        "logging": ["audit log*", "audit trail*"],
+        "": [
+            "technical and organisational measures",
+            "technical and organizational measures",
+            "security measures",
+            "article 32",
+        ],
+    },
+    "breach_notification": {
+        "without undue delay": ["without undue delay"],
+        "within 24 hours": ["within 24 hours", "within twenty-four (24) hours"],
+        "within 48 hours": ["within 48 hours", "within forty-eight (48) hours"],
+        "within 72 hours": ["within 72 hours", "within seventy-two (72) hours"],
+        "": [
+            "personal data breach*",
+            "data breach*",
+            "security incident*",
+            "security breach*",
+            "breach notification*",
+        ],
+    },
+}
+
+# key, canonical value ("" = locate only, never prefilled)
+Tag = Tuple[str, str]
+
+
+def _automaton() -> AhoCorasick[Tag]:
+    return AhoCorasick(
+        (pattern, (key, value))
+        for key, values in LEXICON.items()
+        for value, patterns in values.items()
+        for pattern in patterns
+    )
+
+
+_AUTOMATON = _automaton()
+
+
+@dataclass
+class Hit:
+    start: int
+    end: int
+    key: str
+    value: str
+
+
+@dataclass
+class GDPRScan:
+    hits: List[Hit]
+    prefill: Dict[str, Any] = field(default_factory=dict)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(collections.Counter(h.key for h in self.hits))
+
+    def passages(self, text: str, radius: int) -> List[Tuple[int, int, List[str]]]:
+        """Merged windows around the hits -> [(start, end, keys), ...]."""
+        out: List[Tuple[int, int, List[str]]] = []
+        n = len(text)
+        for h in sorted(self.hits, key=lambda h: h.start):
+            a, b = max(0, h.start - radius), min(n, h.end + radius)
+            if out and a <= out[-1][1]:
+                start, _, keys = out[-1]
+                if h.key not in keys:
+                    keys.append(h.key)
+                out[-1] = (start, max(b, out[-1][1]), keys)
+            else:
+                out.append((a, b, [h.key]))
+        return [(_word_start(text, a), _word_end(text, b), k) for a, b, k in out]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "hits": len(self.hits),
+            "keys": self.counts(),
+            "prefilled": sorted(self.prefill),
+        }
+
+
+def _word_start(text: str, i: int) -> int:
+    if i == 0 or text[i - 1].isspace():
+        return i
+    j = text.find(" ", i, i + 40)
+    return j + 1 if j != -1 else i
+
+
+def _word_end(text: str, i: int) -> int:
+    if i >= len(text) or text[i].isspace():
+        return i
+    j = text.rfind(" ", i - 40, i)
+    return j if j != -1 else i
+
+
+def scan_gdpr(text: str) -> GDPRScan:
+    hits: List[Hit] = []
+    prefill: Dict[str, Any] = {}
+    for m in _AUTOMATON.iter_matches(text):
+        key, value = m.payload
+        hits.append(Hit(m.start, m.end, key, value))
+        if not value:
+            continue
+        if value == "true":
+            prefill[key] = True
+            continue
+        values = prefill.setdefault(key, [])
+        if value not in values:
+            values.append(value)
+    return GDPRScan(hits=hits, prefill=prefill)
+
+
+def _as_items(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return None
+    values = value if isinstance(value, list) else [value]
+    items: List[str] = []
+    for v in values:
+        if isinstance(v, str):
+            if v.strip():
+                items.append(v.strip())
+        elif isinstance(v, dict):  # e.g. {"name": ..., "role": ...}
+            items.append(", ".join(str(x) for x in v.values() if x is not None))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            items.append(str(v))
+    return items
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "yes"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "no"):
+        return False
+    return None
+
+
+def validate_gdpr_tags(obj: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Coerce a parsed block to the gdpr_tags schema -> (tags, problems).
+
+    Unwraps {"gdpr_tags": {...}}; a bare string becomes a one-item list,
+    "true"/"false" strings become booleans; unknown keys and unusable values
+    are dropped and missing keys are null. Not a JSON object -> (None, ...).
+    """
+    if isinstance(obj, dict) and isinstance(obj.get("gdpr_tags"), dict):
+        obj = obj["gdpr_tags"]
+    if not isinstance(obj, dict):
+        return None, ["not a JSON object"]
+    problems = [f"unknown key {k!r}" for k in obj if k not in GDPR_TAG_KEYS]
+    tags: Dict[str, Any] = {}
+    for key, kind in GDPR_TAG_KEYS.items():
+        value = obj.get(key)
+        if kind is bool:
+            tags[key] = _as_bool(value)
+            ok = value is None or isinstance(value, bool)
+        else:
+            tags[key] = _as_items(value)
+            ok = value is None or (
+                isinstance(value, list) and all(isinstance(v, str) for v in value)
+            )
+        if not ok:
+            problems.append(f"{key}: coerced {type(value).__name__}")
+    return tags, problems
+
+
+def checked_gdpr_tags(block: Any) -> Optional[Dict[str, Any]]:
+    """validate_gdpr_tags + outcome metric; None when there was no usable block."""
+    if block is None:
+        GDPR_TAGS.labels(outcome="missing").inc()
+        return None
+    tags, problems = validate_gdpr_tags(block)
+    outcome = "invalid" if tags is None else "repaired" if problems else "valid"
+    GDPR_TAGS.labels(outcome=outcome).inc()
+    return tags
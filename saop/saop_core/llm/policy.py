@@ -0,0 +1,136 @@
+# saop_core/llm/policy.py
+"""
+Tail-latency policy for model calls: jittered retries + optional hedging.
+
+- Retries: exponential backoff with full jitter (tenacity) on transport errors,
+  timeouts, 408/409/429 and 5xx. Anything else (400, 401, ...) fails fast.
+- Hedging: once an attempt has run longer than the recent p<hedge_percentile>
+  latency, fire one duplicate and keep whichever finishes first. Hedges are
+  capped at `hedge_max_ratio` of calls so a slow provider is not hit with 2x load.
+
+Only for idempotent, non-streaming calls (a half-streamed answer can't be
+replayed).
+"""
+
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+import httpx
+from prometheus_client import Counter
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from ..agent_config import CallPolicyConfig
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+RETRIES = Counter("saop_llm_retries_total", "Model call retries", ["policy"])
+HEDGES = Counter(
+    "saop_llm_hedges_total",
+    "Hedged model requests by outcome (issued, won)",
+    ["policy", "outcome"],
+)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    return status in RETRYABLE_STATUS
+
+
+class LatencyTracker:
+    """Rolling window of recent successful latencies."""
+
+    def __init__(self, size: int = 512):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
+
+
+class CallPolicy:
+    def __init__(self, cfg: CallPolicyConfig, name: str = "llm"):
+        self.cfg = cfg
+        self.name = name
+        self.latency = LatencyTracker()
+        self._calls = 0
+        self._hedges = 0
+
+    def _hedge_allowed(self) -> bool:
+        # +1 so the first hedge is possible before many calls have accrued
+        return self._hedges + 1 <= self.cfg.hedge_max_ratio * self._calls + 1
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        t0 = time.perf_counter()
+        result = await fn()
+        self.latency.observe(time.perf_counter() - t0)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self._calls += 1
+        delay = (
+            self.latency.quantile(self.cfg.hedge_percentile, self.cfg.hedge_min_samples)
+            if self.cfg.hedge_enabled
+            else None
+        )
+        primary = asyncio.ensure_future(self._timed(fn))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._hedge_allowed():
+                self._hedges += 1
+                HEDGES.labels(policy=self.name, outcome="issued").inc()
+                tasks.add(asyncio.ensure_future(self._timed(fn)))
+            while True:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winner = next(iter(done))
+                tasks.discard(winner)
+                if winner.exception() is None or not tasks:
+                    if winner is not primary:
+                        HEDGES.labels(policy=self.name, outcome="won").inc()
+                    return winner.result()
+                # one attempt failed; let the other one finish
+        finally:
+            for t in tasks:
+                t.cancel()
+            # reap the losers so their errors / cancellations are retrieved
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        def before_sleep(_: RetryCallState) -> None:
+            RETRIES.labels(policy=self.name).inc()
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(max(1, self.cfg.max_attempts)),
+            wait=wait_random_exponential(
+                multiplier=self.cfg.backoff_base, max=self.cfg.backoff_max
+            ),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=before_sleep,
+            reraise=True,
+        ):
+            with attempt:
+                return await self._hedged(fn)
+        raise AssertionError("unreachable")  # reraise=True always raises
@@ -0,0 +1,39 @@
+# saop_core/llm/prompt.py
+"""
+Prompt assembly for provider-side prefix caching.
+
+Providers (OpenAI, Anthropic, ...) cache the longest byte-identical prompt
+prefix they have seen recently. To make that hit:
+  1) stable content goes first: system prompt, tool schemas, static instructions
+  2) the stable prefix is built once and is byte-identical on every call
+     (normalized newlines, no trailing whitespace)
+  3) per-request content (contract text, prior context) comes after it,
+     packed into the token budget by llm.tokens.pack_prompt
+"""
+
+from __future__ import annotations
+import hashlib
+from typing import List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize(text: str) -> str:
+    """Canonical form: \\n newlines, no trailing spaces, no trailing blank lines."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def stable_prefix(*parts: str) -> str:
+    """Join stable parts (system prompt, static instructions) into one prefix."""
+    return "\n\n".join(p for p in (normalize(p) for p in parts) if p)
+
+
+def prefix_fingerprint(prefix: str) -> str:
+    """Short hash of the prefix, handy for checking it really is identical."""
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+
+def sorted_by_name(items: Sequence[T]) -> List[T]:
+    """Deterministic tool order, so bound tool schemas form a stable prefix."""
+    return sorted(items, key=lambda t: str(getattr(t, "name", "")))
@@ -0,0 +1,223 @@
+# saop_core/llm/ratelimit.py
+"""
+Per-model adaptive rate limiter.
+
+- RPM / TPM budgets over a sliding 60s window. Callers reserve an estimate up
+  front and `charge()` the real usage_metadata tokens once the call returns.
+- Concurrency limit adjusted AIMD-style: +1/limit per success, halved on a 429,
+  and the whole model paused for `Retry-After` when the provider sends one.
+  A burst of 429s halves the limit once: only a call admitted after the last
+  decrease can trigger the next. Other failures (5xx, timeouts, cancellation)
+  leave the limit alone.
+- Excess callers wait in a FIFO queue (never fail); only the head of the queue
+  is admitted, so a burst cannot starve earlier callers.
+
+Usage:
+    limiter = limiter_for(model, CFG.ratelimit)
+    async with limiter.slot(estimated_tokens) as permit:
+        res = await call_model(...)
+        permit.charge(usage_tokens(res["usage_metadata"]))
+"""
+
+from __future__ import annotations
+import asyncio
+import email.utils
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..agent_config import RateLimitConfig
+
+WINDOW_SECONDS = 60.0
+
+QUEUE_WAIT = Histogram(
+    "saop_llm_ratelimit_wait_seconds",
+    "Time model calls spent queued in the rate limiter",
+    ["model"],
+)
+CONCURRENCY_LIMIT = Gauge(
+    "saop_llm_concurrency_limit", "Current adaptive concurrency limit", ["model"]
+)
+IN_FLIGHT = Gauge("saop_llm_in_flight", "Model calls currently in flight", ["model"])
+QUEUED = Gauge("saop_llm_ratelimit_queued", "Model calls waiting for a slot", ["model"])
+RATE_LIMITED = Counter(
+    "saop_llm_rate_limited_total", "Provider 429 responses observed", ["model"]
+)
+
+
+def _parse_retry_after(headers: Any) -> Optional[float]:
+    if headers is None:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limit_info(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    (is_429, retry_after_seconds) for httpx.HTTPStatusError, openai.RateLimitError
+    and anything else exposing .status_code / .response.
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return False, None
+    return True, _parse_retry_after(getattr(response, "headers", None))
+
+
+class Permit:
+    __slots__ = ("_entry", "epoch")
+
+    def __init__(self, entry: List[float], epoch: int = 0):
+        self._entry = entry
+        self.epoch = epoch  # limiter's decrease count when admitted
+
+    def charge(self, tokens: int) -> None:
+        """Replace the up-front estimate with the tokens actually used."""
+        if tokens > 0:
+            self._entry[1] = float(tokens)
+
+
+class ModelRateLimiter:
+    def __init__(self, model: str, cfg: RateLimitConfig):
+        self.model = model
+        self.cfg = cfg
+        self.limit = float(cfg.max_concurrency)
+        self.in_flight = 0
+        self._epoch = 0  # bumped on every multiplicative decrease
+        self._paused_until = 0.0
+        self._window: Deque[List[float]] = deque()  # [timestamp, tokens]
+        self._queue: Deque[asyncio.Event] = deque()
+        CONCURRENCY_LIMIT.labels(model=model).set(self.limit)
+
+    # ---------- admission ----------
+    def _prune(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            self._window.popleft()
+
+    def _delay(self, est_tokens: int) -> float:
+        """Seconds until the head caller may go; inf = wait for a release."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= max(1, math.floor(self.limit)):
+            return math.inf
+        self._prune(now)
+        if not self._window:
+            return 0.0
+        next_expiry = self._window[0][0] + WINDOW_SECONDS - now
+        if self.cfg.rpm and len(self._window) >= self.cfg.rpm:
+            return next_expiry
+        if self.cfg.tpm:
+            used = sum(tokens for _, tokens in self._window)
+            if used + est_tokens > self.cfg.tpm:
+                return next_expiry
+        return 0.0
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].set()
+
+    async def acquire(self, est_tokens: int = 0) -> Permit:
+        t0 = time.monotonic()
+        if self._queue or self._delay(est_tokens) > 0:
+            ev = asyncio.Event()
+            self._queue.append(ev)
+            QUEUED.labels(model=self.model).set(len(self._queue))
+            try:
+                while True:
+                    delay = (
+                        self._delay(est_tokens) if self._queue[0] is ev else math.inf
+                    )
+                    if delay <= 0:
+                        break
+                    ev.clear()
+                    try:
+                        await asyncio.wait_for(
+                            ev.wait(), None if math.isinf(delay) else delay
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._queue.remove(ev)
+                QUEUED.labels(model=self.model).set(len(self._queue))
+                self._wake_head()
+        QUEUE_WAIT.labels(model=self.model).observe(time.monotonic() - t0)
+        entry = [time.monotonic(), float(est_tokens)]
+        self._window.append(entry)
+        self.in_flight += 1
+        IN_FLIGHT.labels(model=self.model).set(self.in_flight)
+        return Permit(entry, self._epoch)
+
+    def release(
+        self,
+        rate_limited: bool = False,
+        retry_after: Optional[float] = None,
+        *,
+        failed: bool = False,
+        epoch: Optional[int] = None,
+    ) -> None:
+        """
+        End a call. `epoch` is the permit's: a 429 on a call admitted before
+        the last decrease does not decrease again. `failed` (any other error)
+        neither decreases nor increases the limit.
+        """
+        self.in_flight -= 1
+        if rate_limited:
+            RATE_LIMITED.labels(model=self.model).inc()
+            if epoch is None or epoch >= self._epoch:
+                self.limit = max(float(self.cfg.min_concurrency), self.limit / 2)
+                self._epoch += 1
+            pause = retry_after if retry_after is not None else 1.0
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        elif not failed:
+            # additive increase: roughly +1 per `limit` successful calls
+            self.limit = min(
+                float(self.cfg.max_concurrency), self.limit + 1.0 / self.limit
+            )
+        IN_FLIGHT.labels(model=self.model).set(self.in_flight)
+        CONCURRENCY_LIMIT.labels(model=self.model).set(self.limit)
+        self._wake_head()
+
+    @asynccontextmanager
+    async def slot(self, est_tokens: int = 0) -> AsyncIterator[Permit]:
+        permit = await self.acquire(est_tokens)
+        limited, retry_after, failed = False, None, False
+        try:
+            yield permit
+        except BaseException as e:  # incl. CancelledError (e.g. a lost hedge)
+            limited, retry_after = rate_limit_info(e)
+            failed = not limited
+            raise
+        finally:
+            self.release(limited, retry_after, failed=failed, epoch=permit.epoch)
+
+
+_LIMITERS: Dict[str, ModelRateLimiter] = {}
+
+
+def limiter_for(model: str, cfg: Optional[RateLimitConfig] = None) -> ModelRateLimiter:
+    """Process-wide limiter per model, shared by LLMClient and LangGraph nodes."""
+    limiter = _LIMITERS.get(model)
+    if limiter is None:
+        limiter = _LIMITERS[model] = ModelRateLimiter(model, cfg or RateLimitConfig())
+    return limiter
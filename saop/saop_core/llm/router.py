@@ -0,0 +1,145 @@
+# saop_core/llm/router.py
+"""
+Latency-aware routing over a pool of OpenAI-compatible endpoints.
+
+- Each endpoint keeps an EWMA of latency and of its error rate.
+- Power of two choices: pick two healthy endpoints at random and use the one
+  with the lower score (latency x (1 + in-flight) x error penalty). Cheap, and
+  avoids herding every caller onto the single "best" endpoint.
+- `eject_after` consecutive failures eject an endpoint for `cooldown_seconds`;
+  after that it is probed again and re-ejected on the next failure.
+- `call(fn)` fails over to another endpoint on retryable errors (transport,
+  timeouts, 429/5xx), so callers only see an error once every endpoint failed.
+"""
+
+from __future__ import annotations
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Collection, List, Optional, Sequence, TypeVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..agent_config import ModelEndpoint, RouterConfig
+from .policy import is_retryable
+
+T = TypeVar("T")
+
+ERROR_PENALTY = 4.0  # an endpoint failing every call scores 5x its latency
+
+ENDPOINT_LATENCY = Histogram(
+    "saop_llm_endpoint_latency_seconds",
+    "Model call latency per endpoint",
+    ["endpoint", "outcome"],
+)
+ENDPOINT_HEALTHY = Gauge(
+    "saop_llm_endpoint_healthy",
+    "1 if the endpoint is routable, 0 if ejected",
+    ["endpoint"],
+)
+ENDPOINT_EJECTIONS = Counter(
+    "saop_llm_endpoint_ejections_total", "Endpoint ejections", ["endpoint"]
+)
+FAILOVERS = Counter(
+    "saop_llm_failovers_total", "Calls retried on another endpoint", ["endpoint"]
+)
+
+
+class Endpoint:
+    def __init__(self, cfg: ModelEndpoint):
+        self.cfg = cfg
+        self.name = cfg.name
+        self.base_url = cfg.base_url.rstrip("/")
+        self.api_key = cfg.api_key
+        self.latency: Optional[float] = None  # EWMA seconds; None = no data yet
+        self.error_rate = 0.0  # EWMA of failures in [0, 1]
+        self.in_flight = 0
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+        ENDPOINT_HEALTHY.labels(endpoint=self.name).set(1)
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self) -> float:
+        # unmeasured endpoints score 0 so they get probed early
+        latency = self.latency or 0.0
+        return latency * (1 + self.in_flight) * (1 + ERROR_PENALTY * self.error_rate)
+
+
+class EndpointRouter:
+    def __init__(self, endpoints: Sequence[ModelEndpoint], cfg: RouterConfig):
+        if not endpoints:
+            raise ValueError("EndpointRouter needs at least one endpoint")
+        self.cfg = cfg
+        self.endpoints: List[Endpoint] = [Endpoint(e) for e in endpoints]
+
+    def pick(self, exclude: Collection[Endpoint] = ()) -> Endpoint:
+        """Best of two random healthy endpoints not in `exclude`."""
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            raise LookupError("no endpoint left to try")
+        healthy = [e for e in candidates if e.healthy(now)]
+        if not healthy:
+            # everything is ejected: try the one whose cooldown ends first
+            return min(candidates, key=lambda e: e.ejected_until)
+        if len(healthy) == 1:
+            return healthy[0]
+        a, b = random.sample(healthy, 2)
+        return a if a.score() <= b.score() else b
+
+    def observe(self, ep: Endpoint, seconds: float, ok: bool) -> None:
+        alpha = self.cfg.ewma_alpha
+        ENDPOINT_LATENCY.labels(
+            endpoint=ep.name, outcome="ok" if ok else "error"
+        ).observe(seconds)
+        ep.error_rate = (1 - alpha) * ep.error_rate + alpha * (0.0 if ok else 1.0)
+        if ok:
+            ep.latency = (
+                seconds
+                if ep.latency is None
+                else (1 - alpha) * ep.latency + alpha * seconds
+            )
+            ep.failures = 0
+            ENDPOINT_HEALTHY.labels(endpoint=ep.name).set(1)
+            return
+        ep.failures += 1
+        if ep.failures >= max(1, self.cfg.eject_after):
+            ep.ejected_until = time.monotonic() + self.cfg.cooldown_seconds
+            ENDPOINT_EJECTIONS.labels(endpoint=ep.name).inc()
+            ENDPOINT_HEALTHY.labels(endpoint=ep.name).set(0)
+
+    def begin(self, ep: Endpoint) -> float:
+        ep.in_flight += 1
+        return time.perf_counter()
+
+    def end(self, ep: Endpoint, started: float, error: Optional[BaseException]) -> None:
+        """Finish a call started with `begin`; request errors (4xx) are not held
+        against the endpoint."""
+        ep.in_flight -= 1
+        if error is None or is_retryable(error):
+            self.observe(ep, time.perf_counter() - started, ok=error is None)
+
+    def can_failover(self, error: BaseException, tried: Collection[Endpoint]) -> bool:
+        return is_retryable(error) and len(tried) < len(self.endpoints)
+
+    async def call(self, fn: Callable[[Endpoint], Awaitable[T]]) -> T:
+        tried: List[Endpoint] = []
+        while True:
+            ep = self.pick(exclude=tried)
+            tried.append(ep)
+            started = self.begin(ep)
+            try:
+                result = await fn(ep)
+            except asyncio.CancelledError:
+                ep.in_flight -= 1  # e.g. a losing hedge; says nothing about health
+                raise
+            except Exception as e:
+                self.end(ep, started, e)
+                if not self.can_failover(e, tried):
+                    raise
+                FAILOVERS.labels(endpoint=ep.name).inc()
+                continue
+            self.end(ep, started, None)
+            return result
@@ -0,0 +1,203 @@
+# saop_core/llm/tokens.py
+"""
+Fast approximate token counting and context-window budgeting.
+
+No tokenizer dependency: BPE tokenizers (cl100k / o200k) average ~0.75 words
+per token on English prose, punctuation is mostly one token each, and long
+"words" (ids, URLs, numbers) split roughly every 4 characters. That lands within
+a few percent on contracts, which is plenty for budgeting; `SAFETY_MARGIN`
+absorbs the rest.
+
+    plan = pack_prompt(system, sections, context_window=128_000, reserve_output=2_000)
+    user_prompt = plan.user
+"""
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from prometheus_client import Histogram
+
+_WORD = re.compile(r"\w+")
+_PUNCT = re.compile(r"[^\w\s]")
+_TOKEN = re.compile(r"(\w+)|[^\w\s]")
+
+SAFETY_MARGIN = 0.05  # fraction of the window kept free for estimation error
+MESSAGE_OVERHEAD = 8  # role / separator tokens per chat message
+
+ESTIMATE_RATIO = Histogram(
+    "saop_llm_token_estimate_ratio",
+    "Actual / estimated input tokens per model call",
+    ["model"],
+    buckets=(0.5, 0.75, 0.9, 0.95, 1.0, 1.05, 1.1, 1.25, 1.5, 2.0),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokens = 0.0
+    for m in _WORD.finditer(text):
+        n = m.end() - m.start()
+        tokens += 1.33 if n <= 8 else n / 4
+    tokens += len(_PUNCT.findall(text))
+    return int(tokens) + 1
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Longest prefix of `text` estimated (as by estimate_tokens) to fit `budget`,
+    in one forward pass. Cuts at whitespace; if no whitespace cut fits, the
+    word that overflows is sliced.
+    """
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    # int(used) + 1 <= budget  <=>  used < budget
+    used = 0.0
+    cut = 0
+    for m in _TOKEN.finditer(text):
+        a, b = m.span()
+        n = b - a
+        cost = (1.33 if n <= 8 else n / 4) if m.group(1) else 1.0
+        if used + cost >= budget:
+            if cut == 0 and m.group(1):
+                k = int((budget - used) * 4) - 1
+                cut = a + k if k > 8 else 0
+            break
+        used += cost
+        if b == len(text) or text[b].isspace():
+            cut = b
+    # float sums can land on the other side of an integer; re-check
+    while cut > 0 and estimate_tokens(text[:cut]) > budget:
+        cut = max(0, text.rfind(" ", 0, cut))
+    return text[:cut]
+
+
+def token_windows(
+    text: str, max_tokens: int, start: int = 0, end: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    [start, end) cut into consecutive spans estimated (as by estimate_tokens)
+    at <= max_tokens each, in one forward pass. Cuts fall before a word or
+    punctuation mark; a single word longer than the budget is sliced.
+    """
+    end = len(text) if end is None else end
+    budget = max_tokens - 1  # estimate_tokens rounds down, then adds 1
+    step = max(8, budget * 4)  # chars of an over-long word per slice
+    out: List[Tuple[int, int]] = []
+    used = 0.0
+    for m in _TOKEN.finditer(text, start, end):
+        a, b = m.span()
+        n = b - a
+        cost = (1.33 if n <= 8 else n / 4) if m.group(1) else 1.0
+        if used + cost > budget and a > start:
+            out.append((start, a))
+            start, used = a, 0.0
+        if cost > budget:
+            while b - start > step:
+                out.append((start, start + step))
+                start += step
+            cost = 1.33 if b - start <= 8 else (b - start) / 4
+        used += cost
+    if end > start or not out:
+        out.append((start, end))
+    return out
+
+
+@dataclass
+class PromptPlan:
+    user: str
+    estimated_input_tokens: int
+    budget_tokens: int
+    truncated: Dict[str, int] = field(default_factory=dict)  # section -> chars dropped
+
+    def report(self, usage: Optional[Dict[str, int]] = None) -> Dict[str, object]:
+        actual = int((usage or {}).get("input_tokens") or 0) or None
+        return {
+            "estimated_input": self.estimated_input_tokens,
+            "actual_input": actual,
+            "budget": self.budget_tokens,
+            "truncated": self.truncated,
+        }
+
+
+@dataclass
+class Section:
+    name: str
+    header: str
+    body: str
+    share: float = 1.0  # max fraction of the input budget this section may take
+    items: Optional[Sequence[str]] = None  # packed whole, in order, instead of body
+
+
+def pack_prompt(
+    system: str,
+    sections: Sequence[Section],
+    context_window: int,
+    reserve_output: int,
+) -> PromptPlan:
+    """
+    Fit `sections` into what the window leaves after the system prompt and
+    the output reserve. Each section is capped at `share` of the budget; capped
+    sections are sized first, so uncapped ones (the contract) take whatever is
+    left. Sections are emitted in the order given. Item sections keep whole
+    items only (no half search results).
+    """
+    window = int(context_window * (1 - SAFETY_MARGIN))
+    fixed = estimate_tokens(system) + 2 * MESSAGE_OVERHEAD
+    budget = max(0, window - reserve_output - fixed)
+
+    remaining = budget
+    parts: Dict[int, str] = {}
+    truncated: Dict[str, int] = {}
+    for idx, s in sorted(enumerate(sections), key=lambda p: p[1].share):
+        cap = min(remaining, int(budget * s.share))
+        head = estimate_tokens(s.header)
+        if cap <= head:
+            if s.body or s.items:
+                truncated[s.name] = len(s.body) + sum(len(i) for i in s.items or ())
+            continue
+        if s.items is not None:
+            kept: List[str] = []
+            used = head
+            for item in s.items:
+                cost = estimate_tokens(item) + 1
+                if used + cost > cap:
+                    break
+                kept.append(item)
+                used += cost
+            dropped = s.items[len(kept) :]
+            if dropped:
+                truncated[s.name] = sum(len(i) for i in dropped)
+            if not kept:
+                continue
+            text = s.header + "\n".join(kept)
+        else:
+            if not s.body:
+                continue
+            body = truncate_to_tokens(s.body, cap - head)
+            if len(body) < len(s.body):
+                truncated[s.name] = len(s.body) - len(body)
+            used = head + estimate_tokens(body)
+            text = s.header + body
+        parts[idx] = text
+        remaining -= used
+
+    user = "\n\n".join(parts[i] for i in sorted(parts))
+    return PromptPlan(
+        user=user,
+        estimated_input_tokens=fixed + estimate_tokens(user),
+        budget_tokens=budget,
+        truncated=truncated,
+    )
+
+
+def observe_estimate(
+    model: str, estimated: int, usage: Optional[Dict[str, int]]
+) -> None:
+    actual = int((usage or {}).get("input_tokens") or 0)
+    if estimated > 0 and actual > 0:
+        ESTIMATE_RATIO.labels(model=model).observe(actual / estimated)
@@ -0,0 +1,73 @@
+# saop_core/llm/usage.py
+"""
+Token accounting shared by LLMClient, LangGraph nodes and agent /run handlers.
+
+Understands the three usage shapes we see:
+  - Responses API:  input_tokens / output_tokens / input_tokens_details.cached_tokens
+  - Chat API:       prompt_tokens / completion_tokens / prompt_tokens_details.cached_tokens
+  - LangChain:      usage_metadata.input_tokens / input_token_details.cache_read
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+
+# Track cost tokens
+AGENT_TOKENS = Counter(
+    "agent_tokens_total", "Total tokens processed by agent", ["model", "type"]
+)
+
+# Input tokens split by provider prompt-cache status (cached = prefix cache hit)
+AGENT_INPUT_TOKENS = Counter(
+    "agent_input_tokens_total",
+    "Input tokens processed by agent, by provider prompt-cache status",
+    ["model", "cache"],
+)
+
+
+def input_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    if not usage:
+        return 0
+    return int(usage.get("input_tokens") or usage.get("prompt_tokens") or 0)
+
+
+def output_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    if not usage:
+        return 0
+    return int(usage.get("output_tokens") or usage.get("completion_tokens") or 0)
+
+
+def cached_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """Input tokens the provider served from its prompt (prefix) cache."""
+    if not usage:
+        return 0
+    if usage.get("cached_tokens") is not None:
+        return int(usage["cached_tokens"])
+    for key in ("input_tokens_details", "prompt_tokens_details"):
+        details = usage.get(key) or {}
+        if details.get("cached_tokens"):
+            return int(details["cached_tokens"])
+    details = usage.get("input_token_details") or {}
+    return int(details.get("cache_read") or 0)
+
+
+def usage_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """Total tokens from any of the usage shapes above."""
+    if not usage:
+        return 0
+    total = usage.get("total_tokens")
+    if total:
+        return int(total)
+    return input_tokens(usage) + output_tokens(usage)
+
+
+def record_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    inp, out = input_tokens(usage), output_tokens(usage)
+    if inp:
+        AGENT_TOKENS.labels(model=model, type="input").inc(inp)
+        cached = min(cached_tokens(usage), inp)
+        AGENT_INPUT_TOKENS.labels(model=model, cache="cached").inc(cached)
+        AGENT_INPUT_TOKENS.labels(model=model, cache="uncached").inc(inp - cached)
+    if out:
+        AGENT_TOKENS.labels(model=model, type="output").inc(out)
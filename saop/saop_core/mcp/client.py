@@ -1,34 +1,233 @@
 # saop_core/mcp/client.py
 from __future__ import annotations
-from typing import Any, Dict
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, Iterable, Optional
 import httpx
+import orjson
+
+from ..agent_config import HTTPPoolConfig
+from ..singleflight import SingleFlight
+from ..transport import build_async_client, register_pool
+
+MCP_PROTOCOL_VERSION = "2025-06-18"
+CLIENT_INFO = {"name": "saop-mcp-client", "version": "0.1.0"}
+
+# Read-only tools: safe to coalesce identical concurrent calls into one.
+DEFAULT_COALESCE_TOOLS = frozenset(
+    {
+        "fetch_contract_text",
+        "search_prior_summaries",
+        "fetch_summary_chunks",
+        "lookup_summary",
+        "db_query",
+    }
+)
+
+
+class MCPSessionExpired(Exception):
+    """Server no longer knows our Mcp-Session-Id (HTTP 404); re-initialize."""
 
 
 class MCPClient:
-    def __init__(self, base_url: str, bearer_token: str = ""):
+    """
+    Streamable-HTTP MCP client that keeps one session per server.
+
+    The first call runs `initialize` + `notifications/initialized` and remembers
+    the `Mcp-Session-Id` the server hands back; later calls reuse it over the
+    same pooled connection. If the server drops the session (404), we
+    re-initialize once and retry transparently.
+
+    Concurrent calls to a tool in `coalesce_tools` with the same normalized
+    arguments share one request.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        bearer_token: str = "",
+        http: Optional[HTTPPoolConfig] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        coalesce_tools: Optional[Iterable[str]] = None,
+    ):
         self.base_url = base_url.rstrip("/")  # e.g. http://mcp:9000/mcp
         self.bearer = bearer_token
+        self._http_cfg = http or HTTPPoolConfig()
+        self._client = http_client
+        self._owns_client = http_client is None
+        self._session_id: Optional[str] = None
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        self.coalesce_tools = frozenset(
+            DEFAULT_COALESCE_TOOLS if coalesce_tools is None else coalesce_tools
+        )
+        self._flights = SingleFlight("mcp")
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = build_async_client(self._http_cfg)
+            self._owns_client = True
+            register_pool("mcp", self._client)
+        return self._client
+
+    async def aclose(self) -> None:
+        # Best-effort session teardown; the server expires it anyway.
+        if self._session_id and self._client is not None:
+            try:
+                await self._client.delete(self.base_url, headers=self._headers())
+            except Exception:
+                pass
+        self._reset_session()
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
 
     def _headers(self) -> Dict[str, str]:
         h = {
             "Content-Type": "application/json",
-            "Accept": "*/*",  # be permissive; avoids 406 differences across builds
+            # streamable HTTP servers answer with either JSON or an SSE stream
+            "Accept": "application/json, text/event-stream",
         }
         if self.bearer:
             h["Authorization"] = f"Bearer {self.bearer}"
+        if self._session_id:
+            h["Mcp-Session-Id"] = self._session_id
+        if self._initialized:
+            h["Mcp-Protocol-Version"] = MCP_PROTOCOL_VERSION
         return h
 
+    def _reset_session(self) -> None:
+        self._session_id = None
+        self._initialized = False
+
+    @staticmethod
+    def _parse_body(r: httpx.Response, req_id: int) -> Dict[str, Any]:
+        # SSE: pick the JSON-RPC message answering our request id
+        if r.headers.get("content-type", "").startswith("text/event-stream"):
+            for line in r.text.splitlines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    msg = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                if isinstance(msg, dict) and msg.get("id") == req_id:
+                    return msg
+            return {}
+        return r.json()
+
+    async def _post(self, message: Dict[str, Any]) -> httpx.Response:
+        r = await self.http_client.post(
+            self.base_url, headers=self._headers(), json=message
+        )
+        if r.status_code == 404 and self._session_id:
+            raise MCPSessionExpired(self._session_id)
+        return r
+
+    async def _ensure_session(self) -> None:
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            req_id = next(self._ids)
+            r = await self._post(
+                {
+                    "jsonrpc": "2.0",
+                    "id": req_id,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": MCP_PROTOCOL_VERSION,
+                        "capabilities": {},
+                        "clientInfo": CLIENT_INFO,
+                    },
+                }
+            )
+            if not 200 <= r.status_code < 300:
+                raise RuntimeError(
+                    f"MCP initialize failed: {r.status_code} {r.text[:200]}"
+                )
+            # stateless servers omit the header; then we just never send one
+            self._session_id = r.headers.get("mcp-session-id")
+            self._initialized = True
+            await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    @staticmethod
+    def _unwrap_tool_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        texts = [
+            c.get("text", "")
+            for c in result.get("content") or []
+            if c.get("type") == "text"
+        ]
+        if result.get("isError"):
+            return {"error": " ".join(texts) or "tool_error"}
+        structured = result.get("structuredContent")
+        if isinstance(structured, dict):
+            return structured
+        if texts:
+            try:
+                parsed = json.loads(texts[0])
+                if isinstance(parsed, dict):
+                    return parsed
+            except ValueError:
+                pass
+            return {"raw": "\n".join(texts)}
+        return result
+
+    @staticmethod
+    def _flight_key(name: str, args: Dict[str, Any]) -> bytes:
+        # None-valued args are the same as omitted ones; key order is irrelevant
+        normalized = {k: v for k, v in args.items() if v is not None}
+        return (
+            name.encode()
+            + b"\0"
+            + orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS)
+        )
+
     async def call_tool(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        payload = {"method": "tools/call", "params": {"tool": name, "args": args}}
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            r = await client.post(self.base_url, headers=self._headers(), json=payload)
-            # if server streams NDJSON/SSE as a single JSON object, this still works;
-            # if not JSON, surface the raw text to help debug.
+        if name not in self.coalesce_tools:
+            return await self._call_tool(name, args)
+        try:
+            key = self._flight_key(name, args)
+        except TypeError:  # not JSON-serializable; just don't coalesce
+            return await self._call_tool(name, args)
+        result = await self._flights.do(key, lambda: self._call_tool(name, args))
+        # copy: coalesced callers must not share one mutable dict
+        return dict(result)
+
+    async def _call_tool(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(2):
+            await self._ensure_session()
+            req_id = next(self._ids)
+            try:
+                r = await self._post(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": req_id,
+                        "method": "tools/call",
+                        "params": {"name": name, "arguments": args},
+                    }
+                )
+            except MCPSessionExpired:
+                self._reset_session()
+                if attempt == 0:
+                    continue
+                raise RuntimeError(f"MCP call_tool('{name}') failed: session expired")
             if 200 <= r.status_code < 300:
                 try:
-                    return r.json()
+                    msg = self._parse_body(r, req_id)
                 except Exception:
+                    # if not JSON, surface the raw text to help debug.
                     return {"raw": r.text}
-            raise RuntimeError(
-                f"MCP call_tool('{name}') failed: {r.status_code} {r.text[:200]}"
-            )
+                if "error" in msg:
+                    raise RuntimeError(
+                        f"MCP call_tool('{name}') failed: {msg['error']}"
+                    )
+                return self._unwrap_tool_result(msg.get("result") or {})
+            break
+        raise RuntimeError(
+            f"MCP call_tool('{name}') failed: {r.status_code} {r.text[:200]}"
+        )
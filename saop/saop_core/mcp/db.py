@@ -0,0 +1,320 @@
+# mcp_server/db.py
+"""
+Read-only SQL for the db_query tool, on a small async connection pool.
+
+DATABASE_URL picks the backend:
+  postgresql://...   psycopg (async). Connections open with
+                     default_transaction_read_only=on and statement_timeout,
+                     and every query runs in a READ ONLY transaction.
+  sqlite:///abs.db   stdlib sqlite3 in worker threads, opened mode=ro with
+                     query_only; a progress handler enforces the timeout.
+                     A stand-in for local runs and testing.
+
+Rows are read in pages of LEGAL_DB_PAGE_ROWS and reading stops at the row
+cap (LEGAL_DB_MAX_ROWS, or a smaller `max_rows`): on Postgres through a
+server-side cursor (DECLARE/FETCH), so a large result is never materialized
+on either side. DECLARE cannot run a prepared statement, so `stream=False`
+is the other path: the query is capped with LIMIT and executed as a
+prepared statement, cached per connection by psycopg (prepared after
+LEGAL_DB_PREPARE_THRESHOLD executions). That path is for small lookups that
+are repeated.
+
+Placeholders are %s on both backends.
+"""
+
+from __future__ import annotations
+import asyncio
+import base64
+import datetime as dt
+import decimal
+import os
+import re
+import sqlite3
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Generic, List, Optional
+from typing import Sequence, TypeVar
+
+from prometheus_client import Gauge, Histogram
+
+DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
+POOL_MAX = int(os.getenv("LEGAL_DB_POOL_MAX", "8"))
+POOL_TIMEOUT = float(os.getenv("LEGAL_DB_POOL_TIMEOUT", "5"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("LEGAL_DB_STATEMENT_TIMEOUT_MS", "5000"))
+MAX_ROWS = int(os.getenv("LEGAL_DB_MAX_ROWS", "1000"))
+PAGE_ROWS = int(os.getenv("LEGAL_DB_PAGE_ROWS", "200"))
+PREPARE_THRESHOLD = int(os.getenv("LEGAL_DB_PREPARE_THRESHOLD", "2"))
+
+POOL_WAIT = Histogram(
+    "saop_mcp_db_pool_wait_seconds", "Time db_query waited for a pooled connection"
+)
+QUERY_SECONDS = Histogram(
+    "saop_mcp_db_query_seconds", "db_query execution time by outcome", ["outcome"]
+)
+POOL_IN_USE = Gauge("saop_mcp_db_pool_in_use", "db_query connections checked out")
+
+# statements a read-only tool has any business running
+_READ_ONLY = re.compile(r"^\s*(select|with|values|table|explain|show)\b", re.I)
+
+C = TypeVar("C")
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class NotReadOnly(Exception):
+    pass
+
+
+class Pool(Generic[C]):
+    """
+    At most `max_size` connections, opened on demand and reused LIFO. A
+    connection that comes back unusable (`healthy` is False) is closed and
+    its slot freed.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[C]],
+        close: Callable[[C], Awaitable[None]],
+        healthy: Callable[[C], bool],
+        max_size: int = POOL_MAX,
+        timeout: float = POOL_TIMEOUT,
+    ):
+        self._connect = connect
+        self._close = close
+        self._healthy = healthy
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: Deque[C] = deque()
+        self._slots = asyncio.Semaphore(max_size)
+
+    async def acquire(self) -> C:
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout or None)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"no connection free within {self.timeout}s") from None
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - t0)
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if self._healthy(conn):
+                    break
+                await self._close(conn)
+            else:
+                conn = await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        POOL_IN_USE.inc()
+        return conn
+
+    async def release(self, conn: C, discard: bool = False) -> None:
+        POOL_IN_USE.dec()
+        try:
+            if discard or not self._healthy(conn):
+                await self._close(conn)
+            else:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    async def aclose(self) -> None:
+        while self._idle:
+            await self._close(self._idle.pop())
+
+
+@dataclass
+class Result:
+    columns: List[str]
+    rows: List[List[Any]] = field(default_factory=list)
+    truncated: bool = False
+    pages: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "rows": self.rows,
+            "row_count": len(self.rows),
+            "truncated": self.truncated,
+            "pages": self.pages,
+        }
+
+
+# ---------- postgres ----------
+async def _pg_connect() -> Any:
+    import psycopg
+
+    conn = await psycopg.AsyncConnection.connect(
+        DATABASE_URL,
+        prepare_threshold=PREPARE_THRESHOLD,
+        options=(
+            "-c default_transaction_read_only=on "
+            f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+        ),
+    )
+    await conn.set_read_only(True)
+    return conn
+
+
+async def _pg_close(conn: Any) -> None:
+    await conn.close()
+
+
+def _pg_healthy(conn: Any) -> bool:
+    from psycopg.pq import TransactionStatus
+
+    return not conn.closed and conn.info.transaction_status == TransactionStatus.IDLE
+
+
+async def _pg_query(
+    conn: Any, sql: str, params: Sequence[Any], max_rows: int, stream: bool
+) -> Result:
+    async with conn.transaction():
+        if stream:
+            async with conn.cursor(name=f"saop_{uuid.uuid4().hex[:12]}") as cur:
+                await cur.execute(sql, params or None)
+                return await _pages(cur, max_rows)
+        cur = conn.cursor()
+        await cur.execute(
+            f"SELECT * FROM ({sql.rstrip().rstrip(';')}) AS q LIMIT %s",
+            [*params, max_rows + 1],
+        )
+        return await _pages(cur, max_rows)
+
+
+async def _pages(cur: Any, max_rows: int) -> Result:
+    res = Result([d.name for d in cur.description or []])
+    while len(res.rows) <= max_rows:
+        page = await cur.fetchmany(min(PAGE_ROWS, max_rows + 1 - len(res.rows)))
+        if not page:
+            break
+        res.pages += 1
+        res.rows.extend([_jsonable(v) for v in row] for row in page)
+    if len(res.rows) > max_rows:
+        del res.rows[max_rows:]
+        res.truncated = True
+    return res
+
+
+# ---------- sqlite ----------
+def _sqlite_path() -> str:
+    return DATABASE_URL.split("://", 1)[1]  # sqlite:///abs/path.db
+
+
+async def _sqlite_connect() -> sqlite3.Connection:
+    def connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{_sqlite_path()}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    return await asyncio.to_thread(connect)
+
+
+async def _sqlite_close(conn: sqlite3.Connection) -> None:
+    await asyncio.to_thread(conn.close)
+
+
+def _sqlite_query(
+    conn: sqlite3.Connection, sql: str, params: Sequence[Any], max_rows: int
+) -> Result:
+    deadline = time.monotonic() + STATEMENT_TIMEOUT_MS / 1000
+    conn.set_progress_handler(lambda: int(time.monotonic() > deadline), 10_000)
+    try:
+        cur = conn.execute(sql.replace("%s", "?"), list(params))
+        res = Result([d[0] for d in cur.description or []])
+        while len(res.rows) <= max_rows:
+            page = cur.fetchmany(min(PAGE_ROWS, max_rows + 1 - len(res.rows)))
+            if not page:
+                break
+            res.pages += 1
+            res.rows.extend([_jsonable(v) for v in row] for row in page)
+        cur.close()
+    finally:
+        conn.set_progress_handler(None, 0)
+    if len(res.rows) > max_rows:
+        del res.rows[max_rows:]
+        res.truncated = True
+    return res
+
+
+# ---------- entry point ----------
+_POOL: Optional[Pool[Any]] = None
+
+
+def backend() -> str:
+    if DATABASE_URL.startswith("sqlite:"):
+        return "sqlite"
+    return "postgres" if DATABASE_URL else ""
+
+
+def pool() -> Pool[Any]:
+    global _POOL
+    if _POOL is None:
+        if backend() == "sqlite":
+            _POOL = Pool(_sqlite_connect, _sqlite_close, lambda c: True)
+        else:
+            _POOL = Pool(_pg_connect, _pg_close, _pg_healthy)
+    return _POOL
+
+
+async def aclose() -> None:
+    """Close the pool's idle connections (server shutdown)."""
+    global _POOL
+    if _POOL is not None:
+        await _POOL.aclose()
+        _POOL = None
+
+
+async def run_query(
+    sql: str,
+    params: Optional[Sequence[Any]] = None,
+    max_rows: Optional[int] = None,
+    stream: bool = True,
+) -> Result:
+    """Raises NotReadOnly, PoolTimeout, or the driver's error."""
+    if not _READ_ONLY.match(sql or ""):
+        raise NotReadOnly("only SELECT / WITH / VALUES / TABLE / EXPLAIN / SHOW")
+    cap = max(1, min(max_rows or MAX_ROWS, MAX_ROWS))
+    params = list(params or [])
+    outcome = "error"
+    p = pool()
+    conn = await p.acquire()
+    t0 = time.perf_counter()
+    broken = False
+    try:
+        if backend() == "sqlite":
+            res = await asyncio.to_thread(_sqlite_query, conn, sql, params, cap)
+        else:
+            res = await _pg_query(conn, sql, params, cap, stream)
+        outcome = "truncated" if res.truncated else "ok"
+        return res
+    except asyncio.CancelledError:
+        broken = True  # a query may still be running on it
+        raise
+    finally:
+        QUERY_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - t0)
+        await p.release(conn, discard=broken)
+
+
+def _jsonable(v: Any) -> Any:
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, decimal.Decimal):
+        return str(v)
+    if isinstance(v, (dt.date, dt.time, dt.datetime)):
+        return v.isoformat()
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(v)).decode("ascii")
+    if isinstance(v, (list, tuple)):
+        return [_jsonable(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): _jsonable(x) for k, x in v.items()}
+    return str(v)  # uuid, interval, ranges, ...
@@ -0,0 +1,99 @@
+# mcp_server/embedding.py
+"""
+Text embedders for semantic search_prior_summaries.
+
+The default, HashingEmbedder, needs no model: character 3-5-grams and words
+are hashed (with a sign bit) into `dim` buckets, i.e. a sparse random
+projection of the n-gram count vector, then log-damped and L2-normalised.
+It matches shared word pieces ("sub-processor" / "subprocessors",
+"processing" / "processor"), not synonyms; plug a real model in for that.
+
+LEGAL_EMBEDDER selects the backend: "hashing" (default) or "module:factory",
+where factory() returns an object with `name`, `dim` and
+`embed(texts) -> float32 array (len(texts), dim)` of unit rows.
+"""
+
+from __future__ import annotations
+import importlib
+import os
+import re
+import zlib
+from typing import List, Protocol, Sequence
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_MASK64 = (1 << 64) - 1
+
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 256, ngrams: Sequence[int] = (3, 4, 5)):
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+        self.name = f"hashing-{dim}-{''.join(map(str, self.ngrams))}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i] = self._embed_one(text)
+        return out
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        norm = _NON_WORD.sub(" ", text.lower()).strip()
+        if not norm:
+            return np.zeros(self.dim, dtype=np.float32)
+        raw = np.frombuffer(f" {norm} ".encode("utf-8"), dtype=np.uint8)
+        b = raw.astype(np.uint64)
+        hashes: List[np.ndarray] = []
+        with np.errstate(over="ignore"):
+            for n in self.ngrams:
+                m = len(b) - n + 1
+                if m <= 0:
+                    continue
+                h = np.full(m, _FNV_OFFSET, dtype=np.uint64)
+                for j in range(n):  # FNV-1a over each window, all windows at once
+                    h = (h ^ b[j : j + m]) * _FNV_PRIME
+                hashes.append(h)
+        words = norm.split()
+        hashes.append(
+            np.fromiter(
+                (
+                    zlib.crc32(w.encode("utf-8")) * 0x9E3779B97F4A7C15 & _MASK64
+                    for w in words
+                ),
+                dtype=np.uint64,
+                count=len(words),
+            )
+            if words
+            else np.zeros(0, dtype=np.uint64)
+        )
+        h = np.concatenate(hashes)
+        h ^= h >> np.uint64(29)
+        buckets = (h % np.uint64(self.dim)).astype(np.intp)
+        signs = np.where(h >> np.uint64(63), -1.0, 1.0)
+        v = np.bincount(buckets, weights=signs, minlength=self.dim)
+        v = np.sign(v) * np.log1p(np.abs(v))
+        length = np.linalg.norm(v)
+        return (v / length if length else v).astype(np.float32)
+
+
+def load_embedder(spec: str = "", dim: int = 0) -> Embedder:
+    spec = (spec or os.getenv("LEGAL_EMBEDDER", "hashing")).strip()
+    dim = dim or int(os.getenv("LEGAL_EMBED_DIM", "256"))
+    if spec in ("", "hashing"):
+        return HashingEmbedder(dim)
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(
+            f"LEGAL_EMBEDDER={spec!r}: expected 'hashing' or 'module:factory'"
+        )
+    return getattr(importlib.import_module(module), attr)()
@@ -0,0 +1,444 @@
+# mcp_server/facet_index.py
+"""
+Facet index over stored gdpr_tags (query_gdpr_tags): boolean filters over
+tag values, with counts and pagination, without reading any summary.
+
+Every stored summary is a document (numbered in store order); re-storing a
+contract supersedes its previous document. Each gdpr_tags key yields facets:
+  key=value   one per list item (casefolded, whitespace collapsed), and
+              key=true / key=false for booleans
+  key~word    one per word of the list items, for `term` filters
+  key?        the key has a value (non-null, non-empty list)
+A facet's documents are a sorted posting list (array of uint32). Filters run
+on bitmaps: Python ints with bit i set for document i, so AND / OR / NOT are
+single big-int operations and a count is int.bit_count(). Bitmaps are made
+from posting lists when first used and then kept up to date as documents
+are added; at most `max_bitmaps` are kept (LRU), plus the live-document one.
+Value counts are bitmap popcounts for keys with few distinct values, else a
+bincount over the key's (document, value) pairs.
+
+Files under the index folder:
+  docs.jsonl     one line per document, append-only:
+                 [contract_id, id, created_at, gdpr_tags]
+  snapshot.npz   postings, pairs and line offsets for the first n documents,
+                 rewritten every `snapshot_every` documents
+Loading reads the snapshot and replays the lines after it; result pages read
+only their own lines.
+"""
+
+from __future__ import annotations
+import os
+import pathlib
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import orjson
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+BITMAP_COUNT_VALUES = 64  # keys with at most this many values count by bitmap
+_WORD = re.compile(r"\w+")
+
+Filter = Dict[str, Any]
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _norm(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return " ".join(str(value).split()).casefold()
+
+
+def _items(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return [
+        v
+        for v in (value if isinstance(value, list) else [value])
+        if v != "" and not isinstance(v, (dict, list))
+    ]
+
+
+@dataclass
+class _Field:
+    """Value table and (document, value) pairs of one gdpr_tags key."""
+
+    name: str
+    ids: Dict[str, int] = field(default_factory=dict)  # normalized -> value id
+    raw: Dict[str, int] = field(default_factory=dict)  # as stored -> value id
+    shown: List[str] = field(default_factory=list)  # value as first stored
+    facets: List[Tuple[str, ...]] = field(default_factory=list)  # per value id
+    docs: array = field(default_factory=lambda: array("I"))
+    vals: array = field(default_factory=lambda: array("I"))
+
+    def value_id(self, item: Any) -> int:
+        raw = item if isinstance(item, str) else repr(item)
+        vid = self.raw.get(raw)
+        if vid is None:
+            vid = self.raw[raw] = self._value(
+                _norm(item) if isinstance(item, bool) else str(item).strip()
+            )
+        return vid
+
+    def _value(self, shown: str) -> int:
+        norm = _norm(shown)
+        vid = self.ids.get(norm)
+        if vid is None:
+            vid = self.ids[norm] = len(self.shown)
+            self.shown.append(shown)
+            words = [] if norm in ("true", "false") else _WORD.findall(norm)
+            self.facets.append(
+                (f"{self.name}={norm}", *{f"{self.name}~{w}" for w in words})
+            )
+        return vid
+
+
+class FacetIndex:
+    def __init__(
+        self,
+        folder: Optional[str],
+        max_bitmaps: int = 1024,
+        snapshot_every: int = 100_000,
+    ):
+        self.dir = pathlib.Path(folder) if folder else None
+        self.max_bitmaps = max_bitmaps
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._n = 0
+        self._snapshot_n = 0
+        self._post: Dict[str, array] = {}
+        self._fields: Dict[str, _Field] = {}
+        self._bits: "OrderedDict[str, int]" = OrderedDict()
+        self._live = 0
+        self._latest: Dict[str, int] = {}  # contract_id -> document
+        self._meta_off = array("q", [0])
+        self._mem_meta: List[List[Any]] = []
+        if self.dir is not None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    # ---------- updates ----------
+    def add(
+        self,
+        doc_id: str,
+        contract_id: str,
+        tags: Optional[Dict[str, Any]],
+        created_at: int = 0,
+    ) -> None:
+        meta = [contract_id, doc_id, created_at, tags]
+        with self._lock:
+            if self.dir is not None:
+                line = orjson.dumps(meta) + b"\n"
+                with open(self.dir / "docs.jsonl", "ab") as f:
+                    f.write(line)
+                self._meta_off.append(self._meta_off[-1] + len(line))
+            else:
+                self._mem_meta.append(meta)
+            doc, old, keys = self._index(contract_id, tags)
+            bit = 1 << doc
+            for key in keys:
+                if key in self._bits:
+                    self._bits[key] |= bit
+            if old is not None:
+                self._live &= ~(1 << old)
+            self._live |= bit
+            if (
+                self.dir is not None
+                and self._n - self._snapshot_n >= self.snapshot_every
+            ):
+                self._snapshot()
+
+    def _index(
+        self, contract_id: str, tags: Optional[Dict[str, Any]]
+    ) -> Tuple[int, Optional[int], Set[str]]:
+        """Postings and pairs only (bitmaps are the caller's)."""
+        doc = self._n
+        self._n += 1
+        old = self._latest.get(contract_id)
+        self._latest[contract_id] = doc
+        keys: Set[str] = set()
+        for name, value in (tags or {}).items():
+            items = _items(value)
+            if not items:
+                continue
+            fld = self._fields.get(name)
+            if fld is None:
+                fld = self._fields[name] = _Field(name)
+            keys.add(f"{name}?")
+            seen: Set[int] = set()
+            for item in items:
+                vid = fld.value_id(item)
+                if vid not in seen:
+                    seen.add(vid)
+                    fld.docs.append(doc)
+                    fld.vals.append(vid)
+                    keys.update(fld.facets[vid])
+        for key in keys:
+            post = self._post.get(key)
+            if post is None:
+                post = self._post[key] = array("I")
+            post.append(doc)
+        return doc, old, keys
+
+    # ---------- bitmaps ----------
+    def _from_docs(self, docs: np.ndarray) -> int:
+        bits = np.zeros(self._n, dtype=bool)
+        bits[docs] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def _raw(self, bitmap: int) -> np.ndarray:
+        return np.frombuffer(bitmap.to_bytes((self._n + 7) // 8, "little"), np.uint8)
+
+    def _to_docs(self, bitmap: int, last: Optional[int] = None) -> np.ndarray:
+        """
+        Set bits, ascending (at least the `last` highest ones when given);
+        only non-zero bytes are unpacked.
+        """
+        raw = self._raw(bitmap)
+        nz = np.flatnonzero(raw)
+        if last is not None:
+            tail = np.cumsum(_POPCOUNT[raw[nz[::-1]]])
+            keep = min(int(np.searchsorted(tail, last)) + 1, len(nz))
+            nz = nz[len(nz) - keep :]
+        bits = np.unpackbits(raw[nz], bitorder="little").reshape(-1, 8)
+        rows, cols = np.nonzero(bits)
+        return nz[rows] * 8 + cols
+
+    def _to_mask(self, bitmap: int) -> np.ndarray:
+        bits = np.unpackbits(self._raw(bitmap), bitorder="little")
+        return bits[: self._n].view(bool)
+
+    def _bitmap(self, key: str) -> int:
+        bm = self._bits.get(key)
+        if bm is not None:
+            self._bits.move_to_end(key)
+            return bm
+        post = self._post.get(key)
+        if post is None:
+            return 0
+        bm = self._bits[key] = self._from_docs(np.frombuffer(post, np.uint32))
+        while len(self._bits) > self.max_bitmaps:
+            self._bits.popitem(last=False)
+        return bm
+
+    def _eval(self, f: Any) -> int:
+        if not isinstance(f, dict) or not (
+            "field" in f or len(f) == 1 and next(iter(f)) in ("and", "or", "not")
+        ):
+            raise InvalidFilter(f"not a filter: {f!r}")
+        if "and" in f or "or" in f:
+            op = "and" if "and" in f else "or"
+            parts = f[op]
+            if not isinstance(parts, list) or not parts:
+                raise InvalidFilter(f"{op!r} takes a non-empty list")
+            out = self._eval(parts[0])
+            for p in parts[1:]:
+                out = out & self._eval(p) if op == "and" else out | self._eval(p)
+            return out
+        if "not" in f:
+            return self._live & ~self._eval(f["not"])
+        key = f.get("field")
+        if not isinstance(key, str) or not key:
+            raise InvalidFilter(f"missing field: {f!r}")
+        if "value" in f:
+            if f["value"] is None:
+                return self._live & ~self._bitmap(f"{key}?")
+            return self._bitmap(f"{key}={_norm(f['value'])}")
+        if "any" in f and isinstance(f["any"], list):
+            out = 0
+            for v in f["any"]:
+                out |= self._bitmap(f"{key}={_norm(v)}")
+            return out
+        if "term" in f:
+            words = _WORD.findall(_norm(f["term"]))
+            if not words:
+                raise InvalidFilter(f"empty term: {f!r}")
+            out = self._bitmap(f"{key}~{words[0]}")
+            for w in words[1:]:
+                out &= self._bitmap(f"{key}~{w}")
+            return out
+        if "exists" in f:
+            present = self._bitmap(f"{key}?")
+            return present if f["exists"] else self._live & ~present
+        raise InvalidFilter(f"leaf needs value, any, term or exists: {f!r}")
+
+    # ---------- queries ----------
+    def query(
+        self,
+        filter: Optional[Filter] = None,
+        offset: int = 0,
+        limit: int = 20,
+        facet_keys: Iterable[str] = (),
+        facet_limit: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Live documents matching `filter` (all when None), newest first:
+        total count, one page of results, and the top `facet_limit` value
+        counts of each of `facet_keys` within the matches.
+        """
+        with self._lock:
+            matched = self._live if filter is None else self._eval(filter) & self._live
+            total = matched.bit_count()
+            page: List[int] = []
+            if offset < total and limit > 0:
+                docs = self._to_docs(matched, last=offset + limit)
+                end = len(docs) - offset
+                page = docs[max(0, end - limit) : end][::-1].tolist()
+            views: Dict[str, np.ndarray] = {}  # docs / mask, made on first use
+            counts = {
+                key: self._counts(key, matched, total, views, facet_limit)
+                for key in facet_keys
+            }
+            metas = [self._meta(d) for d in page]
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "results": [
+                {"id": m[1], "contract_id": m[0], "created_at": m[2], "gdpr_json": m[3]}
+                for m in metas
+            ],
+            "facets": counts,
+        }
+
+    def _counts(
+        self,
+        key: str,
+        matched: int,
+        total: int,
+        views: Dict[str, np.ndarray],
+        k: int,
+    ) -> List[Dict[str, Any]]:
+        """Top-k values of `key` among the matched documents."""
+        fld = self._fields.get(key)
+        if not total or fld is None:
+            return []
+        pair_docs = np.frombuffer(fld.docs, np.uint32)
+        vals = np.frombuffer(fld.vals, np.uint32)
+        if total * 32 < len(pair_docs):
+            # few matches: binary-search their pair ranges (pairs are in doc order)
+            if "docs" not in views:
+                views["docs"] = self._to_docs(matched)
+            docs = views["docs"]
+            lo = np.searchsorted(pair_docs, docs, side="left")
+            lens = np.searchsorted(pair_docs, docs, side="right") - lo
+            starts = np.repeat(lo - (np.cumsum(lens) - lens), lens)
+            counts = np.bincount(
+                vals[starts + np.arange(len(starts))], minlength=len(fld.shown)
+            )
+        elif len(fld.shown) <= BITMAP_COUNT_VALUES:
+            # few values (booleans, enums): one AND + popcount per value
+            counts = np.array(
+                [(matched & self._bitmap(f[0])).bit_count() for f in fld.facets]
+            )
+        else:
+            if "mask" not in views:
+                views["mask"] = self._to_mask(matched)
+            counts = np.bincount(
+                vals[views["mask"][pair_docs]], minlength=len(fld.shown)
+            )
+        top = np.flatnonzero(counts)
+        top = top[np.argsort(-counts[top], kind="stable")[:k]]
+        return [{"value": fld.shown[i], "count": int(counts[i])} for i in top.tolist()]
+
+    def _meta(self, doc: int) -> List[Any]:
+        if self.dir is None:
+            return self._mem_meta[doc]
+        a, b = self._meta_off[doc], self._meta_off[doc + 1]
+        with open(self.dir / "docs.jsonl", "rb") as f:
+            return orjson.loads(os.pread(f.fileno(), b - a, a))
+
+    # ---------- persistence ----------
+    def _snapshot(self) -> None:
+        assert self.dir is not None
+        names = list(self._post)
+        fields = list(self._fields.values())
+        # Any, not ndarray: savez's **kwds also cover its allow_pickle: bool
+        tables: Dict[str, Any] = {
+            "n": np.array([self._n], np.int64),
+            "meta_off": np.frombuffer(self._meta_off, np.int64),
+            "post_names": np.frombuffer(orjson.dumps(names), np.uint8),
+            "post_len": np.array([len(self._post[k]) for k in names], np.int64),
+            "post_docs": _concat([self._post[k] for k in names]),
+            "fields": np.frombuffer(
+                orjson.dumps([[f.name, f.shown] for f in fields]), np.uint8
+            ),
+            "pair_len": np.array([len(f.docs) for f in fields], np.int64),
+            "pair_docs": _concat([f.docs for f in fields]),
+            "pair_vals": _concat([f.vals for f in fields]),
+            "contracts": np.frombuffer(orjson.dumps(list(self._latest)), np.uint8),
+            "latest": np.fromiter(self._latest.values(), np.int64, len(self._latest)),
+        }
+        tmp = self.dir / "snapshot.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **tables)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.dir / "snapshot.npz")
+        self._snapshot_n = self._n
+
+    def _load_snapshot(self, size: int) -> None:
+        assert self.dir is not None
+        path = self.dir / "snapshot.npz"
+        if not path.exists():
+            return
+        with np.load(path) as z:
+            meta_off = z["meta_off"]
+            if int(meta_off[-1]) > size:
+                return  # docs.jsonl lost lines it covers: replay everything
+            self._n = self._snapshot_n = int(z["n"][0])
+            self._meta_off = array("q", meta_off.tobytes())
+            names = orjson.loads(z["post_names"].tobytes())
+            for name, part in zip(names, _split(z["post_docs"], z["post_len"])):
+                self._post[name] = array("I", part.tobytes())
+            fields = orjson.loads(z["fields"].tobytes())
+            pairs = zip(
+                _split(z["pair_docs"], z["pair_len"]),
+                _split(z["pair_vals"], z["pair_len"]),
+            )
+            for (name, shown), (docs, vals) in zip(fields, pairs):
+                fld = self._fields[name] = _Field(name)
+                for s in shown:
+                    fld._value(s)
+                fld.docs = array("I", docs.tobytes())
+                fld.vals = array("I", vals.tobytes())
+            contracts = orjson.loads(z["contracts"].tobytes())
+            self._latest = dict(zip(contracts, z["latest"].tolist()))
+
+    def _load(self) -> None:
+        assert self.dir is not None
+        path = self.dir / "docs.jsonl"
+        path.touch()
+        self._load_snapshot(path.stat().st_size)
+        with open(path, "rb") as f:
+            f.seek(self._meta_off[-1])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line
+                contract_id, _, _, tags = orjson.loads(line)
+                self._index(contract_id, tags)
+                self._meta_off.append(self._meta_off[-1] + len(line))
+        os.truncate(path, self._meta_off[-1])
+        self._live = self._from_docs(
+            np.fromiter(self._latest.values(), np.int64, len(self._latest))
+        )
+
+
+def _concat(parts: List[array]) -> np.ndarray:
+    if not parts:
+        return np.zeros(0, np.uint32)
+    return np.concatenate([np.frombuffer(p, np.uint32) for p in parts])
+
+
+def _split(flat: np.ndarray, lengths: np.ndarray) -> List[np.ndarray]:
+    return np.split(flat, np.cumsum(lengths)[:-1]) if len(lengths) else []
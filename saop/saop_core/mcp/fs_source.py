@@ -0,0 +1,142 @@
+# mcp_server/fs_source.py
+"""
+Filesystem source for fetch_contract_text.
+
+Only files under LEGAL_FS_ROOTS (os.pathsep- or comma-separated directories)
+are served; paths are resolved (symlinks, "..") before the check, and a
+relative path is taken relative to the first root. Files are mmap-ed; the
+path resolution and the read both run in a worker thread, so the event loop
+never waits on the share.
+
+sha256 is computed over the mapped bytes through a memoryview (no copy) and,
+as for urls, is the hash of the file's UTF-8 text. With `max_chars`, only the
+bytes needed for that many characters are decoded: the text covers that
+prefix and `truncated` says so, but the hash is still of the whole file, so
+it identifies the contract (stored summaries are looked up by it).
+"""
+
+from __future__ import annotations
+import asyncio
+import codecs
+import hashlib
+import mmap
+import os
+import pathlib
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .http_fetch import FETCH_BYTES, FETCH_SECONDS, FetchTooLarge
+
+ENCODING = os.getenv("LEGAL_FS_ENCODING", "utf-8")
+MAX_BYTES = int(os.getenv("LEGAL_FS_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def _roots() -> List[pathlib.Path]:
+    raw = os.getenv("LEGAL_FS_ROOTS", "")
+    parts = [p for chunk in raw.split(",") for p in chunk.split(os.pathsep)]
+    return [pathlib.Path(p).expanduser().resolve() for p in parts if p.strip()]
+
+
+ROOTS = _roots()
+
+
+class PathNotAllowed(Exception):
+    pass
+
+
+@dataclass
+class FileText:
+    text: str
+    sha256: str
+    bytes: int  # bytes read
+    size: int  # file size
+    truncated: bool
+
+
+def resolve(path: str, roots: Optional[List[pathlib.Path]] = None) -> pathlib.Path:
+    roots = ROOTS if roots is None else roots
+    if not roots:
+        raise PathNotAllowed("fs source disabled (LEGAL_FS_ROOTS not set)")
+    p = pathlib.Path(path).expanduser()
+    if not p.is_absolute():
+        p = roots[0] / p
+    p = p.resolve()
+    if not any(p == r or p.is_relative_to(r) for r in roots):
+        raise PathNotAllowed(f"{path} is outside LEGAL_FS_ROOTS")
+    return p
+
+
+def read_text(path: pathlib.Path, max_chars: Optional[int] = None) -> FileText:
+    """Blocking; call through asyncio.to_thread."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > MAX_BYTES and not max_chars:
+            raise FetchTooLarge(MAX_BYTES)
+        if size == 0:
+            return FileText("", hashlib.sha256().hexdigest(), 0, 0, False)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return _decode(view, size, max_chars)
+            finally:
+                view.release()
+
+
+def _decode(view: memoryview, size: int, max_chars: Optional[int]) -> FileText:
+    utf8 = codecs.lookup(ENCODING).name == "utf-8"
+    limit = size
+    if max_chars:
+        # a character is at most 4 bytes in UTF-8 (1 in single-byte codecs)
+        limit = min(size, max_chars * (4 if utf8 else 1))
+    limit = min(limit, MAX_BYTES)
+    decoder = codecs.getincrementaldecoder(ENCODING)()
+    text = decoder.decode(view[:limit], final=limit == size)
+    truncated = limit < size
+    if max_chars and len(text) > max_chars:
+        text, truncated = text[:max_chars], True
+    if utf8:
+        # the file is its UTF-8 text: hash the bytes in place
+        used = len(text.encode("utf-8")) if truncated else limit
+        digest = hashlib.sha256(view).hexdigest()
+    elif truncated:
+        used, digest = limit, _utf8_digest(view, size)
+    else:
+        used = limit
+        digest = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+    return FileText(text, digest, used, size, truncated)
+
+
+def _utf8_digest(view: memoryview, size: int, block: int = 1 << 20) -> str:
+    """sha256 of the UTF-8 re-encoding of a file in another encoding."""
+    decoder = codecs.getincrementaldecoder(ENCODING)()
+    h = hashlib.sha256()
+    for start in range(0, size, block):
+        part = decoder.decode(view[start : start + block], final=start + block >= size)
+        h.update(part.encode("utf-8", errors="ignore"))
+    return h.hexdigest()
+
+
+def load(path: str, max_chars: Optional[int] = None) -> FileText:
+    """resolve + read_text. Blocking; call through asyncio.to_thread."""
+    return read_text(resolve(path), max_chars)
+
+
+async def fetch_file(path: str, max_chars: Optional[int] = None) -> FileText:
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        res = await asyncio.to_thread(load, path, max_chars)
+        FETCH_BYTES.labels(source="fs").inc(res.bytes)
+        outcome = "ok"
+        return res
+    except PathNotAllowed:
+        outcome = "forbidden"
+        raise
+    except FetchTooLarge:
+        outcome = "too_large"
+        raise
+    finally:
+        FETCH_SECONDS.labels(source="fs", outcome=outcome).observe(
+            time.perf_counter() - t0
+        )
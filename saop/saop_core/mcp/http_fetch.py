@@ -0,0 +1,202 @@
+# mcp_server/http_fetch.py
+"""
+Pooled, streamed HTTP GET for the url source of fetch_contract_text.
+
+One aiohttp session per process (created on first use, closed by `aclose()`
+from the server lifespan, see mcp_tools_registry.lifespan): keep-alive
+connections, at most LEGAL_FETCH_LIMIT_PER_HOST per host, DNS answers cached
+for LEGAL_FETCH_DNS_TTL seconds. Bodies are read in chunks, decoded and
+sha256-hashed as they arrive, and cut off at LEGAL_FETCH_MAX_BYTES, so a large
+document is never held as bytes + text + a second hashing copy at once.
+
+With LEGAL_FETCH_CACHE_DIR set, responses carrying an ETag / Last-Modified
+are also kept on disk (see url_cache) and revalidated with a conditional GET.
+A 304 the cache cannot answer is retried once without the validators.
+
+The hash is the sha256 of the UTF-8 text, as before (for UTF-8 bodies that is
+the raw bytes, which are hashed directly).
+"""
+
+from __future__ import annotations
+import asyncio
+import codecs
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from prometheus_client import Counter, Histogram
+
+from .url_cache import Entry, UrlCache
+
+MAX_BYTES = int(os.getenv("LEGAL_FETCH_MAX_BYTES", str(64 * 1024 * 1024)))
+CHUNK_BYTES = int(os.getenv("LEGAL_FETCH_CHUNK_BYTES", "65536"))
+LIMIT = int(os.getenv("LEGAL_FETCH_LIMIT", "64"))
+LIMIT_PER_HOST = int(os.getenv("LEGAL_FETCH_LIMIT_PER_HOST", "8"))
+DNS_TTL = int(os.getenv("LEGAL_FETCH_DNS_TTL", "300"))
+TIMEOUT = float(os.getenv("LEGAL_FETCH_TIMEOUT", "30"))
+CACHE_DIR = os.getenv("LEGAL_FETCH_CACHE_DIR", "").strip()
+CACHE_MAX_BYTES = int(os.getenv("LEGAL_FETCH_CACHE_MAX_BYTES", str(1024**3)))
+
+FETCH_SECONDS = Histogram(
+    "saop_mcp_fetch_seconds",
+    "fetch_contract_text wall time by source and outcome",
+    ["source", "outcome"],
+)
+FETCH_BYTES = Counter(
+    "saop_mcp_fetch_bytes_total", "Body bytes read by fetch_contract_text", ["source"]
+)
+
+
+class FetchTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"body exceeds {limit} bytes")
+        self.limit = limit
+
+
+@dataclass
+class Fetched:
+    text: str
+    sha256: str
+    bytes: int
+    charset: str
+    cache: Dict[str, Any] = field(default_factory=dict)  # per-call cache report
+
+
+_SESSION: Optional[aiohttp.ClientSession] = None
+CACHE: Optional[UrlCache] = UrlCache(CACHE_DIR, CACHE_MAX_BYTES) if CACHE_DIR else None
+
+
+def session() -> aiohttp.ClientSession:
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=LIMIT,
+                limit_per_host=LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_TTL,
+                use_dns_cache=True,
+            ),
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT or None),
+        )
+    return _SESSION
+
+
+async def aclose() -> None:
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
+async def fetch_text(
+    url: str, max_bytes: int = MAX_BYTES, cache: Optional[UrlCache] = None
+) -> Fetched:
+    """
+    GET `url` as text; raises FetchTooLarge past `max_bytes` (decoded body).
+    With a cache, a known URL is revalidated and a 304 is served from disk.
+    """
+    cache = cache if cache is not None else CACHE
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        fetched = await _get(url, max_bytes, cache)
+        if fetched is None:  # 304 but no cached copy: fetch unconditionally
+            fetched = await _get(url, max_bytes, cache, conditional=False)
+        assert fetched is not None
+        outcome = "not_modified" if fetched.cache.get("status") == "hit" else "ok"
+        return fetched
+    except FetchTooLarge:
+        outcome = "too_large"
+        raise
+    finally:
+        FETCH_SECONDS.labels(source="url", outcome=outcome).observe(
+            time.perf_counter() - t0
+        )
+
+
+async def _get(
+    url: str, max_bytes: int, cache: Optional[UrlCache], conditional: bool = True
+) -> Optional[Fetched]:
+    """None for a 304 the cache cannot answer (no entry for the url, or its
+    blob is gone); the caller then refetches without validators."""
+    entry = cache.lookup(url) if cache is not None and conditional else None
+    headers = UrlCache.conditional_headers(entry) if entry is not None else {}
+    async with session().get(url, headers=headers) as resp:
+        if resp.status == 304:
+            if not conditional:
+                raise aiohttp.ClientResponseError(
+                    resp.request_info,
+                    resp.history,
+                    status=resp.status,
+                    message="304 Not Modified for an unconditional GET",
+                    headers=resp.headers,
+                )
+            if cache is None or entry is None:
+                return None
+            text = await asyncio.to_thread(cache.read, entry)
+            if text is None:
+                return None
+            return Fetched(
+                text,
+                entry.sha256,
+                entry.bytes,
+                "utf-8",
+                cache=cache.record("hit", entry.bytes),
+            )
+        resp.raise_for_status()
+        if resp.content_length is not None and resp.content_length > max_bytes:
+            raise FetchTooLarge(max_bytes)
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        cacheable = (
+            cache is not None
+            and bool(etag or last_modified)
+            and "no-store" not in resp.headers.get("Cache-Control", "").lower()
+        )
+        charset = resp.charset or "utf-8"
+        utf8 = codecs.lookup(charset).name == "utf-8"
+        decoder = codecs.getincrementaldecoder(charset)()
+        h = hashlib.sha256()
+        parts: List[str] = []
+        total = 0
+        # the blob is written as the body streams (UTF-8, what gets hashed)
+        tmp = cache.tmp_path() if cacheable and cache is not None else None
+        sink = await asyncio.to_thread(open, tmp, "wb") if tmp else None
+        try:
+            async for block in resp.content.iter_chunked(CHUNK_BYTES):
+                total += len(block)
+                if total > max_bytes:
+                    raise FetchTooLarge(max_bytes)
+                piece = decoder.decode(block)
+                data = block if utf8 else piece.encode("utf-8", errors="ignore")
+                h.update(data)
+                if sink is not None:
+                    await asyncio.to_thread(sink.write, data)
+                parts.append(piece)
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                parts.append(tail)
+                if not utf8:
+                    data = tail.encode("utf-8", errors="ignore")
+                    h.update(data)
+                    if sink is not None:
+                        await asyncio.to_thread(sink.write, data)
+        except BaseException:
+            if sink is not None and tmp is not None:
+                sink.close()
+                tmp.unlink(missing_ok=True)
+            raise
+        FETCH_BYTES.labels(source="url").inc(total)
+        sha256 = h.hexdigest()
+        report: Dict[str, Any] = {"status": "bypass"}
+        if cache is not None:
+            if sink is not None and tmp is not None:
+                await asyncio.to_thread(sink.close)
+                await asyncio.to_thread(
+                    cache.commit, Entry(url, sha256, etag, last_modified, total), tmp
+                )
+            report = cache.record("miss" if cacheable else "bypass")
+        return Fetched("".join(parts), sha256, total, charset, cache=report)
@@ -1,22 +1,104 @@
 # mcp_server/legal_tool_defs.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Protocol
+import asyncio
 import os
 import time
 import hashlib
-import json
+import uuid
 
-import aiohttp
+from .fs_source import PathNotAllowed, fetch_file
+from .http_fetch import FetchTooLarge, fetch_text
+from . import db
+from ..singleflight import SingleFlight
+from .embedding import load_embedder
+from .facet_index import FacetIndex, InvalidFilter
+from .lsh_index import LSHIndex, SignatureSizeMismatch
+from .search_index import BM25Index
+from .summary_store import Summary, SummaryStore
+from .vector_index import VectorIndex
 
 
-# import asyncpg
-DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
+_STORE_TO_FILES = os.getenv("LEGAL_STORE_TO_FILES", "false").lower() == "true"
+SUMMARY_STORE = SummaryStore(
+    os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries") if _STORE_TO_FILES else None
+)
+SEARCH_INDEX = BM25Index(
+    (
+        os.getenv(
+            "LEGAL_INDEX_FOLDER",
+            os.path.join(
+                os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries"), "index"
+            ),
+        )
+        if _STORE_TO_FILES
+        else None
+    ),
+    compact_every=int(os.getenv("LEGAL_INDEX_COMPACT_EVERY", "5000")),
+)
+VECTOR_INDEX = VectorIndex(
+    (
+        os.getenv(
+            "LEGAL_VECTOR_FOLDER",
+            os.path.join(
+                os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries"), "vectors"
+            ),
+        )
+        if _STORE_TO_FILES
+        else None
+    ),
+    load_embedder(),
+    nlist=int(os.getenv("LEGAL_VECTOR_NLIST", "0")),
+    nprobe=int(os.getenv("LEGAL_VECTOR_NPROBE", "8")),
+)
+LSH_INDEX = LSHIndex(
+    (
+        os.getenv(
+            "LEGAL_LSH_FOLDER",
+            os.path.join(
+                os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries"), "lsh"
+            ),
+        )
+        if _STORE_TO_FILES
+        else None
+    ),
+    num_perm=int(os.getenv("LEGAL_LSH_NUM_PERM", "128")),
+    bands=int(os.getenv("LEGAL_LSH_BANDS", "16")),
+)
+FACET_INDEX = FacetIndex(
+    (
+        os.getenv(
+            "LEGAL_FACET_FOLDER",
+            os.path.join(
+                os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries"), "facets"
+            ),
+        )
+        if _STORE_TO_FILES
+        else None
+    ),
+    max_bitmaps=int(os.getenv("LEGAL_FACET_MAX_BITMAPS", "1024")),
+    snapshot_every=int(os.getenv("LEGAL_FACET_SNAPSHOT_EVERY", "100000")),
+)
+
+
+class _Searchable(Protocol):
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]: ...
+
+
+# search_prior_summaries modes
+SEARCH_MODES: Dict[str, _Searchable] = {
+    "keyword": SEARCH_INDEX,
+    "semantic": VECTOR_INDEX,
+}
+
+# concurrent deliveries of one write-behind job store it once
+_STORE_FLIGHTS = SingleFlight("store_summary")
 
 
 # ---------- Utilities ----------
 def _now_id(prefix: str = "sum") -> str:
-    # Deterministic-ish synthetic id (no DB required)
-    return f"{prefix}_{int(time.time()*1000)}"
+    # Unique synthetic id (no DB required); the time is kept as created_at
+    return f"{prefix}_{uuid.uuid4().hex}"
 
 
 def _sha256_text(text: str) -> str:
@@ -28,62 +110,84 @@ async def fetch_contract_text(
     source: str,
     contract_id: Optional[str] = None,
     path_or_url: Optional[str] = None,
+    max_chars: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Fetch contract plaintext by source. Today:
-      - url: fetch via HTTP GET
-      - db/s3/gcs/fs: return a structured "unsupported" error to keep the API stable
+      - url: streamed HTTP GET on the shared session (see http_fetch), capped
+        at LEGAL_FETCH_MAX_BYTES; conditional GET against the on-disk cache when
+        LEGAL_FETCH_CACHE_DIR is set (`cache` reports hit/miss, bytes saved)
+      - fs: mmap-ed file under LEGAL_FS_ROOTS (see fs_source); with `max_chars`
+        only that prefix is read (`truncated` says whether the file is longer)
+      - db/s3/gcs: return a structured "unsupported" error to keep the API stable
     """
     source = (source or "").lower()
     if source == "url":
         if not path_or_url:
             return {"error": "missing_path_or_url"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(path_or_url) as resp:
-                resp.raise_for_status()
-                text = await resp.text()
-                return {
-                    "contract_id": contract_id or path_or_url,
-                    "text": text,
-                    "source_uri": path_or_url,
-                    "sha256": _sha256_text(text),
-                }
+        try:
+            fetched = await fetch_text(path_or_url)
+        except FetchTooLarge as e:
+            return {"error": "too_large", "max_bytes": e.limit}
+        return {
+            "contract_id": contract_id or path_or_url,
+            "text": fetched.text,
+            "source_uri": path_or_url,
+            "sha256": fetched.sha256,
+            "bytes": fetched.bytes,
+            "cache": fetched.cache,
+        }
+
+    if source == "fs":
+        if not path_or_url:
+            return {"error": "missing_path_or_url"}
+        try:
+            f = await fetch_file(path_or_url, max_chars=max_chars)
+        except PathNotAllowed as e:
+            return {"error": "path_not_allowed", "detail": str(e)}
+        except FetchTooLarge as e:
+            return {"error": "too_large", "max_bytes": e.limit}
+        except FileNotFoundError:
+            return {"error": "not_found"}
+        except IsADirectoryError as e:
+            return {"error": "not_a_file", "detail": str(e)}
+        except PermissionError as e:
+            return {"error": "permission_denied", "detail": str(e)}
+        except UnicodeDecodeError as e:
+            return {"error": "decode_failed", "detail": str(e)}
+        return {
+            "contract_id": contract_id or path_or_url,
+            "text": f.text,
+            "source_uri": path_or_url,
+            "sha256": f.sha256,
+            "bytes": f.bytes,
+            "size": f.size,
+            "truncated": f.truncated,
+        }
 
     # Stubs you can implement later
-    if source in {"db", "s3", "gcs", "fs"}:
+    if source in {"db", "s3", "gcs"}:
         return {"error": f"unsupported_source_{source}"}
 
     return {"error": "unsupported_source"}
 
 
 # ---------- Tool: search_prior_summaries ----------
-async def search_prior_summaries(query: str, limit: int = 5) -> Dict[str, Any]:
+async def search_prior_summaries(
+    query: str, limit: int = 5, mode: str = "keyword"
+) -> Dict[str, Any]:
     """
-    Returns sample results now so the agent can learn how to use this tool.
-    Replace with a real search when you have storage (DB, vector store, etc.).
+    Latest summary per contract, best first.
+      - keyword: BM25 over title, parties, contract_id and summary text
+      - semantic: embedding similarity over summaries and chunk summaries
+        (see vector_index); `match` / `heading` tell which one hit
     """
     query = (query or "").strip()
-    sample = [
-        {
-            "id": "demo_001",
-            "contract_id": "acme-2023-msa",
-            "title": "ACME Master Services Agreement 2023",
-            "hash": "deadbeef",
-            "preview": "Summary: ACME provides services; customer data processed under DPA…",
-        },
-        {
-            "id": "demo_002",
-            "contract_id": "acme-2024-dpa",
-            "title": "ACME Data Processing Addendum 2024",
-            "hash": "cafebabe",
-            "preview": "GDPR lawful bases include contract and legitimate interest; SCCs present…",
-        },
-    ]
-    # Simple filter for the mock
-    out = [
-        r for r in sample if query.lower() in (r["title"] + r["contract_id"]).lower()
-    ]
-    return {"results": out[: max(1, int(limit))]}
+    index = SEARCH_MODES.get(mode)
+    if index is None:
+        return {"error": f"unsupported_mode_{mode}"}
+    results = await asyncio.to_thread(index.search, query, max(1, min(int(limit), 50)))
+    return {"results": results, "mode": mode}
 
 
 # ---------- Tool: store_summary ----------
@@ -92,56 +196,263 @@ async def store_summary(
     summary_md: str,
     gdpr_json: Optional[Dict[str, Any]] = None,
     hash: Optional[str] = None,
+    chunks: Optional[List[Dict[str, Any]]] = None,
+    prompt_version: Optional[str] = None,
+    model: Optional[str] = None,
+    title: Optional[str] = None,
+    parties: Optional[List[str]] = None,
+    minhash: Optional[List[int]] = None,
+    sections: Optional[List[List[str]]] = None,
+    id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
-    No DB yet: return a synthetic id and echo what would be stored.
+    No DB yet: the record gets a synthetic id and, with LEGAL_STORE_TO_FILES,
+    is appended to the summary log (see summary_log) under its id and
+    contract_id; without, it is kept in memory only.
+    The summary is added to the search_prior_summaries indexes (with `title`
+    and `parties` when given; chunk summaries too for semantic search) and
+    its gdpr_json to the query_gdpr_tags facets, replacing the contract's
+    previous one.
+    `chunks` are per-chunk partials ({hash, index, heading, summary_md,
+    gdpr_json}) kept for incremental re-summarization of the next revision.
+    With the contract text `hash`, the summary is indexed by (hash,
+    prompt_version, model) for lookup_summary.
+    With `minhash` (the contract text's signature, see saop_core.minhash) and
+    its `sections` ([heading, fingerprint] per section), it is also indexed for
+    find_near_duplicates.
+    With `id` (e.g. the agent's write-behind job id) the record is stored
+    under that id, once: storing the same id again writes nothing and returns
+    the stored record's id with `duplicate: true`.
     """
     if not contract_id or not summary_md:
         return {"error": "missing_required_fields"}
+    if minhash and len(minhash) != LSH_INDEX.num_perm:
+        return {"error": "minhash_size_mismatch", "num_perm": LSH_INDEX.num_perm}
 
     content_hash = hash or _sha256_text(summary_md)
-    result_id = _now_id("legal")
-    # Optionally: persist to a file for debugging
-    if os.getenv("LEGAL_STORE_TO_FILES", "false").lower() == "true":
-        folder = os.getenv("LEGAL_STORE_FOLDER", "/tmp/legal_summaries")
-        os.makedirs(folder, exist_ok=True)
-        with open(
-            os.path.join(folder, f"{result_id}.json"), "w", encoding="utf-8"
-        ) as f:
-            json.dump(
-                {
-                    "id": result_id,
-                    "contract_id": contract_id,
-                    "hash": content_hash,
-                    "summary_md": summary_md,
-                    "gdpr_json": gdpr_json,
-                    "model": os.getenv("MODEL_NAME", "unknown"),
-                    "created_at": int(time.time()),
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
-
-    return {
+    result_id = id or _now_id("legal")
+    model_name: str = model or os.getenv("MODEL_NAME") or "unknown"
+    record: Summary = {
         "id": result_id,
+        "contract_id": contract_id,
         "hash": content_hash,
-        "stored": bool(os.getenv("LEGAL_STORE_TO_FILES", "false").lower() == "true"),
+        "summary_md": summary_md,
+        "gdpr_json": gdpr_json,
+        "chunk_hashes": [c.get("hash") for c in chunks or []],
+        "prompt_version": prompt_version,
+        "model": model_name,
+        "created_at": int(time.time()),
+    }
+
+    async def put() -> Dict[str, Any]:
+        stored = await SUMMARY_STORE.get_stored(id=id) if id else None
+        if stored is not None:
+            return {
+                "id": stored["id"],
+                "hash": stored["hash"],
+                "chunks": len(stored.get("chunk_hashes") or []),
+                "stored": _STORE_TO_FILES,
+                "duplicate": True,
+            }
+        # log writes are group-committed off the loop; indexes update in threads
+        _, stored_chunks, *_ = await asyncio.gather(
+            SUMMARY_STORE.put_summary(record, hash, prompt_version or "", model_name),
+            SUMMARY_STORE.put(contract_id, chunks or []),
+            asyncio.to_thread(
+                SEARCH_INDEX.add,
+                result_id,
+                contract_id,
+                summary_md,
+                title or "",
+                parties or [],
+                content_hash,
+            ),
+            asyncio.to_thread(
+                VECTOR_INDEX.add,
+                result_id,
+                contract_id,
+                [("summary", "", summary_md)]
+                + [
+                    ("chunk", c.get("heading") or "", c.get("summary_md") or "")
+                    for c in chunks or []
+                ],
+                title or "",
+                content_hash,
+            ),
+            asyncio.to_thread(
+                _index_minhash, result_id, contract_id, minhash, sections, record
+            ),
+            asyncio.to_thread(
+                FACET_INDEX.add, result_id, contract_id, gdpr_json, record["created_at"]
+            ),
+        )
+        return {
+            "id": result_id,
+            "hash": content_hash,
+            "chunks": stored_chunks,
+            "stored": _STORE_TO_FILES,
+        }
+
+    # a retried or replayed job is stored once, even when deliveries overlap
+    return await (_STORE_FLIGHTS.do(id, put) if id else put())
+
+
+def _index_minhash(
+    result_id: str,
+    contract_id: str,
+    minhash: Optional[List[int]],
+    sections: Optional[List[List[str]]],
+    record: Dict[str, Any],
+) -> None:
+    if minhash:
+        LSH_INDEX.add(
+            result_id,
+            contract_id,
+            minhash,
+            [(s[0], s[1]) for s in sections or []],
+            record["hash"],
+            record["prompt_version"] or "",
+            record["model"],
+        )
+
+
+# ---------- Tool: find_near_duplicates ----------
+async def find_near_duplicates(
+    minhash: List[int],
+    threshold: float = 0.8,
+    limit: int = 5,
+    prompt_version: str = "",
+    model: str = "",
+) -> Dict[str, Any]:
+    """
+    Stored summaries whose contract text is a near copy of the one behind
+    `minhash` (see lsh_index): estimated Jaccard similarity of word shingles
+    >= `threshold`, best first, latest summary per contract. Each result has
+    the summary `id` and the stored contract's `sections` ([heading,
+    fingerprint]) so the caller can tell which sections changed. With
+    `prompt_version` / `model`, only summaries made with them.
+    """
+    if not minhash:
+        return {"error": "missing_minhash"}
+    try:
+        results = await asyncio.to_thread(
+            LSH_INDEX.near,
+            minhash,
+            min(max(float(threshold), 0.0), 1.0),
+            max(1, min(int(limit), 50)),
+            prompt_version,
+            model,
+        )
+    except SignatureSizeMismatch as e:
+        return {"error": "minhash_size_mismatch", "detail": str(e)}
+    return {"results": results}
+
+
+# ---------- Tool: query_gdpr_tags ----------
+async def query_gdpr_tags(
+    filter: Optional[Dict[str, Any]] = None,
+    offset: int = 0,
+    limit: int = 20,
+    facets: Optional[List[str]] = None,
+    facet_limit: int = 10,
+) -> Dict[str, Any]:
+    """
+    Latest summaries whose gdpr_json matches `filter` (see facet_index),
+    newest first: `total`, one page (`offset`, `limit`) with id, contract_id
+    and gdpr_json, and the top `facet_limit` value counts of each key in
+    `facets` over all matches. No filter matches every contract.
+    Filters nest:
+      {"and": [f, ...]}, {"or": [f, ...]}, {"not": f}
+      {"field": k, "value": v}       exact item / boolean; null = no value
+      {"field": k, "any": [v, ...]}  any of the items
+      {"field": k, "term": "us"}     all words appear in k's items
+      {"field": k, "exists": true}
+    e.g. transfers to the US and no DPA:
+      {"and": [{"field": "cross_border_transfers", "term": "us"},
+               {"not": {"field": "dpa_present", "value": true}}]}
+    """
+    try:
+        return await asyncio.to_thread(
+            FACET_INDEX.query,
+            filter,
+            max(0, int(offset)),
+            max(0, min(int(limit), 100)),
+            facets or [],
+            max(1, min(int(facet_limit), 100)),
+        )
+    except InvalidFilter as e:
+        return {"error": "invalid_filter", "detail": str(e)}
+
+
+# ---------- Tool: get_summary ----------
+async def get_summary(
+    id: Optional[str] = None, contract_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    A stored summary by its id (as returned by store_summary and the search
+    tools), or the latest one for `contract_id`. Needs LEGAL_STORE_TO_FILES.
+    """
+    if not id and not contract_id:
+        return {"error": "missing_id_or_contract_id"}
+    summary = await SUMMARY_STORE.get_stored(id, contract_id)
+    return {"found": summary is not None, "summary": summary}
+
+
+# ---------- Tool: lookup_summary ----------
+async def lookup_summary(
+    hash: str, prompt_version: str = "", model: str = ""
+) -> Dict[str, Any]:
+    """
+    Summary previously stored for the same contract text hash, prompt version
+    and model, if any. Lets the agent skip the model for an identical contract.
+    """
+    if not hash:
+        return {"error": "missing_hash"}
+    summary = await SUMMARY_STORE.get_summary(
+        hash, prompt_version, model or os.getenv("MODEL_NAME", "unknown")
+    )
+    return {"found": summary is not None, "summary": summary}
+
+
+# ---------- Tool: fetch_summary_chunks ----------
+async def fetch_summary_chunks(
+    contract_id: str, hashes: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Chunk partials stored with the latest summary of `contract_id`, keyed by
+    chunk hash (optionally only those in `hashes`).
+    """
+    if not contract_id:
+        return {"error": "missing_contract_id"}
+    return {
+        "contract_id": contract_id,
+        "chunks": await SUMMARY_STORE.get(contract_id, hashes),
     }
 
 
 # ---------- Tool: db_query (read-only gate) ----------
-async def db_query(sql: str, params: Optional[List[str]] = None) -> Dict[str, Any]:
+async def db_query(
+    sql: str,
+    params: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    stream: bool = True,
+) -> Dict[str, Any]:
     """
-    Read-only query placeholder. Without a schema or DATABASE_URL, return a polite error.
+    Parameterized (%s) read-only SQL against DATABASE_URL (Postgres, or a
+    sqlite:/// file), see db. At most `max_rows` rows (capped by
+    LEGAL_DB_MAX_ROWS); `truncated` says whether more were available.
     """
-    if not DATABASE_URL:
+    if not db.backend():
         return {
             "error": "database_unavailable",
             "detail": "No DATABASE_URL set; read-only DB not configured.",
         }
-
-    return {
-        "error": "not_implemented",
-        "detail": "DB driver not wired yet; add asyncpg section when ready.",
-    }
+    try:
+        res = await db.run_query(sql, params, max_rows, stream)
+    except db.NotReadOnly as e:
+        return {"error": "not_read_only", "detail": str(e)}
+    except db.PoolTimeout as e:
+        return {"error": "database_busy", "detail": str(e)}
+    except Exception as e:  # driver errors: syntax, timeout, permissions
+        return {"error": "query_failed", "detail": f"{type(e).__name__}: {e}"}
+    return res.as_dict()
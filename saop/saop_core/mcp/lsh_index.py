@@ -0,0 +1,283 @@
+# mcp_server/lsh_index.py
+"""
+MinHash LSH index over contract texts (find_near_duplicates): finds stored
+summaries whose contract is a near copy of a new one, e.g. the same template
+with other parties and dates. Signatures come from the agent (see
+saop_core.minhash); the text itself never reaches this index.
+
+Banding: a signature of `num_perm` slots is cut into `bands` bands of
+num_perm / bands slots, and two contracts are candidates when any band is
+equal. With 128 slots in 16 bands a pair at Jaccard similarity s is found
+with probability 1 - (1 - s^8)^16: 0.95 at s = 0.8, > 0.9999 at s = 0.9.
+Candidates are then ranked by the fraction of equal slots (the similarity
+estimate) and cut at the requested threshold.
+
+Files under the index folder, all append-only:
+  manifest.json   num_perm and bands (other settings refuse to load)
+  signatures.u32  row-major uint32 signatures, memory-mapped
+  meta.jsonl      per row: [contract_id, id, hash, prompt_version, model,
+                  sections]; `sections` is [[heading, fingerprint], ...]
+The latest row per contract is live; re-storing a contract supersedes it.
+
+Band keys live in one sorted array per band (binary search per query) plus
+an unsorted tail of recent rows that is scanned; the tail is merged in once
+it reaches MERGE_ROWS or 1/8 of the sorted rows, whichever is more.
+"""
+
+from __future__ import annotations
+import json
+import os
+import pathlib
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+MERGE_ROWS = 4096
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+Section = Tuple[str, str]  # heading, fingerprint
+
+
+class SignatureSizeMismatch(ValueError):
+    pass
+
+
+class LSHIndex:
+    def __init__(self, folder: Optional[str], num_perm: int = 128, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError(f"num_perm={num_perm} is not a multiple of bands={bands}")
+        self.dir = pathlib.Path(folder) if folder else None
+        self.num_perm = num_perm
+        self.bands = bands
+        self._lock = threading.Lock()
+        self._n = 0
+        self._dead = bytearray()
+        self._live: Dict[str, int] = {}  # contract_id -> row
+        # rows [0, _sorted): signatures mapped, band keys sorted per band
+        self._sorted = 0
+        self._sigs: np.ndarray = np.zeros((0, num_perm), dtype=np.uint32)
+        self._keys: np.ndarray = np.zeros((bands, 0), dtype=np.uint64)
+        self._order: np.ndarray = np.zeros((bands, 0), dtype=np.uint32)
+        # rows [_sorted, _n)
+        self._tail_sigs: List[np.ndarray] = []
+        self._tail_keys: List[np.ndarray] = []
+        self._tail_mat: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        # meta: line offsets into meta.jsonl, or the rows themselves in memory
+        self._meta_off = array("q", [0])
+        self._mem_meta: List[List[Any]] = []
+        if self.dir is not None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        """(rows, num_perm) signatures -> (rows, bands) band hashes."""
+        r = self.num_perm // self.bands
+        s = sigs.reshape(len(sigs), self.bands, r).astype(np.uint64)
+        h = np.zeros(s.shape[:2], dtype=np.uint64)
+        for j in range(r):  # wraps mod 2^64
+            h = h * _MIX + s[:, :, j]
+        return h
+
+    def _check(self, sig: Sequence[int]) -> np.ndarray:
+        if len(sig) != self.num_perm:
+            raise SignatureSizeMismatch(
+                f"signature has {len(sig)} slots, index uses {self.num_perm}"
+            )
+        return np.asarray(sig, dtype=np.uint32).reshape(1, self.num_perm)
+
+    # ---------- updates ----------
+    def add(
+        self,
+        doc_id: str,
+        contract_id: str,
+        sig: Sequence[int],
+        sections: Sequence[Section] = (),
+        hash: str = "",
+        prompt_version: str = "",
+        model: str = "",
+    ) -> None:
+        row_sig = self._check(sig)
+        meta = [
+            contract_id,
+            doc_id,
+            hash,
+            prompt_version,
+            model,
+            [[h, fp] for h, fp in sections],
+        ]
+        with self._lock:
+            row = self._n
+            if self.dir is not None:
+                line = orjson.dumps(meta) + b"\n"
+                # signature last: on load the row count is what both files agree on
+                with open(self.dir / "meta.jsonl", "ab") as f:
+                    f.write(line)
+                with open(self.dir / "signatures.u32", "ab") as f:
+                    f.write(row_sig.tobytes())
+                self._meta_off.append(self._meta_off[-1] + len(line))
+            else:
+                self._mem_meta.append(meta)
+            old = self._live.get(contract_id)
+            if old is not None:
+                self._dead[old] = 1
+            self._live[contract_id] = row
+            self._dead.append(0)
+            self._tail_sigs.append(row_sig)
+            self._tail_keys.append(self._band_keys(row_sig))
+            self._tail_mat = None
+            self._n += 1
+            if self._n - self._sorted >= max(MERGE_ROWS, self._sorted // 8):
+                self._merge()
+
+    def _merge(self) -> None:
+        """Fold the tail into the sorted band arrays (linear per band)."""
+        sigs, keys = self._tail()
+        start = self._sorted
+        order = np.argsort(keys, axis=0, kind="stable")
+        new_keys = np.empty((self.bands, self._n), dtype=np.uint64)
+        new_order = np.empty((self.bands, self._n), dtype=np.uint32)
+        for b in range(self.bands):
+            tk = keys[order[:, b], b]
+            pos = np.searchsorted(self._keys[b], tk, side="right")
+            new_keys[b] = np.insert(self._keys[b], pos, tk)
+            new_order[b] = np.insert(self._order[b], pos, order[:, b] + start)
+        self._keys, self._order = new_keys, new_order
+        if self.dir is not None:
+            self._sigs = _map_sigs(self.dir / "signatures.u32", self._n, self.num_perm)
+        else:
+            self._sigs = np.concatenate([self._sigs, sigs])
+        self._sorted = self._n
+        self._tail_sigs, self._tail_keys, self._tail_mat = [], [], None
+
+    def _tail(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._tail_mat is None:
+            if self._tail_sigs:
+                self._tail_mat = (
+                    np.concatenate(self._tail_sigs),
+                    np.concatenate(self._tail_keys),
+                )
+            else:
+                self._tail_mat = (
+                    np.zeros((0, self.num_perm), dtype=np.uint32),
+                    np.zeros((0, self.bands), dtype=np.uint64),
+                )
+        return self._tail_mat
+
+    # ---------- search ----------
+    def near(
+        self,
+        sig: Sequence[int],
+        threshold: float = 0.8,
+        k: int = 5,
+        prompt_version: str = "",
+        model: str = "",
+    ) -> List[Dict[str, Any]]:
+        """
+        Live rows with estimated similarity >= threshold, best first; only
+        those stored with `prompt_version` / `model` when given.
+        """
+        q = self._check(sig)
+        qk = self._band_keys(q)[0]
+        with self._lock:
+            tail_sigs, tail_keys = self._tail()
+            cands = [np.flatnonzero((tail_keys == qk).any(axis=1)) + self._sorted]
+            for b in range(self.bands):
+                keys = self._keys[b]
+                lo = int(np.searchsorted(keys, qk[b], side="left"))
+                hi = int(np.searchsorted(keys, qk[b], side="right"))
+                cands.append(self._order[b, lo:hi].astype(np.int64))
+            rows = np.unique(np.concatenate(cands))
+            if not len(rows):
+                return []
+            rows = rows[np.frombuffer(self._dead, np.uint8)[rows] == 0]
+            old, new = rows[rows < self._sorted], rows[rows >= self._sorted]
+            sigs = np.concatenate([self._sigs[old], tail_sigs[new - self._sorted]])
+            rows = np.concatenate([old, new])
+            sim = (sigs == q).mean(axis=1)
+            keep = sim >= threshold
+            rows, sim = rows[keep], sim[keep]
+            best = np.argsort(-sim, kind="stable")
+            out: List[Dict[str, Any]] = []
+            for i in best.tolist():
+                m = self._meta(int(rows[i]))
+                if (prompt_version and m[3] != prompt_version) or (
+                    model and m[4] != model
+                ):
+                    continue
+                out.append(
+                    {
+                        "id": m[1],
+                        "contract_id": m[0],
+                        "hash": m[2],
+                        "prompt_version": m[3],
+                        "model": m[4],
+                        "similarity": round(float(sim[i]), 4),
+                        "sections": m[5],
+                    }
+                )
+                if len(out) >= k:
+                    break
+            return out
+
+    def _meta(self, row: int) -> List[Any]:
+        if self.dir is None:
+            return self._mem_meta[row]
+        a, b = self._meta_off[row], self._meta_off[row + 1]
+        with open(self.dir / "meta.jsonl", "rb") as f:
+            return orjson.loads(os.pread(f.fileno(), b - a, a))
+
+    # ---------- persistence ----------
+    def _load(self) -> None:
+        assert self.dir is not None
+        manifest = self.dir / "manifest.json"
+        want = {"num_perm": self.num_perm, "bands": self.bands}
+        if manifest.exists():
+            have = json.loads(manifest.read_text("utf-8"))
+            if have != want:
+                raise ValueError(
+                    f"{self.dir}: built with {have}, configured {want}; "
+                    "use a new LEGAL_LSH_FOLDER or rebuild"
+                )
+        else:
+            manifest.write_text(json.dumps(want), encoding="utf-8")
+        meta_path, sig_path = self.dir / "meta.jsonl", self.dir / "signatures.u32"
+        meta_path.touch()
+        sig_path.touch()
+        owners: List[str] = []
+        with open(meta_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line
+                owners.append(orjson.loads(line)[0])
+                self._meta_off.append(self._meta_off[-1] + len(line))
+        row_bytes = 4 * self.num_perm
+        n = min(len(owners), sig_path.stat().st_size // row_bytes)
+        # cut a torn append back to n complete rows
+        os.truncate(meta_path, self._meta_off[n])
+        os.truncate(sig_path, n * row_bytes)
+        del self._meta_off[n + 1 :]
+        for row, contract_id in enumerate(owners[:n]):
+            self._live[contract_id] = row
+        dead = np.ones(n, dtype=np.uint8)
+        dead[list(self._live.values())] = 0
+        self._dead = bytearray(dead.tobytes())
+        self._n = self._sorted = n
+        self._sigs = _map_sigs(sig_path, n, self.num_perm)
+        keys = np.empty((self.bands, n), dtype=np.uint64)
+        for start in range(0, n, 1 << 16):
+            block = self._sigs[start : start + (1 << 16)]
+            keys[:, start : start + len(block)] = self._band_keys(block).T
+        self._order = np.argsort(keys, axis=1, kind="stable").astype(np.uint32)
+        self._keys = np.take_along_axis(keys, self._order.astype(np.int64), axis=1)
+
+
+def _map_sigs(path: pathlib.Path, n: int, num_perm: int) -> np.ndarray:
+    if not n:
+        return np.zeros((0, num_perm), dtype=np.uint32)
+    return np.memmap(path, dtype=np.uint32, mode="r", shape=(n, num_perm))
@@ -1,13 +1,36 @@
 # mcp_server/mcp_tools_registry.py
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastmcp import FastMCP
+from . import db, http_fetch
 from .legal_tool_defs import (
+    SUMMARY_STORE,
     fetch_contract_text,
     search_prior_summaries,
     store_summary,
+    fetch_summary_chunks,
+    lookup_summary,
+    get_summary,
+    find_near_duplicates,
+    query_gdpr_tags,
     db_query,
 )
 
 
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Server lifespan for these tools: FastMCP(..., lifespan=lifespan).
+    On shutdown closes the shared url-fetch session, the db pool and the
+    summary log (its writer thread flushes what is still queued)."""
+    try:
+        yield
+    finally:
+        await http_fetch.aclose()
+        await db.aclose()
+        await SUMMARY_STORE.aclose()
+
+
 def register_tools(mcp: FastMCP) -> None:
     @mcp.tool(name="fetch_contract_text", title="Fetch Contract Text")
     async def _fetch_contract_text(**kwargs):
@@ -21,6 +44,26 @@ def register_tools(mcp: FastMCP) -> None:
     async def _store_summary(**kwargs):
         return await store_summary(**kwargs)
 
+    @mcp.tool(name="fetch_summary_chunks", title="Fetch Summary Chunks")
+    async def _fetch_summary_chunks(**kwargs):
+        return await fetch_summary_chunks(**kwargs)
+
+    @mcp.tool(name="lookup_summary", title="Lookup Summary by Hash")
+    async def _lookup_summary(**kwargs):
+        return await lookup_summary(**kwargs)
+
+    @mcp.tool(name="get_summary", title="Get Stored Summary")
+    async def _get_summary(**kwargs):
+        return await get_summary(**kwargs)
+
+    @mcp.tool(name="find_near_duplicates", title="Find Near-Duplicate Contracts")
+    async def _find_near_duplicates(**kwargs):
+        return await find_near_duplicates(**kwargs)
+
+    @mcp.tool(name="query_gdpr_tags", title="Query GDPR Tags")
+    async def _query_gdpr_tags(**kwargs):
+        return await query_gdpr_tags(**kwargs)
+
     @mcp.tool(name="db_query", title="DB Query (read-only)")
     async def _db_query(**kwargs):
         return await db_query(**kwargs)
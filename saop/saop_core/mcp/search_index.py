@@ -0,0 +1,396 @@
+# mcp_server/search_index.py
+"""
+BM25 inverted index over stored summaries (search_prior_summaries).
+
+One document per contract_id (a re-stored contract replaces its previous
+summary). Title, parties and contract_id tokens count FIELD_BOOST times, the
+summary text once.
+
+Layout, Lucene-style:
+- base: an immutable index loaded from <dir>/index.bm25 (memory-mapped; see
+  _compact for the format), postings as flat uint32 doc ids / uint16 tfs
+  sliced per term;
+- delta: postings of documents added since, in growable arrays per term;
+- a tombstone byte per document for replaced summaries (dropped, and ids
+  renumbered, when the segments are merged).
+`add()` touches only the delta (no rebuild) and appends the document to
+<dir>/journal.jsonl; startup = mmap the base + replay the journal. Base and
+delta are merged into a new base file once the delta holds `compact_every`
+documents or 5% of the base, whichever is more (merges stay rare as the index
+grows, and the journal to replay stays bounded).
+
+Per-document metadata (ids, title, hash, preview) stays in the mapped file
+and is decoded only for the hits returned.
+
+Scoring is vectorised with numpy over the matched postings; top-k is picked
+with argpartition, then sorted.
+"""
+
+from __future__ import annotations
+import math
+import mmap
+import os
+import pathlib
+import re
+import struct
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to "
+    "was were will with shall any all such".split()
+)
+FIELD_BOOST = 3
+K1, B = 1.2, 0.75
+
+MAGIC = b"SAOPBM25"
+VERSION = 1
+# magic, version, n_docs, n_terms, n_postings, vocab_bytes, cids_bytes,
+# meta_bytes; then term offsets (u64), meta offsets (u64), doc lengths (u32),
+# posting doc ids (u32), posting tfs (u16), vocab ("\n"-joined, sorted),
+# contract ids ("\0"-joined), meta (one orjson array per document).
+_HEADER = struct.Struct("<8sIIQQQQQ")
+MERGE_RATIO = 20  # merge once the delta reaches 1/20 of the base
+
+Meta = Tuple[str, str, str, str, str]  # id, contract_id, title, hash, preview
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    def __init__(self, folder: Optional[str] = None, compact_every: int = 5000):
+        self.dir = pathlib.Path(folder) if folder else None
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        # per document
+        self._dl = array("I")  # token count (boosted)
+        self._dlf: np.ndarray = np.zeros(0, dtype=np.float32)  # cached as float
+        self._deleted = bytearray()
+        self._n_deleted = 0
+        self._cids: List[str] = []
+        self._by_contract: Dict[str, int] = {}
+        self._live = 0
+        self._live_len = 0
+        # base segment (from disk)
+        self._base_n = 0
+        self._base_terms: Dict[str, int] = {}
+        self._base_off: np.ndarray = np.zeros(1, dtype=np.uint64)
+        self._base_ids: np.ndarray = np.zeros(0, dtype=np.uint32)
+        self._base_tfs: np.ndarray = np.zeros(0, dtype=np.uint16)
+        self._meta_off: np.ndarray = np.zeros(1, dtype=np.uint64)
+        self._meta_blob: Any = b""  # memoryview over the mapped meta section
+        self._mmap: Optional[mmap.mmap] = None
+        # delta segment
+        self._delta: Dict[str, Tuple[array, array]] = {}
+        self._delta_meta: List[Meta] = []
+        if self.dir is not None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return self._live
+
+    # ---------- updates ----------
+    def add(
+        self,
+        doc_id: str,
+        contract_id: str,
+        summary: str,
+        title: str = "",
+        parties: Iterable[str] = (),
+        hash: str = "",
+    ) -> None:
+        record = {
+            "id": doc_id,
+            "contract_id": contract_id,
+            "summary": summary,
+            "title": title,
+            "parties": list(parties),
+            "hash": hash,
+        }
+        with self._lock:
+            self._index(record)
+            if self.dir is None:
+                return
+            with open(self.dir / "journal.jsonl", "ab") as f:
+                f.write(orjson.dumps(record) + b"\n")
+            if len(self._delta_meta) >= max(
+                self.compact_every, self._base_n // MERGE_RATIO
+            ):
+                self._compact()
+
+    def _index(self, r: Dict[str, Any]) -> None:
+        old = self._by_contract.get(r["contract_id"])
+        if old is not None and not self._deleted[old]:
+            self._deleted[old] = 1
+            self._n_deleted += 1
+            self._live -= 1
+            self._live_len -= self._dl[old]
+        tf: Dict[str, int] = {}
+        for t in tokenize(" ".join([r["title"], *r["parties"], r["contract_id"]])):
+            tf[t] = tf.get(t, 0) + FIELD_BOOST
+        for t in tokenize(r["summary"]):
+            tf[t] = tf.get(t, 0) + 1
+        doc = len(self._dl)
+        length = sum(tf.values())
+        self._dl.append(length)
+        self._deleted.append(0)
+        self._cids.append(r["contract_id"])
+        preview = " ".join(r["summary"].split())[:240]
+        self._delta_meta.append(
+            (r["id"], r["contract_id"], r["title"], r.get("hash") or "", preview)
+        )
+        self._by_contract[r["contract_id"]] = doc
+        self._live += 1
+        self._live_len += length
+        for t, n in tf.items():
+            ids, tfs = self._delta.get(t) or self._delta.setdefault(
+                t, (array("I"), array("H"))
+            )
+            ids.append(doc)
+            tfs.append(min(n, 0xFFFF))
+
+    # ---------- search ----------
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts_ids, parts_tfs = [], []
+        i = self._base_terms.get(term)
+        if i is not None:
+            a, b = int(self._base_off[i]), int(self._base_off[i + 1])
+            parts_ids.append(self._base_ids[a:b])
+            parts_tfs.append(self._base_tfs[a:b])
+        delta = self._delta.get(term)
+        if delta is not None:
+            parts_ids.append(np.frombuffer(delta[0], dtype=np.uint32))
+            parts_tfs.append(np.frombuffer(delta[1], dtype=np.uint16))
+        if not parts_ids:
+            return self._base_ids[:0], self._base_tfs[:0]
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_tfs[0]
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def _meta(self, doc: int) -> Meta:
+        if doc >= self._base_n:
+            return self._delta_meta[doc - self._base_n]
+        a, b = int(self._meta_off[doc]), int(self._meta_off[doc + 1])
+        return tuple(orjson.loads(self._meta_blob[a:b]))  # type: ignore[return-value]
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._live:
+                return []
+            n = len(self._dl)
+            if len(self._dlf) != n:
+                self._dlf = np.frombuffer(self._dl, dtype=np.uint32).astype(np.float32)
+            # BM25 length norm as a + b * dl
+            norm_a = np.float32(K1 * (1 - B))
+            norm_b = np.float32(K1 * B * self._live / self._live_len)
+            scores = np.zeros(n, dtype=np.float32)
+            for term in terms:
+                ids, tfs = self._postings(term)
+                if not len(ids):
+                    continue
+                df = min(len(ids), self._live)  # postings still hold replaced docs
+                idf = np.float32(math.log(1 + (self._live - df + 0.5) / (df + 0.5)))
+                tf = tfs.astype(np.float32)
+                norm = norm_a + norm_b * self._dlf[ids]
+                scores[ids] += idf * (K1 + 1) * tf / (tf + norm)
+            if self._n_deleted:
+                scores[np.frombuffer(self._deleted, dtype=np.bool_)] = 0
+            hits = np.flatnonzero(scores)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            out = []
+            for doc in hits.tolist():
+                doc_id, contract_id, title, h, preview = self._meta(doc)
+                out.append(
+                    {
+                        "id": doc_id,
+                        "contract_id": contract_id,
+                        "title": title or contract_id,
+                        "hash": h,
+                        "preview": preview,
+                        "score": round(float(scores[doc]), 4),
+                    }
+                )
+            return out
+
+    # ---------- persistence ----------
+    def _load(self) -> None:
+        assert self.dir is not None
+        base = self.dir / "index.bm25"
+        if base.exists():
+            self._read_base(base)
+        journal = self.dir / "journal.jsonl"
+        if journal.exists():
+            with open(journal, "rb") as f:
+                for line in f:
+                    try:
+                        self._index(orjson.loads(line))
+                    except (orjson.JSONDecodeError, KeyError):
+                        continue  # torn last line after a crash
+
+    def _read_base(self, path: pathlib.Path) -> None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_docs, n_terms, n_post, vocab_len, cids_len, meta_len = (
+            _HEADER.unpack_from(mm, 0)
+        )
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            raise ValueError(f"{path}: not a v{VERSION} BM25 index")
+        pos = _HEADER.size
+
+        def take(dtype: Any, count: int) -> np.ndarray:
+            nonlocal pos
+            arr = np.frombuffer(mm, dtype=dtype, count=count, offset=pos)
+            pos += arr.nbytes
+            return arr
+
+        def text(length: int, sep: str) -> List[str]:
+            nonlocal pos
+            raw = mm[pos : pos + length].decode("utf-8")
+            pos += length
+            return raw.split(sep) if raw else []
+
+        self._base_off = take(np.uint64, n_terms + 1)
+        self._meta_off = take(np.uint64, n_docs + 1)
+        self._dl = array("I", take(np.uint32, n_docs).tobytes())
+        self._base_ids = take(np.uint32, n_post)
+        self._base_tfs = take(np.uint16, n_post)
+        self._base_terms = {t: i for i, t in enumerate(text(vocab_len, "\n"))}
+        self._cids = text(cids_len, "\0")
+        self._meta_blob = memoryview(mm)[pos : pos + meta_len]
+        self._mmap = mm
+        self._base_n = n_docs
+        self._dlf = np.zeros(0, dtype=np.float32)
+        self._deleted = bytearray(n_docs)  # merges drop replaced documents
+        self._n_deleted = 0
+        self._delta, self._delta_meta = {}, []
+        self._by_contract = dict(zip(self._cids, range(n_docs)))
+        self._live = n_docs
+        self._live_len = int(np.frombuffer(self._dl, dtype=np.uint32).sum())
+
+    def _compact(self) -> None:
+        """
+        Merge base + delta into a new base file, dropping replaced documents
+        (ids are renumbered); caller holds the lock.
+
+        Vectorised: both segments' postings are laid out as (term, doc, tf)
+        columns over the merged vocabulary. Base and delta are each already in
+        term order, so the stable sort only merges two runs.
+        """
+        assert self.dir is not None
+        live = ~np.frombuffer(self._deleted, dtype=np.bool_)
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        base_vocab = list(self._base_terms)
+        delta_vocab = sorted(self._delta)
+        vocab = sorted(set(base_vocab).union(delta_vocab))
+        tid = {t: i for i, t in enumerate(vocab)}
+
+        def term_ids(terms: List[str], counts: np.ndarray) -> np.ndarray:
+            ids = np.fromiter((tid[t] for t in terms), dtype=np.int64, count=len(terms))
+            return np.repeat(ids, counts)
+
+        delta_lens = np.fromiter(
+            (len(self._delta[t][0]) for t in delta_vocab),
+            dtype=np.int64,
+            count=len(delta_vocab),
+        )
+        term = np.concatenate(
+            [
+                term_ids(base_vocab, np.diff(self._base_off).astype(np.int64)),
+                term_ids(delta_vocab, delta_lens),
+            ]
+        )
+        ids = np.concatenate(
+            [
+                self._base_ids,
+                np.frombuffer(
+                    b"".join(self._delta[t][0] for t in delta_vocab), dtype=np.uint32
+                ),
+            ]
+        )
+        tfs = np.concatenate(
+            [
+                self._base_tfs,
+                np.frombuffer(
+                    b"".join(self._delta[t][1] for t in delta_vocab), dtype=np.uint16
+                ),
+            ]
+        )
+        keep = live[ids]
+        term, ids, tfs = term[keep], remap[ids[keep]], tfs[keep]
+        order = np.argsort(term, kind="stable")
+        term, ids, tfs = term[order], ids[order], tfs[order]
+        counts = np.bincount(term, minlength=len(vocab))
+        present = counts > 0
+        terms = [t for t, p in zip(vocab, present.tolist()) if p]
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        np.cumsum(counts[present], out=offsets[1:])
+
+        docs = np.flatnonzero(live).tolist()
+        metas: List[bytes] = []
+        for doc in docs:
+            if doc < self._base_n:
+                a, b = int(self._meta_off[doc]), int(self._meta_off[doc + 1])
+                metas.append(self._meta_blob[a:b])
+            else:
+                metas.append(orjson.dumps(self._delta_meta[doc - self._base_n]))
+        meta_off = np.zeros(len(docs) + 1, dtype=np.uint64)
+        np.cumsum([len(m) for m in metas], out=meta_off[1:])
+        dl = np.frombuffer(self._dl, dtype=np.uint32)[live]
+        vocab_bytes = "\n".join(terms).encode("utf-8")
+        cids = "\0".join(self._cids[doc] for doc in docs).encode("utf-8")
+        path = self.dir / "index.bm25"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    len(docs),
+                    len(terms),
+                    len(ids),
+                    len(vocab_bytes),
+                    len(cids),
+                    int(meta_off[-1]),
+                )
+            )
+            f.write(offsets.tobytes())
+            f.write(meta_off.tobytes())
+            f.write(dl.tobytes())
+            f.write(ids.astype(np.uint32).tobytes())
+            f.write(tfs.tobytes())
+            f.write(vocab_bytes)
+            f.write(cids)
+            f.writelines(metas)
+            f.flush()
+            os.fsync(f.fileno())
+        del metas
+        os.replace(tmp, path)
+        (self.dir / "journal.jsonl").unlink(missing_ok=True)
+        old = self._mmap
+        self._meta_blob = b""
+        self._read_base(path)
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                pass  # a view is still alive; the map goes with it
+
+    def compact(self) -> None:
+        if self.dir is None:
+            return
+        with self._lock:
+            self._compact()
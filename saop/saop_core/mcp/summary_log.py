@@ -0,0 +1,440 @@
+# mcp_server/summary_log.py
+"""
+Append-only, segmented record log behind SummaryStore.
+
+    log = SummaryLog(folder)
+    loc = await log.put(["id:legal_1", "contract:acme"], record)
+    record = log.get("contract:acme")  # latest record put under that key
+
+Records are length-prefixed (u32 length, u32 crc32, orjson [keys, record])
+and appended to <folder>/segments/<n>.seg, rolling to a new segment at
+LEGAL_LOG_SEGMENT_BYTES. Nothing is written on the caller's thread: `put`
+hands the record to a writer thread, which group-commits whatever is queued
+(up to LEGAL_LOG_BATCH_MAX records; LEGAL_LOG_BATCH_WAIT_MS > 0 also waits
+for stragglers) with one fsync per batch, then resolves the callers. A put
+has returned once its record is durable.
+
+Index: key -> (segment, offset, length), latest put wins, in
+LEGAL_LOG_SHARDS dicts picked by the key's blake2b digest. Each commit
+appends its entries to <folder>/index/<shard>.idx (fixed 32-byte entries)
+and moves <folder>/index/checkpoint; startup loads the shards and re-indexes
+only the records past the checkpoint (a torn tail is cut off).
+
+Compaction runs in a background thread when a segment is sealed: sealed
+segments less than LEGAL_LOG_COMPACT_RATIO live are copied forward (only
+records some key still points to) and deleted, then the index shards are
+rewritten.
+"""
+
+from __future__ import annotations
+import asyncio
+import functools
+import hashlib
+import os
+import pathlib
+import queue
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+from prometheus_client import Counter, Histogram
+
+SEGMENT_BYTES = int(os.getenv("LEGAL_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+BATCH_MAX = int(os.getenv("LEGAL_LOG_BATCH_MAX", "256"))
+BATCH_WAIT = float(os.getenv("LEGAL_LOG_BATCH_WAIT_MS", "0")) / 1000
+SHARDS = int(os.getenv("LEGAL_LOG_SHARDS", "64"))
+COMPACT_RATIO = float(os.getenv("LEGAL_LOG_COMPACT_RATIO", "0.5"))
+
+LOG_APPENDS = Counter(
+    "saop_mcp_store_appends_total", "Records appended to the summary log"
+)
+LOG_BATCH = Histogram(
+    "saop_mcp_store_commit_records",
+    "Records per group commit (one fsync)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+LOG_COMMIT_SECONDS = Histogram(
+    "saop_mcp_store_commit_seconds", "Write + fsync time per group commit"
+)
+LOG_COMPACTED = Counter(
+    "saop_mcp_store_compacted_segments_total", "Segments rewritten by compaction"
+)
+
+_RECORD = struct.Struct("<II")  # payload length, crc32
+_ENTRY = np.dtype([("key", "V16"), ("seg", "<u4"), ("len", "<u4"), ("off", "<u8")])
+_CHECKPOINT = struct.Struct("<IQ")  # segment, offset indexed up to
+
+Loc = Tuple[int, int, int]  # segment, offset, length (header included)
+
+
+def key_digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass
+class _Put:
+    keys: Sequence[str]
+    payload: bytes
+    future: "Future[Loc]" = field(default_factory=Future)
+    expect: Optional[Loc] = None  # compaction: move keys only if still here
+
+
+class SummaryLog:
+    def __init__(
+        self,
+        folder: str,
+        segment_bytes: int = SEGMENT_BYTES,
+        batch_max: int = BATCH_MAX,
+        batch_wait: float = BATCH_WAIT,
+        shards: int = SHARDS,
+        compact_ratio: float = COMPACT_RATIO,
+    ):
+        self.root = pathlib.Path(folder)
+        self.seg_dir = self.root / "segments"
+        self.idx_dir = self.root / "index"
+        self.segment_bytes = segment_bytes
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()  # index + read fds
+        self._shards: List[Dict[bytes, Loc]] = [{} for _ in range(shards)]
+        self._sizes: Dict[int, int] = {}  # segment -> bytes
+        self._fds: Dict[int, int] = {}  # read handles
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._compacting = False
+        self._active = 0
+        self._active_size = 0
+        self._out: Any = None
+        self._idx_out: Dict[int, Any] = {}
+        self._load()
+        self._writer = threading.Thread(
+            target=self._run, name="summary-log", daemon=True
+        )
+        self._writer.start()
+
+    # ---------- api ----------
+    def submit(self, keys: Sequence[str], record: Any) -> "Future[Loc]":
+        put = _Put(list(keys), orjson.dumps([list(keys), record]))
+        self._queue.put(put)
+        return put.future
+
+    async def put(self, keys: Sequence[str], record: Any) -> Loc:
+        return await asyncio.wrap_future(self.submit(keys, record))
+
+    def get(self, key: str) -> Optional[Any]:
+        d = key_digest(key)
+        with self._lock:
+            loc = self._shard(d).get(d)
+            if loc is None:
+                return None
+            seg, off, length = loc
+            raw = os.pread(self._fd(seg), length, off)
+        return orjson.loads(raw[_RECORD.size :])[1]
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self._shards)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds = {}
+
+    # ---------- writer thread ----------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if callable(item):
+                item()
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            stop = None
+            while len(batch) < self.batch_max:
+                try:
+                    wait = deadline - time.monotonic()
+                    nxt = (
+                        self._queue.get(timeout=wait)
+                        if wait > 0
+                        else (self._queue.get_nowait())
+                    )
+                except queue.Empty:
+                    break
+                if nxt is None or callable(nxt):
+                    stop = nxt
+                    break
+                batch.append(nxt)
+            try:
+                self._commit(batch)
+            except Exception as e:  # disk full, I/O error: fail the callers
+                for put in batch:
+                    if not put.future.done():
+                        put.future.set_exception(e)
+            if stop is None:
+                continue
+            if callable(stop):
+                stop()
+                continue
+            break
+        self._close_writers()
+
+    def _commit(self, batch: List[_Put]) -> None:
+        t0 = time.perf_counter()
+        locs: List[Loc] = []
+        for put in batch:
+            if self._active_size >= self.segment_bytes:
+                self._roll()
+            header = _RECORD.pack(len(put.payload), zlib.crc32(put.payload))
+            self._out.write(header)
+            self._out.write(put.payload)
+            length = len(header) + len(put.payload)
+            locs.append((self._active, self._active_size, length))
+            self._active_size += length
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        LOG_COMMIT_SECONDS.observe(time.perf_counter() - t0)
+        LOG_BATCH.observe(len(batch))
+        LOG_APPENDS.inc(len(batch))
+        entries: Dict[int, List[Tuple[bytes, Loc]]] = {}
+        with self._lock:
+            self._sizes[self._active] = self._active_size
+            for put, loc in zip(batch, locs):
+                for key in put.keys:
+                    d = key_digest(key)
+                    shard = self._shard(d)
+                    if put.expect is not None and shard.get(d) != put.expect:
+                        continue
+                    shard[d] = loc
+                    entries.setdefault(d[0] % len(self._shards), []).append((d, loc))
+        for n, items in entries.items():
+            self._idx_file(n).write(_pack_entries(items))
+        for f in self._idx_out.values():
+            f.flush()
+        self._write_checkpoint()
+        for put, loc in zip(batch, locs):
+            put.future.set_result(loc)
+
+    def _roll(self) -> None:
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._out.close()
+        with self._lock:
+            self._sizes[self._active] = self._active_size
+            self._active += 1
+            self._active_size = 0
+            self._sizes[self._active] = 0
+        self._out = open(self._seg_path(self._active), "ab")
+        self._maybe_compact()
+
+    def _close_writers(self) -> None:
+        if self._out is not None:
+            self._out.close()
+        for f in self._idx_out.values():
+            f.close()
+        self._idx_out = {}
+
+    # ---------- compaction ----------
+    def _maybe_compact(self) -> None:
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(
+            target=self._compact, name="summary-log-compact", daemon=True
+        ).start()
+
+    def compact(self) -> None:
+        """Blocking; also run in the background whenever a segment is sealed."""
+        if self._compacting:
+            return
+        self._compacting = True
+        self._compact()
+
+    def _compact(self) -> None:
+        try:
+            with self._lock:
+                live: Dict[int, int] = {}
+                for loc in {loc for shard in self._shards for loc in shard.values()}:
+                    live[loc[0]] = live.get(loc[0], 0) + loc[2]
+                victims = [
+                    seg
+                    for seg, size in sorted(self._sizes.items())
+                    if seg != self._active
+                    and size
+                    and live.get(seg, 0) / size < self.compact_ratio
+                ]
+            for seg in victims:
+                moves = []
+                for off, length, payload in _scan(self._seg_path(seg)):
+                    keys = orjson.loads(payload)[0]
+                    loc = (seg, off, length)
+                    if any(self._lookup(k) == loc for k in keys):
+                        put = _Put(keys, payload, expect=loc)
+                        self._queue.put(put)
+                        moves.append(put.future)
+                for fut in moves:
+                    fut.result()
+                self._call(functools.partial(self._drop_segment, seg))
+                LOG_COMPACTED.inc()
+            if victims:
+                self._call(self._rewrite_index)
+        finally:
+            self._compacting = False
+
+    def _call(self, fn: Callable[[], None]) -> None:
+        """Run `fn` on the writer thread (ordered with the commits) and wait."""
+        done: "Future[None]" = Future()
+
+        def run() -> None:
+            try:
+                fn()
+                done.set_result(None)
+            except Exception as e:
+                done.set_exception(e)
+
+        self._queue.put(run)
+        done.result()
+
+    def _drop_segment(self, seg: int) -> None:
+        with self._lock:
+            fd = self._fds.pop(seg, None)
+            if fd is not None:
+                os.close(fd)
+            self._sizes.pop(seg, None)
+        self._seg_path(seg).unlink(missing_ok=True)
+
+    def _rewrite_index(self) -> None:
+        for f in self._idx_out.values():
+            f.close()
+        self._idx_out = {}
+        with self._lock:
+            snapshot = [list(shard.items()) for shard in self._shards]
+        for n, items in enumerate(snapshot):
+            path = self._idx_path(n)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(_pack_entries(items))
+            os.replace(tmp, path)
+        self._write_checkpoint()
+
+    # ---------- startup ----------
+    def _load(self) -> None:
+        self.seg_dir.mkdir(parents=True, exist_ok=True)
+        self.idx_dir.mkdir(parents=True, exist_ok=True)
+        segs = sorted(int(p.stem) for p in self.seg_dir.glob("*.seg"))
+        for seg in segs:
+            self._sizes[seg] = self._seg_path(seg).stat().st_size
+        self._active = segs[-1] if segs else 0
+        cp_seg, cp_off = 0, 0
+        cp = self.idx_dir / "checkpoint"
+        if cp.exists() and len(cp.read_bytes()) == _CHECKPOINT.size:
+            cp_seg, cp_off = _CHECKPOINT.unpack(cp.read_bytes())
+            for n in range(len(self._shards)):
+                self._read_shard(n)
+        else:
+            for n in range(len(self._shards)):
+                self._idx_path(n).unlink(missing_ok=True)
+        # re-index what the checkpoint does not cover, cut a torn tail
+        for seg in segs:
+            if seg < cp_seg:
+                continue
+            start = cp_off if seg == cp_seg else 0
+            end = start
+            for off, length, payload in _scan(self._seg_path(seg), start):
+                loc = (seg, off, length)
+                for key in orjson.loads(payload)[0]:
+                    d = key_digest(key)
+                    self._shard(d)[d] = loc
+                end = off + length
+            if end < self._sizes[seg]:
+                os.truncate(self._seg_path(seg), end)
+                self._sizes[seg] = end
+        self._active_size = self._sizes.get(self._active, 0)
+        self._out = open(self._seg_path(self._active), "ab")
+        self._sizes.setdefault(self._active, self._active_size)
+        self._rewrite_index()
+
+    def _read_shard(self, n: int) -> None:
+        path = self._idx_path(n)
+        if not path.exists():
+            return
+        raw = path.read_bytes()
+        entries = np.frombuffer(raw, dtype=_ENTRY, count=len(raw) // _ENTRY.itemsize)
+        shard = self._shards[n]
+        for key, seg, length, off in zip(
+            entries["key"].tolist(),
+            entries["seg"].tolist(),
+            entries["len"].tolist(),
+            entries["off"].tolist(),
+        ):
+            shard[key] = (seg, off, length)
+        # entries into segments that compaction removed are stale
+        for key in [k for k, loc in shard.items() if loc[0] not in self._sizes]:
+            del shard[key]
+
+    # ---------- helpers ----------
+    def _shard(self, digest: bytes) -> Dict[bytes, Loc]:
+        return self._shards[digest[0] % len(self._shards)]
+
+    def _lookup(self, key: str) -> Optional[Loc]:
+        d = key_digest(key)
+        with self._lock:
+            return self._shard(d).get(d)
+
+    def _fd(self, seg: int) -> int:
+        fd = self._fds.get(seg)
+        if fd is None:
+            fd = self._fds[seg] = os.open(self._seg_path(seg), os.O_RDONLY)
+        return fd
+
+    def _seg_path(self, seg: int) -> pathlib.Path:
+        return self.seg_dir / f"{seg:08d}.seg"
+
+    def _idx_path(self, n: int) -> pathlib.Path:
+        return self.idx_dir / f"{n:03d}.idx"
+
+    def _idx_file(self, n: int) -> Any:
+        f = self._idx_out.get(n)
+        if f is None:
+            f = self._idx_out[n] = open(self._idx_path(n), "ab")
+        return f
+
+    def _write_checkpoint(self) -> None:
+        tmp = self.idx_dir / "checkpoint.tmp"
+        tmp.write_bytes(_CHECKPOINT.pack(self._active, self._active_size))
+        os.replace(tmp, self.idx_dir / "checkpoint")
+
+
+def _pack_entries(items: Sequence[Tuple[bytes, Loc]]) -> bytes:
+    arr = np.empty(len(items), dtype=_ENTRY)
+    if items:
+        arr["key"] = [d for d, _ in items]
+        arr["seg"] = [loc[0] for _, loc in items]
+        arr["off"] = [loc[1] for _, loc in items]
+        arr["len"] = [loc[2] for _, loc in items]
+    return arr.tobytes()
+
+
+def _scan(path: pathlib.Path, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """(offset, length, payload) of the intact records from `start`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        off = start
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            size, crc = _RECORD.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return
+            yield off, _RECORD.size + size, payload
+            off += _RECORD.size + size
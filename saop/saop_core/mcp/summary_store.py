@@ -0,0 +1,163 @@
+# mcp_server/summary_store.py
+"""
+Lookup side of stored summaries.
+
+- Summaries by (text hash, prompt version, model): an identical contract that
+  was already summarized with the same prompt and model is answered from here
+  instead of the model.
+- Per-chunk partials: for each contract we keep the chunk partials of the
+  latest stored version, keyed by chunk hash (the agent hashes chunk text +
+  prompt version + model). When a revised contract comes back, the agent asks
+  for these partials and only re-summarizes chunks whose hash changed.
+
+- Stored summaries by id and, latest first, by contract_id.
+
+Kept in memory (bounded LRUs) and, with LEGAL_STORE_TO_FILES=true, also in
+the append-only log under <LEGAL_STORE_FOLDER>/log (see summary_log): writes
+are group-committed off the event loop, reads are one indexed pread. Files
+left by older versions under by_hash/ and chunks/ are still read.
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import pathlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from .summary_log import SummaryLog
+
+Partial = Dict[str, Any]  # {"hash", "index", "heading", "summary_md", "gdpr_json"}
+Summary = Dict[str, Any]  # {"id", "contract_id", "summary_md", "gdpr_json", ...}
+
+
+def summary_key(text_hash: str, prompt_version: str, model: str) -> str:
+    h = hashlib.sha256()
+    for part in (text_hash, prompt_version, model):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SummaryStore:
+    def __init__(self, folder: Optional[str] = None, max_contracts: int = 1024):
+        root = pathlib.Path(folder) if folder else None
+        self.log = SummaryLog(str(root / "log")) if root else None
+        self.dir = root / "chunks" if root else None  # read-only, older layout
+        self.summary_dir = root / "by_hash" if root else None  # idem
+        self.max_contracts = max_contracts
+        self._mem: "OrderedDict[str, Dict[str, Partial]]" = OrderedDict()
+        self._summaries: "OrderedDict[str, Summary]" = OrderedDict()
+        self._by_id: "OrderedDict[str, Summary]" = OrderedDict()  # recent puts
+
+    # ---------- whole summaries ----------
+    async def put_summary(
+        self,
+        summary: Summary,
+        text_hash: Optional[str] = None,
+        prompt_version: str = "",
+        model: str = "",
+    ) -> None:
+        """
+        Log `summary` under its id and contract_id and, given the contract
+        text hash, under (hash, prompt version, model) for get_summary.
+        """
+        keys = [f"id:{summary['id']}", f"contract:{summary['contract_id']}"]
+        self._by_id[summary["id"]] = summary
+        while len(self._by_id) > self.max_contracts:
+            self._by_id.popitem(last=False)
+        if text_hash:
+            key = summary_key(text_hash, prompt_version, model)
+            keys.append(f"hash:{key}")
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_contracts:
+                self._summaries.popitem(last=False)
+        if self.log is not None:
+            await self.log.put(keys, summary)
+
+    async def get_summary(
+        self, text_hash: str, prompt_version: str, model: str
+    ) -> Optional[Summary]:
+        key = summary_key(text_hash, prompt_version, model)
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+            return summary
+        if self.log is None:
+            return None
+        summary = await asyncio.to_thread(self.log.get, f"hash:{key}")
+        if summary is None and self.summary_dir is not None:
+            summary = await asyncio.to_thread(
+                _read_json, self.summary_dir / f"{key}.json"
+            )
+        if summary is not None:
+            self._summaries[key] = summary
+        return summary
+
+    async def get_stored(
+        self, id: Optional[str] = None, contract_id: Optional[str] = None
+    ) -> Optional[Summary]:
+        """A stored summary by id, or the latest one for contract_id."""
+        if id and id in self._by_id:
+            return self._by_id[id]
+        if self.log is None:
+            return None
+        key = f"id:{id}" if id else f"contract:{contract_id}"
+        return await asyncio.to_thread(self.log.get, key)
+
+    # ---------- per-chunk partials ----------
+    def _path(self, contract_id: str) -> pathlib.Path:
+        assert self.dir is not None
+        name = hashlib.sha256(contract_id.encode("utf-8")).hexdigest()[:32]
+        return self.dir / f"{name}.json"
+
+    def _remember(self, contract_id: str, partials: Dict[str, Partial]) -> None:
+        self._mem[contract_id] = partials
+        self._mem.move_to_end(contract_id)
+        while len(self._mem) > self.max_contracts:
+            self._mem.popitem(last=False)
+
+    async def put(self, contract_id: str, chunks: Iterable[Partial]) -> int:
+        partials = {c["hash"]: dict(c) for c in chunks if c.get("hash")}
+        if not partials:
+            return 0  # keep the previous version's partials
+        self._remember(contract_id, partials)
+        if self.log is not None:
+            await self.log.put(
+                [f"chunks:{contract_id}"],
+                {"contract_id": contract_id, "chunks": partials},
+            )
+        return len(partials)
+
+    async def get(
+        self, contract_id: str, hashes: Optional[List[str]] = None
+    ) -> Dict[str, Partial]:
+        partials = self._mem.get(contract_id)
+        if partials is None and self.log is not None:
+            stored = await asyncio.to_thread(self.log.get, f"chunks:{contract_id}")
+            if stored is None and self.dir is not None:
+                stored = await asyncio.to_thread(_read_json, self._path(contract_id))
+            if stored is not None:
+                partials = stored.get("chunks") or {}
+                self._remember(contract_id, partials)
+        if not partials:
+            return {}
+        if hashes is None:
+            return dict(partials)
+        return {h: partials[h] for h in hashes if h in partials}
+
+    async def aclose(self) -> None:
+        """Drain the log's writer thread and close its segment files."""
+        if self.log is not None:
+            await asyncio.to_thread(self.log.close)
+            self.log = None
+
+
+def _read_json(path: pathlib.Path) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,205 @@
+# mcp_server/url_cache.py
+"""
+On-disk conditional-GET cache for url contract fetches.
+
+Layout under LEGAL_FETCH_CACHE_DIR:
+  blobs/<sha256>.txt   contract text (UTF-8), content-addressed: the name is
+                       the sha256 fetch_contract_text reports, and two URLs
+                       serving the same text share one blob
+  urls/<key>.json      per URL: sha256, ETag, Last-Modified, body bytes
+
+A cached URL is revalidated with If-None-Match / If-Modified-Since; a 304 is
+answered from the blob. Only responses with a validator (and no
+`Cache-Control: no-store`) are kept. Blobs are evicted least-recently-used
+once they exceed LEGAL_FETCH_CACHE_MAX_BYTES; recency survives restarts as
+the mtime of the url record.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+CACHE_LOOKUPS = Counter(
+    "saop_mcp_fetch_cache_total",
+    "url fetch cache lookups by outcome (hit = 304 from disk, miss, bypass)",
+    ["outcome"],
+)
+CACHE_BYTES_SAVED = Counter(
+    "saop_mcp_fetch_cache_bytes_saved_total",
+    "Body bytes not transferred thanks to 304 revalidation",
+)
+CACHE_BYTES = Gauge("saop_mcp_fetch_cache_bytes", "Bytes of cached contract text")
+
+
+@dataclass
+class Entry:
+    url: str
+    sha256: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    bytes: int  # body bytes as served (what a 304 saves)
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+class UrlCache:
+    def __init__(self, folder: str, max_bytes: int):
+        self.root = pathlib.Path(folder)
+        self.blobs = self.root / "blobs"
+        self.urls = self.root / "urls"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()  # index is touched from to_thread workers
+        self._lru: "OrderedDict[str, Entry]" = OrderedDict()  # url key -> entry
+        self._refs: Dict[str, Set[str]] = {}  # sha256 -> url keys
+        self._sizes: Dict[str, int] = {}  # sha256 -> blob bytes
+        self.total = 0
+        self._load()
+
+    # ---------- index ----------
+    def _load(self) -> None:
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.urls.mkdir(parents=True, exist_ok=True)
+        records = []
+        for path in self.urls.glob("*.json"):
+            try:
+                records.append(
+                    (path.stat().st_mtime, Entry(**json.loads(path.read_text("utf-8"))))
+                )
+            except (OSError, ValueError, TypeError):
+                continue
+        for _, entry in sorted(records, key=lambda r: r[0]):
+            blob = self.blob_path(entry.sha256)
+            try:
+                size = blob.stat().st_size
+            except OSError:
+                continue
+            self._add(entry, size)
+        CACHE_BYTES.set(self.total)
+
+    def _add(self, entry: Entry, size: int) -> None:
+        key = _url_key(entry.url)
+        self._drop(key)
+        self._lru[key] = entry
+        refs = self._refs.setdefault(entry.sha256, set())
+        if not refs:
+            self._sizes[entry.sha256] = size
+            self.total += size
+        refs.add(key)
+
+    def _drop(self, key: str) -> Optional[str]:
+        """Forget a url; returns the sha256 if its blob is now unreferenced."""
+        entry = self._lru.pop(key, None)
+        if entry is None:
+            return None
+        refs = self._refs.get(entry.sha256, set())
+        refs.discard(key)
+        if refs:
+            return None
+        self._refs.pop(entry.sha256, None)
+        self.total -= self._sizes.pop(entry.sha256, 0)
+        return entry.sha256
+
+    def blob_path(self, sha256: str) -> pathlib.Path:
+        return self.blobs / f"{sha256}.txt"
+
+    # ---------- lookups ----------
+    def lookup(self, url: str) -> Optional[Entry]:
+        with self._lock:
+            return self._lru.get(_url_key(url))
+
+    @staticmethod
+    def conditional_headers(entry: Entry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def read(self, entry: Entry) -> Optional[str]:
+        """Blob text for a 304, or None if it vanished (then refetch)."""
+        key = _url_key(entry.url)
+        try:
+            text = self.blob_path(entry.sha256).read_text(encoding="utf-8")
+        except OSError:
+            with self._lock:
+                self._drop(key)
+            return None
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+        try:
+            os.utime(self.urls / f"{key}.json")
+        except OSError:
+            pass
+        return text
+
+    # ---------- writes ----------
+    def tmp_path(self) -> pathlib.Path:
+        return (
+            self.blobs
+            / f".tmp-{os.getpid()}-{threading.get_ident()}-{os.urandom(4).hex()}"
+        )
+
+    def commit(self, entry: Entry, tmp: pathlib.Path) -> None:
+        """Move a fully written tmp blob into place, record the url, evict."""
+        blob = self.blob_path(entry.sha256)
+        if blob.exists():
+            tmp.unlink(missing_ok=True)
+        else:
+            os.replace(tmp, blob)
+        key = _url_key(entry.url)
+        record = self.urls / f"{key}.json"
+        tmp_record = record.with_suffix(".tmp")
+        tmp_record.write_text(json.dumps(asdict(entry)), encoding="utf-8")
+        os.replace(tmp_record, record)
+        with self._lock:
+            self._add(entry, blob.stat().st_size)
+            evicted = self._evict()
+        for sha in evicted:
+            self.blob_path(sha).unlink(missing_ok=True)
+        CACHE_BYTES.set(self.total)
+
+    def _evict(self) -> list[str]:
+        freed: list[str] = []
+        while self.total > self.max_bytes and len(self._lru) > 1:
+            key = next(iter(self._lru))
+            sha = self._drop(key)
+            (self.urls / f"{key}.json").unlink(missing_ok=True)
+            if sha:
+                freed.append(sha)
+        return freed
+
+    # ---------- stats ----------
+    def record(self, outcome: str, saved: int = 0) -> Dict[str, Any]:
+        """Count a lookup; returns the per-call cache report."""
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+                self.bytes_saved += saved
+            elif outcome == "miss":
+                self.misses += 1
+            lookups = self.hits + self.misses
+            report = {
+                "status": outcome,
+                "bytes_saved": saved,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "total_bytes_saved": self.bytes_saved,
+            }
+        CACHE_LOOKUPS.labels(outcome=outcome).inc()
+        if saved:
+            CACHE_BYTES_SAVED.inc(saved)
+        return report
@@ -0,0 +1,462 @@
+# mcp_server/vector_index.py
+"""
+Vector index for semantic search_prior_summaries: one row per stored summary
+and per chunk summary, cosine similarity (rows are unit vectors).
+
+Files under the index folder, all append-only:
+  manifest.json   embedder name and dim (a different embedder refuses to load)
+  vectors.f32     row-major float32 matrix, memory-mapped for search
+  rows.u32        per row: contract number, batch (one store_summary call)
+  contracts.jsonl contract ids, the line number is the contract number
+  meta.jsonl      per row: [id, contract_id, kind, title, hash, heading, preview]
+  ivf.npz         optional coarse quantizer (see below)
+
+A contract's rows from its latest batch are live; re-storing it supersedes
+the older rows in place. Appended rows are kept in memory until REMAP_ROWS
+of them accumulate, then the files are re-mapped. A torn append (crash) is
+cut back to the last complete row on load.
+
+Search is an exact, blocked matrix-vector product by default. With
+LEGAL_VECTOR_NLIST > 0 an IVF quantizer is trained (spherical k-means, in a
+background thread) once there are enough rows and retrained when the index
+has doubled; a query then scans only the LEGAL_VECTOR_NPROBE closest lists.
+Rows added after training are assigned to their nearest list as they arrive.
+"""
+
+from __future__ import annotations
+import json
+import mmap
+import os
+import pathlib
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from .embedding import Embedder
+
+REMAP_ROWS = 4096
+BLOCK_ROWS = 1 << 18
+TRAIN_PER_LIST = 39  # k-means sample rows per list (as faiss recommends)
+KMEANS_ITERS = 10
+OVERSAMPLE = 8  # rows fetched per requested contract (chunks share contracts)
+
+Meta = Tuple[str, str, str, str, str, str, str]
+Item = Tuple[str, str, str]  # kind ("summary" / "chunk"), heading, text
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        folder: Optional[str],
+        embedder: Embedder,
+        nlist: int = 0,
+        nprobe: int = 8,
+    ):
+        self.dir = pathlib.Path(folder) if folder else None
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        # rows
+        self._n = 0
+        self._dead = bytearray()
+        self._contracts: Dict[str, int] = {}
+        self._span: Dict[int, Tuple[int, int]] = {}  # contract -> live rows
+        self._next_batch = 0
+        # mapped rows [0, _mapped) and the in-memory tail
+        self._mapped = 0
+        self._mat: np.ndarray = np.zeros((0, self.dim), dtype=np.float32)
+        self._meta_map: Optional[mmap.mmap] = None
+        self._meta_off: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._tail: List[np.ndarray] = []
+        self._tail_meta: List[Meta] = []
+        self._tail_mat: Optional[np.ndarray] = None
+        # IVF
+        self._centroids: Optional[np.ndarray] = None
+        self._order: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._list_off: np.ndarray = np.zeros(1, dtype=np.int64)
+        self._trained = 0
+        self._extra: Dict[int, array] = {}  # list -> rows added after training
+        self._training: Optional[threading.Thread] = None
+        if self.dir is not None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return self._n - int(np.count_nonzero(np.frombuffer(self._dead, np.uint8)))
+
+    # ---------- updates ----------
+    def add(
+        self,
+        doc_id: str,
+        contract_id: str,
+        items: Sequence[Item],
+        title: str = "",
+        hash: str = "",
+    ) -> None:
+        """Embed and append one stored summary (and its chunks)."""
+        items = [it for it in items if it[2].strip()]
+        if not items:
+            return
+        vecs = self.embedder.embed([f"{title}\n{h}\n{text}" for _, h, text in items])
+        metas = [
+            (doc_id, contract_id, kind, title, hash, heading, _preview(text))
+            for kind, heading, text in items
+        ]
+        self.add_embedded(contract_id, vecs, metas)
+
+    def add_embedded(
+        self, contract_id: str, vecs: np.ndarray, metas: Sequence[Meta]
+    ) -> None:
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            cno = self._contracts.get(contract_id)
+            new_contract = cno is None
+            if cno is None:
+                cno = self._contracts[contract_id] = len(self._contracts)
+            batch = self._next_batch
+            self._next_batch += 1
+            start, end = self._n, self._n + len(vecs)
+            if self.dir is not None:
+                self._append_files(contract_id, new_contract, cno, batch, vecs, metas)
+            old = self._span.get(cno)
+            if old is not None:
+                self._dead[old[0] : old[1]] = b"\x01" * (old[1] - old[0])
+            self._span[cno] = (start, end)
+            self._dead.extend(bytes(len(vecs)))
+            self._tail.append(vecs)
+            self._tail_meta.extend(metas)
+            self._tail_mat = None
+            self._n = end
+            if self._centroids is not None:
+                self._assign(np.arange(start, end), vecs)
+            if self.dir is not None and self._n - self._mapped >= REMAP_ROWS:
+                self._remap()
+            self._maybe_train()
+
+    def _append_files(
+        self,
+        contract_id: str,
+        new_contract: bool,
+        cno: int,
+        batch: int,
+        vecs: np.ndarray,
+        metas: Sequence[Meta],
+    ) -> None:
+        # vectors last: on load the row count is what all files agree on
+        assert self.dir is not None
+        if new_contract:
+            with open(self.dir / "contracts.jsonl", "ab") as f:
+                f.write(orjson.dumps(contract_id) + b"\n")
+        with open(self.dir / "meta.jsonl", "ab") as f:
+            f.write(b"".join(orjson.dumps(m) + b"\n" for m in metas))
+        with open(self.dir / "rows.u32", "ab") as f:
+            f.write(np.tile(np.array([cno, batch], np.uint32), len(vecs)).tobytes())
+        with open(self.dir / "vectors.f32", "ab") as f:
+            f.write(vecs.tobytes())
+
+    # ---------- search ----------
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        if not query.strip():
+            return []
+        q = self.embedder.embed([query])[0]
+        if not q.any():
+            return []
+        with self._lock:
+            if not self._n:
+                return []
+            m = k * OVERSAMPLE
+            if self._centroids is not None and self.nprobe < self.nlist:
+                rows, scores = self._search_ivf(q, m)
+            else:
+                rows, scores = self._search_flat(q, m)
+            out: List[Dict[str, Any]] = []
+            seen = set()
+            for i in np.argsort(-scores, kind="stable").tolist():
+                if scores[i] <= 0:
+                    break
+                doc_id, contract_id, kind, title, h, heading, preview = self._meta(
+                    int(rows[i])
+                )
+                if contract_id in seen:
+                    continue
+                seen.add(contract_id)
+                out.append(
+                    {
+                        "id": doc_id,
+                        "contract_id": contract_id,
+                        "title": title or contract_id,
+                        "hash": h,
+                        "preview": preview,
+                        "score": round(float(scores[i]), 4),
+                        "match": kind,
+                        "heading": heading,
+                    }
+                )
+                if len(out) == k:
+                    break
+            return out
+
+    def _search_flat(self, q: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+        dead = np.frombuffer(self._dead, dtype=np.bool_)
+        rows_parts, score_parts = [], []
+        for start, block in self._blocks():
+            s = block @ q
+            s[dead[start : start + len(block)]] = -np.inf
+            top = _top(s, m)
+            rows_parts.append(top + start)
+            score_parts.append(s[top])
+        rows, scores = np.concatenate(rows_parts), np.concatenate(score_parts)
+        keep = np.isfinite(scores)
+        return rows[keep], scores[keep]
+
+    def _search_ivf(self, q: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+        assert self._centroids is not None
+        lists = _top(self._centroids @ q, self.nprobe).tolist()
+        parts = [self._order[self._list_off[c] : self._list_off[c + 1]] for c in lists]
+        parts += [
+            np.frombuffer(self._extra[c], dtype=np.uint32)
+            for c in lists
+            if c in self._extra
+        ]
+        rows = np.concatenate(parts).astype(np.int64)
+        rows = rows[~np.frombuffer(self._dead, dtype=np.bool_)[rows]]
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+        rows.sort()  # sequential reads from the map
+        scores = self._gather(rows) @ q
+        top = _top(scores, m)
+        return rows[top], scores[top]
+
+    def _blocks(self):
+        for start in range(0, self._mapped, BLOCK_ROWS):
+            yield start, self._mat[start : start + BLOCK_ROWS]
+        if self._n > self._mapped:
+            yield self._mapped, self._tail_matrix()
+
+    def _tail_matrix(self) -> np.ndarray:
+        if self._tail_mat is None:
+            self._tail_mat = (
+                np.concatenate(self._tail)
+                if self._tail
+                else np.zeros((0, self.dim), dtype=np.float32)
+            )
+        return self._tail_mat
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        split = int(np.searchsorted(rows, self._mapped))
+        head = self._mat[rows[:split]]
+        if split == len(rows):
+            return head
+        return np.concatenate([head, self._tail_matrix()[rows[split:] - self._mapped]])
+
+    def _meta(self, row: int) -> Meta:
+        if row >= self._mapped:
+            return self._tail_meta[row - self._mapped]
+        assert self._meta_map is not None
+        a, b = int(self._meta_off[row]), int(self._meta_off[row + 1])
+        return tuple(orjson.loads(self._meta_map[a:b]))  # type: ignore[return-value]
+
+    # ---------- IVF ----------
+    def _assign(self, rows: np.ndarray, vecs: np.ndarray) -> None:
+        assert self._centroids is not None
+        lists = np.argmax(vecs @ self._centroids.T, axis=1)
+        for row, c in zip(rows.tolist(), lists.tolist()):
+            self._extra.setdefault(c, array("I")).append(row)
+
+    def _maybe_train(self) -> None:
+        if not self.nlist or (self._training and self._training.is_alive()):
+            return
+        if self._n < max(self.nlist * TRAIN_PER_LIST, 2 * self._trained):
+            return
+        if self.dir is not None:
+            self._remap()
+        self._training = threading.Thread(target=self.train, daemon=True)
+        self._training.start()
+
+    def train(self) -> None:
+        """(Re)build the IVF lists over the mapped rows; queries keep running."""
+        with self._lock:
+            mat, n = self._mat, self._mapped
+            if self.dir is None:
+                mat, n = self._tail_matrix(), self._n
+        if n < self.nlist:
+            return
+        rng = np.random.default_rng(n)
+        sample = mat[np.sort(rng.choice(n, min(n, self.nlist * 64), replace=False))]
+        centroids = _kmeans(sample, self.nlist, rng)
+        assign = np.concatenate(
+            [
+                np.argmax(mat[a : a + BLOCK_ROWS] @ centroids.T, axis=1)
+                for a in range(0, n, BLOCK_ROWS)
+            ]
+        )
+        order = np.argsort(assign, kind="stable")
+        list_off = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=self.nlist), out=list_off[1:])
+        if self.dir is not None:
+            tmp = self.dir / "ivf.tmp.npz"
+            np.savez(
+                tmp,
+                centroids=centroids,
+                order=order.astype(np.uint32),
+                list_off=list_off,
+                trained=np.int64(n),
+            )
+            os.replace(tmp, self.dir / "ivf.npz")
+        with self._lock:
+            self._install_ivf(centroids, order, list_off, n)
+
+    def _install_ivf(
+        self, centroids: np.ndarray, order: np.ndarray, list_off: np.ndarray, n: int
+    ) -> None:
+        self._centroids = centroids
+        self._order = order
+        self._list_off = list_off
+        self._trained = n
+        self._extra = {}
+        if self._n > n:
+            rows = np.arange(n, self._n)
+            self._assign(rows, self._gather(rows))
+
+    # ---------- persistence ----------
+    def _load(self) -> None:
+        assert self.dir is not None
+        manifest = self.dir / "manifest.json"
+        want = {"embedder": self.embedder.name, "dim": self.dim}
+        if manifest.exists():
+            have = json.loads(manifest.read_text("utf-8"))
+            if have != want:
+                raise ValueError(
+                    f"{self.dir}: built with {have}, embedder is {want}; "
+                    "use a new LEGAL_VECTOR_FOLDER or rebuild"
+                )
+        else:
+            manifest.write_text(json.dumps(want), encoding="utf-8")
+        contracts = self.dir / "contracts.jsonl"
+        if contracts.exists():
+            with open(contracts, "rb") as f:
+                for line in f:
+                    try:
+                        self._contracts.setdefault(
+                            orjson.loads(line), len(self._contracts)
+                        )
+                    except orjson.JSONDecodeError:
+                        break  # torn last line
+        row_bytes = 4 * self.dim
+        vec_path = self.dir / "vectors.f32"
+        rows_path = self.dir / "rows.u32"
+        meta_off = self._scan_meta()
+        n = min(_size(vec_path) // row_bytes, _size(rows_path) // 8, len(meta_off) - 1)
+        # cut a torn append back to n complete rows
+        for path, size in ((vec_path, n * row_bytes), (rows_path, n * 8)):
+            if path.exists():
+                os.truncate(path, size)
+        os.truncate(self.dir / "meta.jsonl", int(meta_off[n]))
+        rows = (
+            np.fromfile(rows_path, dtype=np.uint32).reshape(-1, 2)
+            if n
+            else np.zeros((0, 2), dtype=np.uint32)
+        )
+        cno, batch = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64)
+        latest = np.full(len(self._contracts), -1, dtype=np.int64)
+        np.maximum.at(latest, cno, batch)
+        live = batch == latest[cno]
+        self._dead = bytearray((~live).astype(np.uint8).tobytes())
+        self._next_batch = int(batch.max()) + 1 if n else 0
+        live_rows = np.flatnonzero(live)
+        owners, first, count = np.unique(
+            cno[live_rows], return_index=True, return_counts=True
+        )
+        starts = live_rows[first]
+        self._span = {
+            c: (s, s + k)
+            for c, s, k in zip(owners.tolist(), starts.tolist(), count.tolist())
+        }
+        self._n = n
+        self._remap()
+        ivf = self.dir / "ivf.npz"
+        if self.nlist and ivf.exists():
+            with np.load(ivf) as z:
+                if len(z["centroids"]) == self.nlist and int(z["trained"]) <= n:
+                    self._install_ivf(
+                        z["centroids"],
+                        z["order"].astype(np.int64),
+                        z["list_off"],
+                        int(z["trained"]),
+                    )
+        self._maybe_train()
+
+    def _scan_meta(self) -> np.ndarray:
+        """Line start offsets of meta.jsonl (plus its length)."""
+        assert self.dir is not None
+        path = self.dir / "meta.jsonl"
+        path.touch()
+        with open(path, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return np.zeros(1, dtype=np.int64)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ends = np.flatnonzero(np.frombuffer(mm, dtype=np.uint8) == 10) + 1
+        return np.concatenate([[0], ends]).astype(np.int64)
+
+    def _remap(self) -> None:
+        """Map everything written so far; the in-memory tail is dropped."""
+        assert self.dir is not None
+        n = self._n
+        if n:
+            self._mat = np.memmap(
+                self.dir / "vectors.f32",
+                dtype=np.float32,
+                mode="r",
+                shape=(n, self.dim),
+            )
+        self._meta_off = self._scan_meta()
+        if self._meta_map is not None:
+            try:
+                self._meta_map.close()
+            except BufferError:
+                pass
+            self._meta_map = None
+        if n:
+            with open(self.dir / "meta.jsonl", "rb") as f:
+                self._meta_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped = n
+        self._tail, self._tail_meta, self._tail_mat = [], [], None
+
+
+def _size(path: pathlib.Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+def _preview(text: str) -> str:
+    return " ".join(text.split())[:240]
+
+
+def _top(scores: np.ndarray, m: int) -> np.ndarray:
+    """Indices of the m largest scores (unordered)."""
+    if len(scores) <= m:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, m - 1)[:m]
+
+
+def _kmeans(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means (cosine); empty lists are re-seeded from the sample."""
+    c = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(KMEANS_ITERS):
+        assign = np.argmax(x @ c.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        present = np.flatnonzero(counts)
+        sums = np.add.reduceat(
+            x[order], np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        )
+        c[present] = sums
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            c[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+        c /= np.maximum(np.linalg.norm(c, axis=1, keepdims=True), 1e-12)
+    return c.astype(np.float32)
@@ -0,0 +1,87 @@
+# saop_core/minhash.py
+"""
+MinHash signatures for near-duplicate detection.
+
+A text is reduced to its set of word shingles (SHINGLE consecutive words,
+lowercased, every digit mapped to "0" so dates and amounts do not split a
+template). The signature keeps, for each of `num_perm` universal hash
+functions h(x) = (a*x + b) mod (2^61 - 1), the minimum over the set; two
+signatures agree in a slot with probability equal to the sets' Jaccard
+similarity, so the fraction of equal slots estimates it.
+
+The hash functions come from a fixed seed: signatures are comparable across
+processes and restarts as long as `num_perm` and `shingle` match.
+"""
+
+from __future__ import annotations
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+SHINGLE = 5
+EMPTY = 0xFFFFFFFF  # every slot of the signature of an empty set
+
+_WORD = re.compile(r"\w+")
+_DIGIT = re.compile(r"\d")
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK32 = np.uint64(0xFFFFFFFF)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BLOCK = 8192  # shingles hashed per step (num_perm x _BLOCK uint64 scratch)
+
+
+@lru_cache(maxsize=8)
+def _perms(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    # a, b < 2^31 and x < 2^32: a*x + b never wraps uint64
+    rng = np.random.default_rng(0x5A0F)
+    a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def _norm_words(text: str) -> List[str]:
+    return _WORD.findall(_DIGIT.sub("0", text.lower()))
+
+
+def shingles(text: str, shingle: int = SHINGLE) -> np.ndarray:
+    """Distinct 32-bit shingle hashes of `text` (a short text is one shingle)."""
+    words = _norm_words(text)
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    tok = np.fromiter(
+        (zlib.crc32(w.encode("utf-8")) for w in words), np.uint64, len(words)
+    )
+    k = min(shingle, len(tok))
+    n = len(tok) - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):  # polynomial over the window, wrapping mod 2^64
+        h = h * _MIX + tok[j : j + n]
+    return np.unique((h ^ (h >> np.uint64(32))) & _MASK32)
+
+
+def signature(text: str, num_perm: int = NUM_PERM, shingle: int = SHINGLE) -> List[int]:
+    """MinHash signature of `text`: `num_perm` uint32 values."""
+    x = shingles(text, shingle)
+    a, b = _perms(num_perm)
+    sig = np.full(num_perm, EMPTY, dtype=np.uint64)
+    for start in range(0, len(x), _BLOCK):
+        block = (a * x[start : start + _BLOCK] + b) % _PRIME & _MASK32
+        np.minimum(sig, block.min(axis=1), out=sig)
+    return sig.astype(np.uint32).tolist()
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    if len(a) != len(b) or not len(a):
+        return 0.0
+    return float(np.mean(np.asarray(a, np.uint32) == np.asarray(b, np.uint32)))
+
+
+def fingerprint(text: str) -> str:
+    """Hash of a passage's words (case and whitespace ignored, digits kept)."""
+    words = " ".join(_WORD.findall(text.lower()))
+    return hashlib.sha1(words.encode("utf-8")).hexdigest()[:16]
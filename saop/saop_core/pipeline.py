@@ -0,0 +1,196 @@
+# saop_core/pipeline.py
+"""
+Small helpers for staged request handlers.
+
+    stages = Stages()
+    doc, ctx = await stages.concurrently(
+        stages.run("fetch", fetch(), timeout=30),
+        stages.run("prior_context", search(), timeout=10),
+    )
+    res = await stages.run("model", call_model(doc, ctx))
+    return {..., "timings": stages.report()}
+
+`concurrently` runs its stages under an asyncio.TaskGroup: the first failure
+cancels the siblings and is re-raised as-is (not wrapped in an ExceptionGroup),
+so handlers keep their usual `except HTTPException` paths. `map_bounded` does
+the same for a fan-out with at most `limit` calls in flight.
+
+A timeout or TaskGroup scope must never stay open across a `yield`: the
+consumer (e.g. an SSE response sending each item) would be the task that gets
+cancelled, with a bare CancelledError instead of the stage's error. So
+`Stages.stream` and `map_bounded` do their work in a producer task and hand
+the items over a queue; errors are re-raised to the consumer as-is.
+"""
+
+from __future__ import annotations
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from prometheus_client import Histogram
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+STAGE_LATENCY = Histogram(
+    "saop_pipeline_stage_seconds", "Wall time per pipeline stage", ["stage"]
+)
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"stage {stage!r} timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class Stages:
+    def __init__(self) -> None:
+        self._t0 = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def stage(
+        self, name: str, timeout: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Time a block; `timeout` (seconds, falsy = none) raises StageTimeout."""
+        t0 = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout or None):
+                yield
+        except TimeoutError as e:
+            raise StageTimeout(name, timeout or 0.0) from e
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.timings[name] = elapsed
+            STAGE_LATENCY.labels(stage=name).observe(elapsed)
+
+    async def run(
+        self, name: str, aw: Awaitable[T], timeout: Optional[float] = None
+    ) -> T:
+        async with self.stage(name, timeout):
+            return await aw
+
+    async def stream(
+        self, name: str, source: AsyncIterator[T], timeout: Optional[float] = None
+    ) -> AsyncIterator[T]:
+        """
+        Yield the items of `source`, drained in a producer task under the
+        stage's timeout: the deadline covers the work, not the time the
+        consumer spends between items, and a StageTimeout reaches the consumer
+        as an exception rather than a cancellation.
+        """
+
+        async def fill(put: Callable[[T], None]) -> None:
+            async with self.stage(name, timeout):
+                async for item in source:
+                    put(item)
+
+        async for item in _pump(fill):
+            yield item
+
+    async def concurrently(self, *aws: Awaitable[Any]) -> Tuple[Any, ...]:
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(_as_coro(aw)) for aw in aws]
+        except BaseExceptionGroup as eg:
+            raise _first_leaf(eg) from None
+        return tuple(t.result() for t in tasks)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "stages": {k: round(v, 6) for k, v in self.timings.items()},
+            "total": round(time.perf_counter() - self._t0, 6),
+        }
+
+
+async def map_bounded(
+    fn: Callable[[T], Awaitable[R]], items: Sequence[T], limit: int
+) -> AsyncIterator[Tuple[int, R]]:
+    """
+    Run `fn` over `items` with at most `limit` in flight, yielding
+    (index, result) in completion order. The TaskGroup lives in a producer
+    task, so a failed call cancels the other calls (not the consumer) and is
+    re-raised here as-is.
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def fill(put: Callable[[Tuple[int, R]], None]) -> None:
+        async def one(i: int, item: T) -> None:
+            async with sem:
+                put((i, await fn(item)))
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for i, item in enumerate(items):
+                    tg.create_task(one(i, item))
+        except BaseExceptionGroup as eg:
+            raise _first_leaf(eg) from None
+
+    async for pair in _pump(fill):
+        yield pair
+
+
+class _Raised:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+_END = object()
+
+
+async def _pump(
+    fill: Callable[[Callable[[T], None]], Awaitable[None]],
+) -> AsyncIterator[T]:
+    """Run `fill(put)` in its own task; yield what it puts, then re-raise its
+    error, if any. Closing the generator cancels the task."""
+    queue: "asyncio.Queue[Union[T, _Raised, object]]" = asyncio.Queue()
+
+    async def produce() -> None:
+        try:
+            await fill(queue.put_nowait)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            queue.put_nowait(_Raised(e))
+        else:
+            queue.put_nowait(_END)
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Raised):
+                raise item.exc
+            yield cast(T, item)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def _as_coro(aw: Awaitable[T]) -> T:
+    return await aw
+
+
+def _first_leaf(eg: BaseExceptionGroup) -> BaseException:
+    exc: BaseException = eg
+    while isinstance(exc, BaseExceptionGroup):
+        exc = exc.exceptions[0]
+    return exc
@@ -0,0 +1,64 @@
+# saop_core/singleflight.py
+"""
+In-process request coalescing ("single flight").
+
+Concurrent callers asking for the same key await one shared task instead of
+each doing the work. Cancelling one waiter never cancels the shared call; the
+call is only cancelled once every waiter has gone away.
+"""
+
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from prometheus_client import Counter
+
+T = TypeVar("T")
+
+COALESCED_CALLS = Counter(
+    "saop_singleflight_coalesced_total",
+    "Calls that joined an identical in-flight call instead of starting their own",
+    ["scope"],
+)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, scope: str):
+        self.scope = scope
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t: self._forget(key, flight))
+        else:
+            COALESCED_CALLS.labels(scope=self.scope).inc()
+
+        flight.waiters += 1
+        try:
+            # shield: cancelling this waiter must not cancel the shared task
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # last interested caller left; stop the work and make sure a
+                # newcomer starts a fresh call rather than joining a dying one
+                self._forget(key, flight)
+                flight.task.cancel()
@@ -0,0 +1,97 @@
+# saop_core/textscan.py
+"""
+Aho-Corasick multi-pattern matcher.
+
+All patterns are found in one left-to-right pass over the text, whatever the
+number of patterns: O(len(text) + matches). Transitions are precomputed into a
+full DFA over the patterns' alphabet, so the inner loop is one dict lookup per
+character; characters outside the alphabet reset to the root.
+
+Matching is case-insensitive. Word boundaries: a match must not start inside a
+word, and must not end inside one unless the pattern ends with "*" (prefix
+pattern: "encrypt*" matches "encrypted", "encryption").
+"""
+
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Generic, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Match(Generic[T]):
+    start: int
+    end: int
+    payload: T
+
+
+def _lower_same_length(text: str) -> str:
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    # rare: a character lowercases to several (e.g. "İ"); keep offsets aligned
+    return "".join(c.lower()[:1] for c in text)
+
+
+class AhoCorasick(Generic[T]):
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[int, bool, T]]] = [[]]  # (length, prefix?, payload)
+        for raw, payload in patterns:
+            prefix = raw.endswith("*")
+            pat = raw.rstrip("*").lower()
+            if not pat:
+                continue
+            state = 0
+            for ch in pat:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((len(pat), prefix, payload))
+
+        # BFS: failure links, merged outputs, then full DFA transitions
+        fail = [0] * len(goto)
+        order: List[int] = []
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            order.append(s)
+            for ch, nxt in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                queue.append(nxt)
+
+        delta: List[Dict[str, int]] = [dict(g) for g in goto]
+        for s in order:
+            for ch, nxt in delta[fail[s]].items():
+                delta[s].setdefault(ch, nxt)
+        self._delta = delta
+        self._out = out
+        self.states = len(goto)
+
+    def iter_matches(self, text: str) -> Iterator[Match[T]]:
+        low = _lower_same_length(text)
+        delta, out = self._delta, self._out
+        n = len(text)
+        state = 0
+        for i, ch in enumerate(low):
+            state = delta[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for length, prefix, payload in out[state]:
+                start = end - length
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not prefix and end < n and text[end].isalnum():
+                    continue
+                yield Match(start, end, payload)
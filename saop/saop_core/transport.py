@@ -0,0 +1,102 @@
+# saop_core/transport.py
+"""
+Shared, long-lived HTTP connection pools.
+
+One httpx.AsyncClient per process (or per upstream) keeps TCP/TLS connections
+warm across calls instead of paying DNS + handshake on every request.
+Create it once at startup, hand it to every caller, close it on shutdown.
+"""
+
+from __future__ import annotations
+import importlib.util
+import weakref
+from typing import Dict, Iterator
+
+import httpx
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from .agent_config import HTTPPoolConfig
+
+# name -> client; weak so a closed/discarded client simply drops out of /metrics
+_POOLS: "weakref.WeakValueDictionary[str, httpx.AsyncClient]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional `h2` package is installed.
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_async_client(
+    cfg: HTTPPoolConfig | None = None, **kwargs
+) -> httpx.AsyncClient:
+    """
+    Build a pooled AsyncClient from HTTPPoolConfig.
+    Extra kwargs (headers, base_url, ...) are passed through to httpx.
+    """
+    cfg = cfg or HTTPPoolConfig()
+    limits = httpx.Limits(
+        max_connections=cfg.max_connections,
+        max_keepalive_connections=cfg.max_keepalive_connections,
+        keepalive_expiry=cfg.keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        http2=cfg.http2 and http2_available(),
+        limits=limits,
+        timeout=httpx.Timeout(cfg.timeout),
+        **kwargs,
+    )
+
+
+def register_pool(name: str, client: httpx.AsyncClient) -> None:
+    """
+    Report this client's pool as saop_http_pool_connections{pool=name,...}.
+    Re-registering a name replaces the previous client.
+    """
+    _POOLS[name] = client
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, int]:
+    """
+    Snapshot of an httpx client's connection pool: open, idle and waiting
+    (requests queued for a connection). Zeros if the transport is not httpcore.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    conns = list(getattr(pool, "connections", None) or [])
+    queued = [r for r in (getattr(pool, "_requests", None) or []) if r.is_queued()]
+    return {
+        "open": len(conns),
+        "idle": sum(1 for c in conns if c.is_idle()),
+        "waiting": len(queued),
+    }
+
+
+class _PoolCollector(Collector):
+    """Reads pool state at scrape time, so gauges never go stale."""
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        conns = GaugeMetricFamily(
+            "saop_http_pool_connections",
+            "Connections in a shared HTTP pool",
+            labels=["pool", "state"],
+        )
+        waiting = GaugeMetricFamily(
+            "saop_http_pool_waiting",
+            "Requests waiting for a pooled HTTP connection",
+            labels=["pool"],
+        )
+        for name, client in list(_POOLS.items()):
+            if client.is_closed:
+                continue
+            stats = pool_stats(client)
+            conns.add_metric([name, "open"], stats["open"])
+            conns.add_metric([name, "idle"], stats["idle"])
+            waiting.add_metric([name], stats["waiting"])
+        yield conns
+        yield waiting
+
+
+REGISTRY.register(_PoolCollector())
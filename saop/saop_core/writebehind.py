@@ -0,0 +1,167 @@
+# saop_core/writebehind.py
+"""
+Write-behind queue: take a write off the request path, deliver it later.
+
+Each job is journaled as `<journal_dir>/<job_id>.json` (tmp + fsync + rename)
+before `submit()` returns, and deleted once the handler succeeds. A restart
+replays whatever is left in the journal, so an accepted write survives a crash.
+Failed attempts are retried with full-jitter exponential backoff; after
+`max_attempts` the job moves to `<journal_dir>/dead/` for inspection.
+
+Delivery is at-least-once: a job whose write landed but whose journal entry
+was not yet removed (crash, or a handler that timed out after the write) is
+delivered again. The handler gets the job id with the payload; it is the
+same on every attempt and replay, so the write can be made idempotent on it.
+
+Without a journal_dir the queue is memory-only (best effort).
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import pathlib
+import random
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+from prometheus_client import Counter, Gauge
+
+from .agent_config import WriteBehindConfig
+
+Handler = Callable[[str, Dict[str, Any]], Awaitable[Any]]  # (job id, payload)
+
+JOBS = Counter(
+    "saop_writebehind_jobs_total",
+    "Write-behind jobs by outcome (queued, done, retried, dead)",
+    ["queue", "outcome"],
+)
+PENDING = Gauge(
+    "saop_writebehind_pending", "Write-behind jobs not yet delivered", ["queue"]
+)
+
+
+class WriteBehindQueue:
+    def __init__(self, name: str, handler: Handler, cfg: WriteBehindConfig):
+        self.name = name
+        self.handler = handler
+        self.cfg = cfg
+        self.dir = pathlib.Path(cfg.journal_dir) if cfg.journal_dir else None
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._workers: list[asyncio.Task[None]] = []
+        self._retries: set[asyncio.Task[None]] = set()
+
+    # ---------- journal ----------
+    def _path(self, job_id: str) -> pathlib.Path:
+        assert self.dir is not None
+        return self.dir / f"{job_id}.json"
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["id"])
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _remove(self, job_id: str) -> None:
+        try:
+            self._path(job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _bury(self, job: Dict[str, Any]) -> None:
+        assert self.dir is not None
+        dead = self.dir / "dead"
+        dead.mkdir(exist_ok=True)
+        os.replace(self._path(job["id"]), dead / f"{job['id']}.json")
+
+    def _replay(self) -> list[Dict[str, Any]]:
+        assert self.dir is not None
+        jobs = []
+        for path in sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime):
+            try:
+                jobs.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return jobs
+
+    # ---------- lifecycle ----------
+    async def start(self) -> None:
+        if self.dir is not None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            for job in await asyncio.to_thread(self._replay):
+                self._queue.put_nowait(job)
+        PENDING.labels(queue=self.name).set(self._queue.qsize())
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(max(1, self.cfg.workers))
+        ]
+
+    async def stop(self) -> None:
+        """Give queued jobs `drain_timeout` seconds, then stop; journaled jobs
+        that did not make it are replayed on the next start."""
+        try:
+            await asyncio.wait_for(self._queue.join(), self.cfg.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        for t in [*self._workers, *self._retries]:
+            t.cancel()
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+        self._workers, self._retries = [], set()
+
+    async def submit(self, payload: Dict[str, Any]) -> str:
+        """Journal and queue `payload`; returns the job id."""
+        job_id = uuid.uuid4().hex
+        job: Dict[str, Any] = {"id": job_id, "attempts": 0, "payload": payload}
+        if self.dir is not None:
+            await asyncio.to_thread(self._write, job)
+        self._queue.put_nowait(job)
+        JOBS.labels(queue=self.name, outcome="queued").inc()
+        PENDING.labels(queue=self.name).inc()
+        return job_id
+
+    # ---------- delivery ----------
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: Dict[str, Any]) -> None:
+        try:
+            await self.handler(job["id"], job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            job["attempts"] += 1
+            if job["attempts"] >= self.cfg.max_attempts:
+                JOBS.labels(queue=self.name, outcome="dead").inc()
+                PENDING.labels(queue=self.name).dec()
+                if self.dir is not None:
+                    await asyncio.to_thread(self._bury, job)
+                return
+            JOBS.labels(queue=self.name, outcome="retried").inc()
+            if self.dir is not None:
+                await asyncio.to_thread(self._write, job)
+            delay = random.uniform(
+                0,
+                min(self.cfg.backoff_max, self.cfg.backoff_base * 2 ** job["attempts"]),
+            )
+            task = asyncio.create_task(self._requeue(job, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        JOBS.labels(queue=self.name, outcome="done").inc()
+        PENDING.labels(queue=self.name).dec()
+        if self.dir is not None:
+            await asyncio.to_thread(self._remove, job["id"])
+
+    async def _requeue(self, job: Dict[str, Any], delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job)
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries)
@@ -25,9 +25,13 @@ MCP server bootstrap.
 from __future__ import annotations
 import os
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
 
 # 1) Import FastMCP and tool registry
 from fastmcp import FastMCP
+from saop_core.mcp.mcp_tools_registry import lifespan
 from .mcp_tools_registry import register_tools
 
 # 2) Load environment that Compose provides (.env not required, but load if present)
@@ -36,8 +40,9 @@ load_dotenv(override=False)
 MCP_HOST = os.getenv("MCP_HOST", "0.0.0.0")
 MCP_PORT = int(os.getenv("MCP_PORT", "9000"))
 
-# 3) Create the MCP server instance
-mcp = FastMCP(name="saop-mcp")
+# 3) Create the MCP server instance (lifespan closes the shared fetch session,
+#    db pool and summary log on shutdown)
+mcp = FastMCP(name="saop-mcp", lifespan=lifespan)
 
 # 4) Register all tools from your registry (names must match agent YAML)
 register_tools(mcp)
@@ -49,6 +54,12 @@ async def _ping() -> dict[str, str]:
     return {"status": "ok"}
 
 
-# 6) Run the MCP HTTP server
+# 6) Prometheus scrape endpoint (tool fetch timings/bytes, etc.)
+@mcp.custom_route("/metrics", methods=["GET"])
+async def _metrics(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# 7) Run the MCP HTTP server
 if __name__ == "__main__":
     mcp.run(transport="http", host=MCP_HOST, port=MCP_PORT)
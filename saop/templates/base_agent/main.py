@@ -30,6 +30,7 @@ from langchain_core.messages import HumanMessage
 from prometheus_client import Counter, Histogram
 
 from saop_core.telemetry import init_tracing
+from saop_core.llm.usage import cached_tokens, record_usage
 
 
 ENV = None
@@ -126,11 +127,6 @@ AGENT_LATENCY = Histogram(
     "agent_request_latency_seconds", "Latency of agent /run requests"
 )
 
-# Track cost tokens
-AGENT_COST = Counter(
-    "agent_tokens_total", "Total tokens processed by agent", ["model", "type"]
-)
-
 # Track errors
 AGENT_ERRORS = Counter(
     "agent_errors_total", "Number of failed agent requests", ["reason"]
@@ -151,8 +147,6 @@ async def run_agent(req: RunRequest):
             )
 
             messages: list[dict] = []
-            total_input_tokens = 0
-            total_output_tokens = 0
 
             for m in result["messages"]:
                 entry = {
@@ -170,28 +164,19 @@ async def run_agent(req: RunRequest):
                     out = int(usage.get("output_tokens") or 0)
                     if inp:
                         entry["input_tokens"] = inp
-                        total_input_tokens += inp
                     if out:
                         entry["output_tokens"] = out
-                        total_output_tokens += out
+                    cached = cached_tokens(usage)
+                    if cached:
+                        entry["cached_tokens"] = cached
                     # (optional) include total if present
                     if "total_tokens" in usage:
                         entry["total_tokens"] = int(usage["total_tokens"])
+                    # agent_tokens_total + cached/uncached input split
+                    record_usage(model_name, usage)
 
                 messages.append(entry)
 
-            # increment metrics once per request
-            if total_input_tokens:
-                AGENT_COST.labels(model=model_name, type="input").inc(
-                    total_input_tokens
-                )
-            if total_output_tokens:
-                AGENT_COST.labels(model=model_name, type="output").inc(
-                    total_output_tokens
-                )
-            # if total_input_tokens or total_output_tokens:
-            #     AGENT_TOTAL_TOKENS.labels(model=model_name).inc(total_input_tokens + total_output_tokens)
-
             return TraceResponse(messages=messages)
 
         except Exception as e:
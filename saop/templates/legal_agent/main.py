@@ -202,20 +202,50 @@
 
 # templates/legal_agent/main.py
 from __future__ import annotations
+import asyncio
+import bisect
+import hashlib
 import json
-import time
 import pathlib
-from typing import Any, Dict, Optional, List
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Literal,
+    Optional,
+    List,
+    Tuple,
+    TypeGuard,
+)
 
 import uvicorn
 from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from sse_starlette.sse import EventSourceResponse
 
 # Shared imports
 from saop_core.agent_config import load_config
 from saop_core.telemetry import init_tracing
 from saop_core.llm.client import LLMClient
+from saop_core.llm.cache import ResponseCache
+from saop_core.llm.policy import CallPolicy
+from saop_core.llm.prompt import stable_prefix
+from saop_core.llm.chunking import Chunk, chunk_text, outline, sections
+from saop_core.llm.fence import FenceScanner, extract_json_block
+from saop_core.llm.gdpr_scan import GDPRScan, checked_gdpr_tags, scan_gdpr
+from saop_core.llm.tokens import (
+    PromptPlan,
+    Section,
+    estimate_tokens,
+    observe_estimate,
+    pack_prompt,
+)
+from saop_core.llm.usage import cached_tokens, input_tokens, output_tokens
 from saop_core.mcp.client import MCPClient
+from saop_core.minhash import fingerprint, signature
+from saop_core.pipeline import Stages, StageTimeout, map_bounded
+from saop_core.writebehind import WriteBehindQueue
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from pydantic import BaseModel
@@ -225,32 +255,68 @@ CFG = load_config(BASE_DIR)  # .env + agent.yaml (env wins where specified)
 
 init_tracing(service_name=CFG.service.service_name, otlp_endpoint=CFG.obs.otlp_endpoint)
 
-llm = LLMClient(base_url=CFG.model.base_url, api_key=CFG.model.api_key)
-mcp = MCPClient(base_url=CFG.mcp.base_url, bearer_token=CFG.mcp.bearer_token)
+# One pooled HTTP client for the whole app lifespan (closed in lifespan below)
+llm = LLMClient(
+    base_url=CFG.model.base_url,
+    api_key=CFG.model.api_key,
+    http=CFG.http,
+    cache=ResponseCache(CFG.cache) if CFG.cache.enabled else None,
+    ratelimit=CFG.ratelimit,
+    policy=CallPolicy(CFG.policy),
+    endpoints=CFG.model.endpoints,
+    router=CFG.model.router,
+    max_output_tokens=CFG.model.max_tokens,
+)
+mcp = MCPClient(
+    base_url=CFG.mcp.base_url, bearer_token=CFG.mcp.bearer_token, http=CFG.http
+)
 
-SYSTEM_PROMPT = (CFG.raw_yaml.get("agent") or {}).get("prompt_template", "")
+# Stable prefix, built once: system prompt + static instructions, byte-identical
+# on every call so the provider's prompt cache can reuse it. Per-request content
+# goes after it (see _build_user_prompt).
+ANALYSIS_INSTRUCTIONS = "You will analyze the contract provided by the user."
+SYSTEM_PROMPT = stable_prefix(
+    (CFG.raw_yaml.get("agent") or {}).get("prompt_template", ""),
+    ANALYSIS_INSTRUCTIONS,
+)
+# Part of the response-cache key: bump `version` in agent.yaml (or edit the prompt)
+# to invalidate cached summaries.
+PROMPT_VERSION = "{}:{}".format(
+    (CFG.raw_yaml.get("agent") or {}).get("version", ""),
+    hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12],
+)
 DECLARED_TOOLS = {
     t.get("name") for t in ((CFG.raw_yaml.get("agent") or {}).get("tools") or [])
 }
 
-app = FastAPI(title=f"saop {CFG.service.agent_name} agent")
 
-router = APIRouter(prefix=f"/agents/{CFG.service.agent_name}")
+async def _deliver_summary(job_id: str, args: Dict[str, Any]) -> None:
+    # the job id is the summary id: a retried or replayed job is stored once
+    res = await mcp.call_tool("store_summary", {**args, "id": job_id})
+    if "error" in res:
+        raise RuntimeError(f"store_summary failed: {res['error']}")
 
 
-def _extract_json_block(md: str) -> Optional[Dict[str, Any]]:
-    fence = "```"
-    i = md.rfind(fence)
-    while i != -1:
-        block = md[i + len(fence) :].strip()
-        if block.startswith("json"):
-            block = block[len("json") :].lstrip()
-        try:
-            return json.loads(block)
-        except Exception:
-            md = md[:i]
-            i = md.rfind(fence)
-    return None
+# store_summary runs off the response path; journaled jobs survive restarts
+store_queue = WriteBehindQueue("store_summary", _deliver_summary, CFG.writebehind)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the write-behind store worker; on shutdown flush it and release
+    pooled connections
+    """
+    await store_queue.start()
+    yield
+    await store_queue.stop()
+    await mcp.aclose()
+    await llm.aclose()
+
+
+app = FastAPI(title=f"saop {CFG.service.agent_name} agent", lifespan=lifespan)
+
+router = APIRouter(prefix=f"/agents/{CFG.service.agent_name}")
 
 
 @router.get("/agent-card")
@@ -266,87 +332,1082 @@ class RunBody(BaseModel):
     source: str = "db"
     path_or_url: Optional[str] = None
     prior_context_query: Optional[str] = None
+    # keyword: BM25; semantic: embedding similarity (catches reworded clauses)
+    prior_context_mode: Literal["keyword", "semantic"] = "keyword"
     store: bool = True
-
-
-@router.post("/run")
-async def run(body: RunBody):
-    t0 = time.perf_counter()
-
-    # 1) fetch via MCP
-    doc = await mcp.call_tool(
-        "fetch_contract_text",
-        {
-            "source": body.source,
-            "contract_id": body.contract_id,
-            "path_or_url": body.path_or_url,
-        },
-    )
+    use_cache: bool = True  # False -> always call the model
+    # single: one call (contract truncated to fit); chunked: map-reduce over
+    # section-aligned chunks; focused: one call over the GDPR-scan passages and
+    # the heading outline only; auto: chunked only when the contract does not fit
+    mode: Literal["auto", "single", "chunked", "focused"] = "auto"
+    # True -> summarize even if this exact text (or a near copy) was done before
+    force: bool = False
+
+
+# Upper bound on characters per estimated token (see saop_core.llm.tokens):
+# in single mode nothing past context_window * this can reach the prompt
+MAX_CHARS_PER_TOKEN = 8
+
+
+async def _fetch_doc(body: RunBody) -> Dict[str, Any]:
+    args: Dict[str, Any] = {
+        "source": body.source,
+        "contract_id": body.contract_id,
+        "path_or_url": body.path_or_url,
+    }
+    if body.mode == "single":
+        # the contract gets truncated to the window anyway: let the source stop
+        # reading there (fs reads only that prefix of a large file)
+        args["max_chars"] = CFG.model.context_window * MAX_CHARS_PER_TOKEN
+    doc = await mcp.call_tool("fetch_contract_text", args)
     if "error" in doc:
         raise HTTPException(
-            status_code=404, detail=f"fetch_contract_text failed: {doc['error']}"
+            status_code=413 if doc["error"] == "too_large" else 404,
+            detail=f"fetch_contract_text failed: {doc['error']}",
         )
+    return doc
+
 
-    # 2) optional prior context
+async def _prior_context(body: RunBody) -> List[str]:
     context: List[str] = []
     if body.prior_context_query:
         prior = await mcp.call_tool(
-            "search_prior_summaries", {"query": body.prior_context_query, "limit": 5}
+            "search_prior_summaries",
+            {
+                "query": body.prior_context_query,
+                "limit": 5,
+                "mode": body.prior_context_mode,
+            },
         )
         for r in prior.get("results", []):
             title = r.get("title") or r.get("contract_id") or ""
             preview = (r.get("preview") or "").replace("\n", " ")
             context.append(f"- {title}: {preview}")
+    return context
+
+
+# Prior context may take at most this share of the input budget; the contract
+# gets the rest.
+PRIOR_CONTEXT_SHARE = 0.15
+
+
+def _build_user_prompt(doc: Dict[str, Any], context: List[str]) -> PromptPlan:
+    # Pack into the model's real window: context_window minus max_tokens reserved
+    # for the answer minus the system prompt. Contract first: repeat runs over the
+    # same contract share a longer cached prefix than the prior-context search
+    # results, which change more often.
+    return pack_prompt(
+        SYSTEM_PROMPT,
+        [
+            Section(
+                "contract",
+                "Contract text (may be truncated):\n\n",
+                doc.get("text") or "",
+            ),
+            Section(
+                "prior_context",
+                "Prior context:\n",
+                "",
+                share=PRIOR_CONTEXT_SHARE,
+                items=context,
+            ),
+        ],
+        context_window=CFG.model.context_window,
+        reserve_output=CFG.model.max_tokens,
+    )
+
+
+# ---------- focused mode ----------
+def _focus_passages(
+    text: str, scan: GDPRScan
+) -> Tuple[List[Tuple[int, int, List[str]]], int]:
+    """
+    Passages within focus_tokens, in document order. Passages that cover a
+    gdpr_tags key no earlier pick covered go first, so a tight budget still
+    spans every key the scan found. -> (kept, dropped count)
+    """
+    passages = scan.passages(text, CFG.pipeline.focus_radius)
+    kept: Dict[int, int] = {}  # passage index -> tokens
+    covered: set[str] = set()
+    used = 0
+    for first_pass in (True, False):
+        for i, (a, b, keys) in enumerate(passages):
+            if i in kept or (first_pass and covered.issuperset(keys)):
+                continue
+            cost = estimate_tokens(text[a:b])
+            if used + cost > CFG.pipeline.focus_tokens:
+                continue
+            kept[i] = cost
+            used += cost
+            covered.update(keys)
+    return [passages[i] for i in sorted(kept)], len(passages) - len(kept)
+
+
+def _build_focused_prompt(
+    doc: Dict[str, Any], scan: GDPRScan, context: List[str]
+) -> Tuple[PromptPlan, Dict[str, Any]]:
+    text = doc.get("text") or ""
+    heads = outline(text)
+    offsets = [o for o, _ in heads]
+    passages, dropped = _focus_passages(text, scan)
+    items = []
+    for a, b, keys in passages:
+        # label by the section of the first match, not of the leading context
+        i = bisect.bisect_right(offsets, min(b, a + CFG.pipeline.focus_radius)) - 1
+        where = heads[i][1] if i >= 0 else "start of contract"
+        items.append(f"[{where}] ({', '.join(keys)})\n{text[a:b].strip()}\n")
+    plan = pack_prompt(
+        SYSTEM_PROMPT,
+        [
+            Section(
+                "signals",
+                "Signals already found by a keyword scan (keep them in gdpr_tags):\n",
+                (
+                    json.dumps(_prefill_lists(scan), sort_keys=True)
+                    if scan.prefill
+                    else ""
+                ),
+                share=0.05,
+            ),
+            Section(
+                "outline",
+                "Contract outline (headings only):\n",
+                "",
+                share=0.1,
+                items=[h for _, h in heads],
+            ),
+            Section(
+                "passages",
+                "Relevant contract passages (the rest of the text is omitted):\n\n",
+                "",
+                items=items,
+            ),
+            Section(
+                "prior_context",
+                "Prior context:\n",
+                "",
+                share=PRIOR_CONTEXT_SHARE,
+                items=context,
+            ),
+        ],
+        context_window=CFG.model.context_window,
+        reserve_output=CFG.model.max_tokens,
+    )
+    return plan, {
+        "passages": len(passages),
+        "passages_dropped": dropped,
+        "outline": len(heads),
+        "passage_chars": sum(b - a for a, b, _ in passages),
+        "contract_chars": len(text),
+    }
+
+
+async def _scan(doc: Dict[str, Any], stages: Stages) -> GDPRScan:
+    # CPU-bound, linear in the text: keep it off the event loop
+    return await stages.run(
+        "gdpr_scan", asyncio.to_thread(scan_gdpr, doc.get("text") or "")
+    )
+
+
+def _prefill_lists(scan: GDPRScan) -> Dict[str, Any]:
+    # booleans are defaults only: "no data processing agreement is required"
+    # mentions one too, and the model reads the negation
+    return {k: v for k, v in scan.prefill.items() if not isinstance(v, bool)}
+
+
+def _with_prefill(
+    gdpr: Optional[Dict[str, Any]], scan: GDPRScan
+) -> Optional[Dict[str, Any]]:
+    """
+    Model tags first, then scan-certain list values the model left out. A
+    scanned boolean only fills a key the model gave no value (missing or
+    null); it never overrides the model's true / false.
+    """
+    if not scan.prefill:
+        return gdpr
+    merged = _merge_gdpr_tags([gdpr, _prefill_lists(scan)])
+    for key, value in scan.prefill.items():
+        if isinstance(value, bool) and merged.get(key) is None:
+            merged[key] = value
+    return merged
+
+
+def _token_report(
+    plan: PromptPlan, usage: Dict[str, Any], cached: bool
+) -> Dict[str, Any]:
+    if not cached:
+        observe_estimate(CFG.model.name, plan.estimated_input_tokens, usage)
+    return plan.report(usage)
+
+
+# ---------- chunked (map-reduce) mode ----------
+REDUCE_PROMPT = stable_prefix(
+    "You are a senior legal analyst. You receive bullet-point summaries of "
+    "consecutive parts of ONE contract, in order.",
+    "Merge them into a single summary of 5–10 bullet points covering the whole "
+    "contract. Keep parties, term, obligations, liability, termination and data "
+    "protection points; drop duplicates. Output only the bullet list.",
+)
+
+
+def _mode(body: RunBody, plan: PromptPlan) -> str:
+    if body.mode != "auto":
+        return body.mode
+    return "chunked" if "contract" in plan.truncated else "single"
+
+
+def _chunk_user(chunk: Chunk, count: int) -> str:
+    where = f" (starts at: {chunk.heading})" if chunk.heading else ""
+    return (
+        f"Contract part {chunk.index + 1} of {count}{where}. "
+        "Summarize and tag only this part.\n\n"
+        f"Contract text:\n\n{chunk.text}"
+    )
+
+
+def _split_summary(content: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """(bullets before the first fence, validated gdpr_tags)"""
+    scanner = FenceScanner()
+    scanner.feed(content)
+    tags = checked_gdpr_tags(scanner.close())
+    end = scanner.prose_end if scanner.prose_end is not None else len(content)
+    return content[:end].rstrip(), tags
+
+
+def _tag_key(value: Any) -> str:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return json.dumps(value, sort_keys=True)
+
+
+def _merge_gdpr_tags(parts: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Deterministic union in chunk order: list values are merged keeping the first
+    spelling of each (case/whitespace-insensitive) item, booleans are OR-ed,
+    nulls only survive if no chunk had a value.
+    """
+    merged: Dict[str, Any] = {}
+    for tags in parts:
+        if not isinstance(tags, dict):
+            continue
+        if isinstance(tags.get("gdpr_tags"), dict):
+            tags = tags["gdpr_tags"]
+        for key, value in tags.items():
+            if isinstance(value, bool):
+                merged[key] = bool(merged.get(key)) or value
+            elif value is None or value == []:
+                merged.setdefault(key, value)
+            else:
+                current = merged.get(key)
+                items = current if isinstance(current, list) else []
+                seen = {_tag_key(v) for v in items}
+                for v in value if isinstance(value, list) else [value]:
+                    k = _tag_key(v)
+                    if k not in seen:
+                        seen.add(k)
+                        items.append(v)
+                merged[key] = items
+    return merged
+
+
+def _sum_usage(usages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "input_tokens": sum(input_tokens(u) for u in usages),
+        "output_tokens": sum(output_tokens(u) for u in usages),
+        "cached_tokens": sum(cached_tokens(u) for u in usages),
+    }
+
+
+def _contract_key(body: RunBody, doc: Dict[str, Any]) -> str:
+    return body.contract_id or doc.get("contract_id") or body.path_or_url or "unknown"
+
+
+def _chunk_hash(chunk: Chunk) -> str:
+    # a partial is only reusable for the same text, prompt and model
+    h = hashlib.sha256()
+    for part in (PROMPT_VERSION, CFG.model.name, chunk.text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+async def _stored_partials(
+    body: RunBody, doc: Dict[str, Any], hashes: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Partials stored with the previous version of this contract, by chunk hash."""
+    if not (body.use_cache and "fetch_summary_chunks" in DECLARED_TOOLS):
+        return {}
+    res = await mcp.call_tool(
+        "fetch_summary_chunks",
+        {"contract_id": _contract_key(body, doc), "hashes": hashes},
+    )
+    return res.get("chunks") or {} if "error" not in res else {}
+
+
+async def _map_reduce(
+    body: RunBody,
+    doc: Dict[str, Any],
+    context: List[str],
+    stages: Stages,
+    budget_tokens: int,
+    stream: bool = False,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Summarize + tag section-aligned chunks concurrently (at most
+    chunk_concurrency calls in flight), then one reduce call merges the bullet
+    lists; gdpr_tags are unioned locally. Chunk calls share SYSTEM_PROMPT, so
+    they also share the provider's cached prefix.
+
+    Incremental: chunks whose hash matches a partial stored with the previous
+    version of the contract are reused; only changed chunks hit the model,
+    then the merge step runs again.
+
+    Yields ("chunk", progress) as chunks finish, ("tokens", delta) while the
+    reduce streams (stream=True), then one ("result", {...}).
+    """
+    chunks = chunk_text(
+        doc.get("text") or "", min(CFG.pipeline.chunk_tokens, budget_tokens)
+    )
+    hashes = [_chunk_hash(c) for c in chunks]
+    stored = await stages.run("chunk_lookup", _stored_partials(body, doc, hashes))
+    results: List[Dict[str, Any]] = [{} for _ in chunks]
+    todo: List[Chunk] = []
+    for c, h in zip(chunks, hashes):
+        partial = stored.get(h)
+        if partial is None:
+            todo.append(c)
+            continue
+        results[c.index] = {
+            "summary_md": partial.get("summary_md") or "",
+            "gdpr_json": partial.get("gdpr_json"),
+            "reused": True,
+        }
+        yield "chunk", {
+            "index": c.index,
+            "count": len(chunks),
+            "heading": c.heading,
+            "reused": True,
+        }
+
+    async def summarize(chunk: Chunk) -> Dict[str, Any]:
+        return await llm.responses(
+            system=SYSTEM_PROMPT,
+            user=_chunk_user(chunk, len(chunks)),
+            model=CFG.model.name,
+            temperature=CFG.model.temperature,
+            prompt_version=PROMPT_VERSION,
+            use_cache=body.use_cache,
+        )
+
+    async for i, res in stages.stream(
+        "map",
+        map_bounded(summarize, todo, CFG.pipeline.chunk_concurrency),
+        CFG.pipeline.model_timeout,
+    ):
+        c = todo[i]
+        bullets, tags = _split_summary(res.get("content", ""))
+        results[c.index] = {**res, "summary_md": bullets, "gdpr_json": tags}
+        yield "chunk", {
+            "index": c.index,
+            "count": len(chunks),
+            "heading": c.heading,
+            "reused": False,
+            "cached": bool(res.get("cached")),
+        }
+
+    partials = [
+        {
+            "hash": h,
+            "index": c.index,
+            "heading": c.heading,
+            "summary_md": r["summary_md"],
+            "gdpr_json": r["gdpr_json"],
+        }
+        for c, h, r in zip(chunks, hashes, results)
+    ]
+    gdpr = _merge_gdpr_tags([p["gdpr_json"] for p in partials])
+    plan = pack_prompt(
+        REDUCE_PROMPT,
+        [
+            Section(
+                "summaries",
+                "Part summaries:\n\n",
+                "",
+                items=[
+                    f"Part {c.index + 1}"
+                    + (f" ({c.heading})" if c.heading else "")
+                    + f":\n{p['summary_md']}\n"
+                    for c, p in zip(chunks, partials)
+                ],
+            ),
+            Section(
+                "prior_context",
+                "Prior context:\n",
+                "",
+                share=PRIOR_CONTEXT_SHARE,
+                items=context,
+            ),
+        ],
+        context_window=CFG.model.context_window,
+        reserve_output=CFG.model.max_tokens,
+    )
+    fence = "\n\n```json\n" + json.dumps(gdpr, indent=2) + "\n```"
+
+    reduced: Dict[str, Any] = {}
+    if stream:
+        async for ev in stages.stream(
+            "reduce",
+            llm.responses_stream(
+                system=REDUCE_PROMPT,
+                user=plan.user,
+                model=CFG.model.name,
+                temperature=CFG.model.temperature,
+                prompt_version=PROMPT_VERSION,
+                use_cache=body.use_cache,
+            ),
+            CFG.pipeline.model_timeout,
+        ):
+            if ev["type"] == "delta":
+                yield "tokens", {"text": ev["text"]}
+            else:
+                reduced = ev
+        yield "tokens", {"text": fence}
+    else:
+        reduced = await stages.run(
+            "reduce",
+            llm.responses(
+                system=REDUCE_PROMPT,
+                user=plan.user,
+                model=CFG.model.name,
+                temperature=CFG.model.temperature,
+                prompt_version=PROMPT_VERSION,
+                use_cache=body.use_cache,
+            ),
+            CFG.pipeline.model_timeout,
+        )
+
+    usages = [r.get("usage_metadata") or {} for r in [*results, reduced]]
+    cached = all(r.get("cached") or r.get("reused") for r in [*results, reduced])
+    estimated = plan.estimated_input_tokens + sum(
+        estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(_chunk_user(c, len(chunks)))
+        for c in todo
+    )
+    usage = _sum_usage(usages)
+    yield "result", {
+        "content": (reduced.get("content") or "").rstrip() + fence,
+        "gdpr_json": gdpr,
+        "usage_metadata": usage,
+        "cached": cached,
+        "tokens": {
+            "estimated_input": estimated,
+            "actual_input": usage["input_tokens"] or None,
+            "truncated": plan.truncated,
+        },
+        "chunks": {
+            "total": len(chunks),
+            "reused": len(chunks) - len(todo),
+            "recomputed": len(todo),
+        },
+        "partials": partials,
+    }
+
+
+async def _stored_summary(
+    body: RunBody, doc: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Whole-contract summary already stored for the same text hash, prompt
+    version and model; None when forced, unavailable or not found.
+    """
+    if body.force or not doc.get("sha256") or "lookup_summary" not in DECLARED_TOOLS:
+        return None
+    res = await mcp.call_tool(
+        "lookup_summary",
+        {
+            "hash": doc["sha256"],
+            "prompt_version": PROMPT_VERSION,
+            "model": CFG.model.name,
+        },
+    )
+    return res.get("summary") if res.get("found") else None
+
+
+def _stored_version(mode: str, doc: Dict[str, Any], plan: PromptPlan) -> str:
+    """
+    Prompt version a summary is stored under. Lookups (by hash and of near
+    copies) ask for PROMPT_VERSION, i.e. a summary of the whole contract; one
+    made from part of it (focused passages, a delta, a truncated single call)
+    gets its mode appended so it is never served as one.
+    """
+    whole = mode == "chunked" or (
+        mode == "single"
+        and not doc.get("truncated")
+        and "contract" not in plan.truncated
+    )
+    return PROMPT_VERSION if whole else f"{PROMPT_VERSION}+{mode}"
 
-    user_prompt = (
-        "You will analyze the following contract.\n\n"
-        + ("Prior context:\n" + "\n".join(context) + "\n\n" if context else "")
-        + f"Contract text (may be truncated):\n\n{(doc.get('text') or '')[:200_000]}\n\n"
+
+# ---------- near-duplicate reuse ----------
+Shingled = Tuple[List[int], List[Tuple[int, int, str, str]]]
+
+
+def _shingle(text: str) -> Shingled:
+    """MinHash signature, and (start, end, heading, fingerprint) per section."""
+    return signature(text), [
+        (a, b, h or "start of contract", fingerprint(text[a:b]))
+        for a, b, h in sections(text)
+    ]
+
+
+async def _shingle_doc(doc: Dict[str, Any], stages: Stages) -> Optional[Shingled]:
+    # a truncated read would index (and match) only the prefix
+    if "find_near_duplicates" not in DECLARED_TOOLS or doc.get("truncated"):
+        return None
+    return await stages.run(
+        "minhash", asyncio.to_thread(_shingle, doc.get("text") or "")
     )
 
-    # 3) call model
-    res = await llm.responses(
-        system=SYSTEM_PROMPT,
-        user=user_prompt,
-        model=CFG.model.name,
-        temperature=CFG.model.temperature,
+
+async def _near_duplicate(
+    body: RunBody, shingled: Optional[Shingled]
+) -> Optional[Dict[str, Any]]:
+    """
+    Closest stored near copy of this contract (same prompt version and model)
+    at or above near_dup_delta, with its summary and the sections that differ;
+    None when forced, disabled or nothing is close enough.
+    """
+    threshold = CFG.pipeline.near_dup_delta or CFG.pipeline.near_dup_reuse
+    if (
+        body.force
+        or not body.use_cache
+        or shingled is None
+        or threshold <= 0
+        or not {"find_near_duplicates", "lookup_summary"} <= DECLARED_TOOLS
+    ):
+        return None
+    sig, secs = shingled
+    res = await mcp.call_tool(
+        "find_near_duplicates",
+        {
+            "minhash": sig,
+            "threshold": threshold,
+            "limit": 1,
+            "prompt_version": PROMPT_VERSION,
+            "model": CFG.model.name,
+        },
+    )
+    best = (res.get("results") or [None])[0] if "error" not in res else None
+    if best is None:
+        return None
+    # filtered on prompt version and model above: the summary is keyed by them
+    got = await mcp.call_tool(
+        "lookup_summary",
+        {
+            "hash": best["hash"],
+            "prompt_version": PROMPT_VERSION,
+            "model": CFG.model.name,
+        },
+    )
+    if not got.get("found"):
+        return None
+    stored = best.get("sections") or []
+    prior = {fp for _, fp in stored}
+    current = {fp for *_, fp in secs}
+    headings = {h for _, _, h, _ in secs}
+    return {
+        "summary": got["summary"],
+        "contract_id": best["contract_id"],
+        "similarity": best["similarity"],
+        "changed": [(a, b, h) for a, b, h, fp in secs if fp not in prior],
+        # gone entirely; an edited section is in `changed` under its heading
+        "removed": [h for h, fp in stored if fp not in current and h not in headings],
+    }
+
+
+def _reuses(near: Optional[Dict[str, Any]]) -> TypeGuard[Dict[str, Any]]:
+    """Return the near copy's summary as is: same sections, or close enough."""
+    if near is None:
+        return False
+    if not near["changed"] and not near["removed"]:
+        return True
+    reuse = CFG.pipeline.near_dup_reuse
+    return reuse > 0 and near["similarity"] >= reuse
+
+
+# tags that name the contract's parties: a near copy is the same template
+# signed by others, so its values for these are not this contract's
+_PARTY_TAGS = ("controller", "processors_or_subprocessors")
+
+
+def _reused_tags(near: Dict[str, Any], scan: GDPRScan) -> Optional[Dict[str, Any]]:
+    """The near copy's gdpr_json with the party tags unknown (null), then this
+    contract's own scan values."""
+    gdpr = near["summary"].get("gdpr_json")
+    if isinstance(gdpr, dict):
+        gdpr = {**gdpr, **{k: None for k in _PARTY_TAGS if k in gdpr}}
+    return _with_prefill(gdpr, scan)
+
+
+def _near_report(near: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "summary_id": near["summary"].get("id"),
+        "contract_id": near["contract_id"],
+        "similarity": near["similarity"],
+        "changed_sections": [h for _, _, h in near["changed"]],
+        "removed_sections": near["removed"],
+    }
+
+
+def _diff_note(near: Dict[str, Any]) -> str:
+    note = (
+        f"> Reused the summary of contract {near['contract_id']}, a near copy "
+        f"of this one (similarity {near['similarity']:.2f})."
     )
-    content = res.get("content", "")
-    gdpr = _extract_json_block(content)
+    changed = [h for _, _, h in near["changed"]]
+    if changed:
+        note += f" Sections that differ and were not re-analyzed: {'; '.join(changed)}."
+    if near["removed"]:
+        note += f" Sections only in that contract: {'; '.join(near['removed'])}."
+    if not changed and not near["removed"]:
+        note += " All sections match; only formatting differs."
+    return note + " Its controller and processor tags are not carried over."
+
+
+def _build_delta_prompt(
+    doc: Dict[str, Any], near: Dict[str, Any], context: List[str]
+) -> PromptPlan:
+    text = doc.get("text") or ""
+    return pack_prompt(
+        SYSTEM_PROMPT,
+        [
+            Section(
+                "prior_summary",
+                f"This contract is a near copy of contract {near['contract_id']} "
+                f"(similarity {near['similarity']:.2f}), summarized below. Only "
+                "the sections that differ from it are included; the rest reads "
+                "the same. Write the summary and gdpr_tags of THIS contract in "
+                "the usual format, updating the one below for the differences.\n\n"
+                f"Summary of {near['contract_id']}:\n\n",
+                near["summary"].get("summary_md") or "",
+                share=0.3,
+            ),
+            Section(
+                "changes",
+                "Sections of this contract that differ:\n\n",
+                "",
+                items=[f"[{h}]\n{text[a:b].strip()}\n" for a, b, h in near["changed"]],
+            ),
+            Section(
+                "removed",
+                "Sections of that contract missing from this one:\n",
+                "",
+                share=0.05,
+                items=near["removed"],
+            ),
+            Section(
+                "prior_context",
+                "Prior context:\n",
+                "",
+                share=PRIOR_CONTEXT_SHARE,
+                items=context,
+            ),
+        ],
+        context_window=CFG.model.context_window,
+        reserve_output=CFG.model.max_tokens,
+    )
+
 
-    # 4) optional store
-    summary_id = None
-    if body.store and "store_summary" in DECLARED_TOOLS:
+def _plan(
+    body: RunBody,
+    doc: Dict[str, Any],
+    scan: GDPRScan,
+    context: List[str],
+    near: Optional[Dict[str, Any]],
+) -> Tuple[PromptPlan, str, Optional[Dict[str, Any]]]:
+    """-> (plan, mode, focus report)"""
+    if body.mode == "focused":
+        plan, focus = _build_focused_prompt(doc, scan, context)
+        return plan, "focused", focus
+    if near is not None and body.mode in ("auto", "single"):
+        plan = _build_delta_prompt(doc, near, context)
+        # everything that differs must reach the model, or the delta is wrong
+        if not {"prior_summary", "changes"} & set(plan.truncated):
+            return plan, "delta", None
+    plan = _build_user_prompt(doc, context)
+    return plan, _mode(body, plan), None
+
+
+async def _gather_inputs(
+    body: RunBody, stages: Stages
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Fetch and prior-context search are independent: run them concurrently, so
+    wall time is max(fetch, search). A failed or timed-out fetch cancels the
+    search; a timed-out search just means no prior context.
+    """
+
+    async def context() -> List[str]:
         try:
-            sresp = await mcp.call_tool(
-                "store_summary",
-                {
-                    "contract_id": body.contract_id
-                    or doc.get("contract_id")
-                    or body.path_or_url
-                    or "unknown",
-                    "summary_md": content,
-                    "gdpr_json": gdpr,
-                    "hash": doc.get("sha256"),
-                },
+            return await stages.run(
+                "prior_context", _prior_context(body), CFG.pipeline.context_timeout
             )
-            summary_id = sresp.get("id")
-        except Exception:
-            summary_id = None  # non-fatal
+        except StageTimeout:
+            return []
+
+    try:
+        doc, ctx = await stages.concurrently(
+            stages.run("fetch", _fetch_doc(body), CFG.pipeline.fetch_timeout),
+            context(),
+        )
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return doc, ctx
+
+
+async def _store(
+    body: RunBody,
+    doc: Dict[str, Any],
+    content: str,
+    gdpr: Optional[Dict[str, Any]],
+    prompt_version: str,
+    partials: Optional[List[Dict[str, Any]]] = None,
+    shingled: Optional[Shingled] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Queue store_summary (write-behind). The job id is also the id the summary
+    is stored under (`summary_id`, for get_summary once the job is done).
+    Chunk partials ride along so the next revision can reuse them, the MinHash
+    signature and section fingerprints so near copies can.
+    """
+    if not (body.store and "store_summary" in DECLARED_TOOLS):
+        return None
+    args: Dict[str, Any] = {
+        "contract_id": _contract_key(body, doc),
+        "summary_md": content,
+        "gdpr_json": gdpr,
+        "hash": doc.get("sha256"),
+        "prompt_version": prompt_version,
+        "model": CFG.model.name,
+    }
+    if partials:
+        args["chunks"] = partials
+    if shingled is not None:
+        args["minhash"] = shingled[0]
+        args["sections"] = [[h, fp] for _, _, h, fp in shingled[1]]
+    parties = [
+        p
+        for key in ("controller", "processors_or_subprocessors")
+        for p in (gdpr or {}).get(key) or []
+        if isinstance(p, str)
+    ]
+    if parties:
+        args["parties"] = parties  # boosted in search_prior_summaries
+    job_id = await store_queue.submit(args)
+    return {"job_id": job_id, "summary_id": job_id, "status": "queued"}
+
+
+@router.post("/run")
+async def run(body: RunBody):
+    stages = Stages()
+
+    # 1) fetch + optional prior context, concurrently
+    doc, context = await _gather_inputs(body, stages)
+
+    # fast path: this exact text was already summarized with this prompt + model
+    hit = await stages.run("summary_lookup", _stored_summary(body, doc))
+    if hit is not None:
+        return JSONResponse(
+            {
+                "ok": True,
+                "agent": CFG.service.agent_name,
+                "model": CFG.model.name,
+                "path": "summary_store",
+                "summary_id": hit.get("id"),
+                "latency_seconds": stages.report()["total"],
+                "cached": True,
+                "timings": stages.report(),
+                "content": hit.get("summary_md") or "",
+                "gdpr_json": hit.get("gdpr_json"),
+            }
+        )
+
+    # near copy of a stored contract (same template, other parties / dates)
+    shingled = await _shingle_doc(doc, stages)
+    near = await stages.run("near_duplicate", _near_duplicate(body, shingled))
+    if _reuses(near):
+        gdpr = _reused_tags(near, await _scan(doc, stages))
+        return JSONResponse(
+            {
+                "ok": True,
+                "agent": CFG.service.agent_name,
+                "model": CFG.model.name,
+                "path": "near_duplicate",
+                "summary_id": None,  # nothing stored for this contract
+                "reused_from": near["summary"].get("id"),
+                "near_duplicate": _near_report(near),
+                "latency_seconds": stages.report()["total"],
+                "cached": True,
+                "timings": stages.report(),
+                "content": f"{near['summary'].get('summary_md') or ''}\n\n"
+                + _diff_note(near),
+                "gdpr_json": gdpr,
+            }
+        )
+
+    # 2) GDPR keyword scan: pre-filled tags, and the passages for focused mode;
+    # a near copy's summary + only the differing sections when there is one
+    scan = await _scan(doc, stages)
+    plan, mode, focus = _plan(body, doc, scan, context, near)
+
+    # 3) call model: one call, or map-reduce over chunks
+    partials, chunks = None, None
+    try:
+        if mode == "chunked":
+            async for event, data in _map_reduce(
+                body, doc, context, stages, plan.budget_tokens
+            ):
+                if event == "result":
+                    result = data
+            content, gdpr = result["content"], result["gdpr_json"]
+            usage, cached, tokens = (
+                result["usage_metadata"],
+                result["cached"],
+                result["tokens"],
+            )
+            partials, chunks = result["partials"], result["chunks"]
+        else:
+            res = await stages.run(
+                "model",
+                llm.responses(
+                    system=SYSTEM_PROMPT,
+                    user=plan.user,
+                    model=CFG.model.name,
+                    temperature=CFG.model.temperature,
+                    prompt_version=PROMPT_VERSION,
+                    use_cache=body.use_cache,
+                ),
+                CFG.pipeline.model_timeout,
+            )
+            content = res.get("content", "")
+            usage = res.get("usage_metadata") or {}
+            cached = bool(res.get("cached"))
+            gdpr = checked_gdpr_tags(extract_json_block(content))
+            tokens = _token_report(plan, usage, cached)
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    gdpr = _with_prefill(gdpr, scan)
+
+    # 4) optional store, write-behind
+    store = await stages.run(
+        "store_enqueue",
+        _store(
+            body,
+            doc,
+            content,
+            gdpr,
+            _stored_version(mode, doc, plan),
+            partials,
+            shingled,
+        ),
+    )
 
     return JSONResponse(
         {
             "ok": True,
             "agent": CFG.service.agent_name,
             "model": CFG.model.name,
-            "latency_seconds": time.perf_counter() - t0,
-            "summary_id": summary_id,
+            "path": "model",
+            "mode": mode,
+            "summary_id": (store or {}).get("summary_id"),
+            "latency_seconds": stages.report()["total"],
+            "store": store,
+            "cached": cached,
+            "usage_metadata": usage,
+            "tokens": tokens,
+            "chunks": chunks,
+            "near_duplicate": (
+                _near_report(near) if mode == "delta" and near is not None else None
+            ),
+            "scan": {**scan.report(), "focus": focus},
+            "timings": stages.report(),
             "content": content,
             "gdpr_json": gdpr,
         }
     )
 
 
+async def _run_events(body: RunBody) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Same steps as /run, yielding (event, data) as each stage completes:
+    fetched -> prior-context -> gdpr-scan -> [chunk*] -> tokens* -> gdpr_json ->
+    stored -> done. `chunk` events only appear in chunked mode, one per reused or
+    finished chunk.
+    A stored-summary hit skips straight to tokens -> gdpr_json -> done; a near
+    copy's summary reused as is to gdpr-scan -> tokens -> gdpr_json -> done.
+    """
+    stages = Stages()
+    try:
+        doc, context = await _gather_inputs(body, stages)
+        yield "fetched", {
+            "contract_id": doc.get("contract_id"),
+            "sha256": doc.get("sha256"),
+            "chars": len(doc.get("text") or ""),
+        }
+        yield "prior-context", {"count": len(context), "items": context}
+
+        hit = await stages.run("summary_lookup", _stored_summary(body, doc))
+        if hit is not None:
+            yield "tokens", {"text": hit.get("summary_md") or ""}
+            yield "gdpr_json", {"gdpr_json": hit.get("gdpr_json")}
+            yield "done", {
+                "ok": True,
+                "agent": CFG.service.agent_name,
+                "model": CFG.model.name,
+                "path": "summary_store",
+                "summary_id": hit.get("id"),
+                "latency_seconds": stages.report()["total"],
+                "cached": True,
+                "timings": stages.report(),
+            }
+            return
+
+        shingled = await _shingle_doc(doc, stages)
+        near = await stages.run("near_duplicate", _near_duplicate(body, shingled))
+        if _reuses(near):
+            scan = await _scan(doc, stages)
+            yield "gdpr-scan", scan.report()
+            text = f"{near['summary'].get('summary_md') or ''}\n\n{_diff_note(near)}"
+            yield "tokens", {"text": text}
+            yield "gdpr_json", {"gdpr_json": _reused_tags(near, scan)}
+            yield "done", {
+                "ok": True,
+                "agent": CFG.service.agent_name,
+                "model": CFG.model.name,
+                "path": "near_duplicate",
+                "summary_id": None,
+                "reused_from": near["summary"].get("id"),
+                "near_duplicate": _near_report(near),
+                "latency_seconds": stages.report()["total"],
+                "cached": True,
+                "timings": stages.report(),
+            }
+            return
+
+        scan = await _scan(doc, stages)
+        yield "gdpr-scan", scan.report()
+        plan, mode, focus = _plan(body, doc, scan, context, near)
+        partials, chunks = None, None
+        if mode == "chunked":
+            async for event, data in _map_reduce(
+                body, doc, context, stages, plan.budget_tokens, stream=True
+            ):
+                if event == "result":
+                    result = data
+                else:
+                    yield event, data
+            content, gdpr = result["content"], result["gdpr_json"]
+            usage, cached, tokens = (
+                result["usage_metadata"],
+                result["cached"],
+                result["tokens"],
+            )
+            partials, chunks = result["partials"], result["chunks"]
+        else:
+            content, usage, cached = "", {}, False
+            # fence scan runs on the deltas as they arrive, not on the whole text after
+            scanner, streamed = FenceScanner(), 0
+            # drained in its own task: no timeout scope across our yields
+            async for ev in stages.stream(
+                "model",
+                llm.responses_stream(
+                    system=SYSTEM_PROMPT,
+                    user=plan.user,
+                    model=CFG.model.name,
+                    temperature=CFG.model.temperature,
+                    prompt_version=PROMPT_VERSION,
+                    use_cache=body.use_cache,
+                ),
+                CFG.pipeline.model_timeout,
+            ):
+                if ev["type"] == "delta":
+                    scanner.feed(ev["text"])
+                    streamed += len(ev["text"])
+                    yield "tokens", {"text": ev["text"]}
+                else:
+                    content, usage = ev["content"], ev["usage_metadata"]
+                    cached = bool(ev.get("cached"))
+            if streamed < len(content):
+                scanner.feed(content[streamed:])
+            gdpr = checked_gdpr_tags(scanner.close())
+            tokens = _token_report(plan, usage, cached)
+        gdpr = _with_prefill(gdpr, scan)
+
+        yield "gdpr_json", {"gdpr_json": gdpr}
+
+        store = await stages.run(
+            "store_enqueue",
+            _store(
+                body,
+                doc,
+                content,
+                gdpr,
+                _stored_version(mode, doc, plan),
+                partials,
+                shingled,
+            ),
+        )
+        yield "stored", {"store": store}
+
+        yield "done", {
+            "ok": True,
+            "agent": CFG.service.agent_name,
+            "model": CFG.model.name,
+            "path": "model",
+            "mode": mode,
+            "summary_id": (store or {}).get("summary_id"),
+            "latency_seconds": stages.report()["total"],
+            "cached": cached,
+            "usage_metadata": usage,
+            "tokens": tokens,
+            "chunks": chunks,
+            "near_duplicate": (
+                _near_report(near) if mode == "delta" and near is not None else None
+            ),
+            "scan": {**scan.report(), "focus": focus},
+            "timings": stages.report(),
+        }
+    except HTTPException as e:
+        yield "error", {"status_code": e.status_code, "detail": e.detail}
+    except StageTimeout as e:
+        yield "error", {"status_code": 504, "detail": str(e)}
+    except Exception as e:
+        yield "error", {"status_code": 500, "detail": f"{type(e).__name__}: {e}"}
+
+
+@router.post("/run/stream")
+async def run_stream(body: RunBody, format: str = "sse"):
+    """
+    Streaming /run. `format=sse` (default) sends Server-Sent Events,
+    `format=ndjson` sends one {"event": ..., "data": ...} JSON object per line.
+    """
+    if format == "ndjson":
+
+        async def ndjson():
+            async for event, data in _run_events(body):
+                yield json.dumps({"event": event, "data": data}) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    async def sse():
+        async for event, data in _run_events(body):
+            yield {"event": event, "data": json.dumps(data)}
+
+    return EventSourceResponse(sse())
+
+
+# mounted last: include_router copies the routes registered so far
+app.include_router(router)
+
 Instrumentator().instrument(app).expose(
     app,
     endpoint="/metrics",
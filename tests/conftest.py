@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import pytest
+
+TEMPLATE = pathlib.Path(__file__).resolve().parents[1] / "saop/templates/legal_agent"
+
+
+class Agent:
+    """The legal agent template with in-process tools and a scripted model."""
+
+    def __init__(self, main: Any, tools: Any, client: Any):
+        self.main = main
+        self.tools = tools
+        self.client = client
+        self.prefix = f"/agents/{main.CFG.service.agent_name}"
+        self.docs: Dict[str, str] = {}  # path_or_url -> contract text
+        self.prompts: List[str] = []
+        self.reply = "- summary\n```json\n{}\n```"
+        self.delay = 0.0  # seconds the model takes to answer
+
+    def run(self, path: str, **body: Any) -> Dict[str, Any]:
+        body = {"source": "url", "path_or_url": path, "use_cache": False, **body}
+        res = self.client.post(f"{self.prefix}/run", json=body)
+        assert res.status_code == 200, res.text
+        return res.json()
+
+    def stream(self, path: str, **body: Any) -> List[Tuple[str, Any]]:
+        """POST /run/stream and parse the SSE response -> [(event, data), ...]."""
+        body = {"source": "url", "path_or_url": path, "use_cache": False, **body}
+        res = self.client.post(f"{self.prefix}/run/stream", json=body)
+        assert res.status_code == 200, res.text
+        events = []
+        for block in res.text.replace("\r\n", "\n").split("\n\n"):
+            fields = dict(
+                line.split(": ", 1) for line in block.splitlines() if ": " in line
+            )
+            if "event" in fields:
+                events.append((fields["event"], json.loads(fields.get("data", "null"))))
+        return events
+
+    def stored(self, summary_id: str, timeout: float = 5.0) -> Dict[str, Any]:
+        """Wait for the write-behind job, then return the stored summary."""
+        store = self.tools.SUMMARY_STORE
+        for _ in range(int(timeout / 0.01)):
+            summary = asyncio.run(store.get_stored(id=summary_id))
+            if summary is not None:
+                return summary
+            time.sleep(0.01)
+        raise AssertionError(f"{summary_id} was not stored")
+
+
+@pytest.fixture(scope="session")
+def agent():
+    pytest.importorskip("sse_starlette")
+    pytest.importorskip("prometheus_fastapi_instrumentator")
+    from fastapi.testclient import TestClient
+
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    sys.path.insert(0, str(TEMPLATE))
+    import main
+    from saop_core.mcp import legal_tool_defs as tools
+
+    client = TestClient(main.app)
+    agent = Agent(main, tools, client)
+
+    async def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if name == "fetch_contract_text":
+            text = agent.docs[args["path_or_url"]]
+            return {
+                "contract_id": args.get("contract_id") or args["path_or_url"],
+                "text": text,
+                "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            }
+        return await getattr(tools, name)(**args)
+
+    async def model(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        agent.prompts.append(payload["input"][-1]["content"])
+        await asyncio.sleep(agent.delay)
+        if payload.get("stream"):
+            text = agent.reply
+            deltas = [text[i : i + 7] for i in range(0, len(text), 7)]
+            events = [
+                {"type": "response.output_text.delta", "delta": d} for d in deltas
+            ]
+            events.append(
+                {
+                    "type": "response.completed",
+                    "response": {"usage": {"input_tokens": 100, "output_tokens": 20}},
+                }
+            )
+            sse = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+            return httpx.Response(200, content=sse.encode())
+        return httpx.Response(
+            200,
+            json={
+                "output": [{"content": [{"text": agent.reply}]}],
+                "usage": {"input_tokens": 100, "output_tokens": 20},
+            },
+        )
+
+    main.mcp.call_tool = call_tool
+    main.llm._client = httpx.AsyncClient(transport=httpx.MockTransport(model))
+    main.llm._owns_client = False
+    with client:
+        yield agent
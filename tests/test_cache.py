@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+from saop_core.agent_config import CacheConfig
+from saop_core.llm.cache import ResponseCache, cache_key
+
+
+def test_key_includes_max_output_tokens():
+    base = ("m", 0.1, "sys", "user", "v1")
+    assert cache_key(*base) != cache_key(*base, max_output_tokens=256)
+    assert cache_key(*base, max_output_tokens=256) != cache_key(
+        *base, max_output_tokens=512
+    )
+    assert cache_key(*base) == cache_key(*base, max_output_tokens=0)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(CacheConfig(max_entries=2))
+
+    async def run():
+        await cache.put("a", {"content": "A"})
+        await cache.put("b", {"content": "B"})
+        assert await cache.get("a") == {"content": "A"}  # b is now oldest
+        await cache.put("c", {"content": "C"})
+        return [await cache.get(k) for k in "abc"]
+
+    assert asyncio.run(run()) == [{"content": "A"}, None, {"content": "C"}]
+
+
+def test_disk_overwrite_does_not_double_count(tmp_path):
+    cache = ResponseCache(CacheConfig(directory=str(tmp_path)))
+
+    async def run():
+        await cache.put("k1", {"content": "first"})
+        for _ in range(5):
+            await cache.put("k0", {"content": "x" * 100})
+
+    asyncio.run(run())
+    on_disk = sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(tmp_path)
+        for f in files
+    )
+    assert cache._disk_bytes == on_disk
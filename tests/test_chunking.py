@@ -0,0 +1,46 @@
+import random
+import time
+
+from saop_core.llm.chunking import chunk_text, sections
+from saop_core.llm.tokens import estimate_tokens, token_windows
+
+
+def _check_windows(text, max_tokens):
+    spans = token_windows(text, max_tokens)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(a == prev_b for (_, prev_b), (a, _) in zip(spans, spans[1:]))
+    assert all(estimate_tokens(text[a:b]) <= max_tokens for a, b in spans)
+    return spans
+
+
+def test_token_windows_cover_text_within_budget():
+    rng = random.Random(3)
+    words = ["the", "processor", "shall", "notify", "x" * 30, ",", ".", "(a)"]
+    for _ in range(50):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 400)))
+        _check_windows(text, rng.choice([16, 50, 200]))
+
+
+def test_token_windows_slice_a_word_longer_than_the_budget():
+    spans = _check_windows("a" * 10_000, 100)
+    assert len(spans) > 1
+
+
+def test_oversized_paragraph_is_split_in_linear_time():
+    small = "word " * 50_000
+    t0 = time.perf_counter()
+    chunk_text(small, 500)
+    small_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    chunks = chunk_text(small * 4, 500)
+    big_s = time.perf_counter() - t0
+    assert all(c.tokens <= 500 for c in chunks)
+    assert "".join(c.text for c in chunks) == small * 4
+    assert big_s < small_s * 8  # quadratic would be ~16x
+
+
+def test_chunks_start_at_headings():
+    text = "ARTICLE 1 Scope\n" + "a b c " * 100 + "\nARTICLE 2 Data\n" + "d e " * 150
+    chunks = chunk_text(text, 700)
+    assert [c.heading for c in chunks] == ["ARTICLE 1 Scope", "ARTICLE 2 Data"]
+    assert [h for _, _, h in sections(text)] == ["ARTICLE 1 Scope", "ARTICLE 2 Data"]
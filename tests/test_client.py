@@ -0,0 +1,106 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import httpx
+
+from saop_core.agent_config import CacheConfig, ModelEndpoint
+from saop_core.llm.cache import ResponseCache
+from saop_core.llm.client import LLMClient
+
+_EVENTS: List[Dict[str, Any]] = [
+    {"type": "response.output_text.delta", "delta": "Hel"},
+    {"type": "response.output_text.delta", "delta": "lo"},
+    {
+        "type": "response.completed",
+        "response": {
+            "usage": {
+                "input_tokens": 10,
+                "output_tokens": 2,
+                "input_tokens_details": {"cached_tokens": 4},
+            }
+        },
+    },
+]
+
+
+def _sse(events: List[Dict[str, Any]]) -> bytes:
+    lines = [f"data: {json.dumps(e)}\n\n" for e in events] + ["data: [DONE]\n\n"]
+    return "".join(lines).encode()
+
+
+def _client(handler, **kw: Any) -> LLMClient:
+    return LLMClient(
+        "http://a/v1",
+        "",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        **kw,
+    )
+
+
+def _collect(client: LLMClient) -> List[Dict[str, Any]]:
+    async def run():
+        return [
+            ev
+            async for ev in client.responses_stream(
+                system="sys", user="contract", model="m"
+            )
+        ]
+
+    return asyncio.run(run())
+
+
+def test_stream_yields_deltas_then_the_full_text_and_usage() -> None:
+    payloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        payloads.append(json.loads(request.content))
+        return httpx.Response(200, content=_sse(_EVENTS))
+
+    events = _collect(_client(handler))
+    assert payloads[0]["stream"] is True
+    assert [e["type"] for e in events] == ["delta", "delta", "done"]
+    assert "".join(e["text"] for e in events[:2]) == "Hello"
+    assert events[-1]["content"] == "Hello"
+    assert events[-1]["usage_metadata"]["cached_tokens"] == 4
+
+
+def test_stream_fails_over_before_the_first_delta(monkeypatch) -> None:
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "a":
+            return httpx.Response(503)
+        return httpx.Response(200, content=_sse(_EVENTS))
+
+    client = _client(
+        handler,
+        endpoints=[
+            ModelEndpoint("a", "http://a/v1", ""),
+            ModelEndpoint("b", "http://b/v1", ""),
+        ],
+    )
+    router = client.router
+    monkeypatch.setattr(  # in order, instead of two random choices
+        router,
+        "pick",
+        lambda exclude=(): [e for e in router.endpoints if e not in exclude][0],
+    )
+    events = _collect(client)
+    assert hosts == ["a", "b"] and events[-1]["content"] == "Hello"
+
+
+def test_cached_answer_is_replayed_as_one_delta() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        return httpx.Response(200, content=_sse(_EVENTS))
+
+    client = _client(handler, cache=ResponseCache(CacheConfig(max_entries=8)))
+    _collect(client)
+    replay = _collect(client)
+    assert len(calls) == 1
+    assert [e["type"] for e in replay] == ["delta", "done"]
+    assert replay[0]["text"] == "Hello" and replay[-1]["cached"] is True
@@ -0,0 +1,64 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from saop_core.mcp import db
+
+
+def _pool(opened, closed, max_size=2, timeout=0.05) -> db.Pool:
+    async def connect():
+        opened.append(len(opened))
+        return {"id": opened[-1], "ok": True}
+
+    async def close(conn):
+        closed.append(conn["id"])
+
+    return db.Pool(connect, close, lambda c: c["ok"], max_size, timeout)
+
+
+def test_pool_reuses_connections_and_drops_broken_ones() -> None:
+    opened: List[int] = []
+    closed: List[int] = []
+
+    async def run():
+        pool = _pool(opened, closed)
+        a = await pool.acquire()
+        await pool.release(a)
+        b = await pool.acquire()
+        assert b is a
+        b["ok"] = False
+        await pool.release(b)
+        c = await pool.acquire()
+        await pool.release(c, discard=True)
+
+    asyncio.run(run())
+    assert opened == [0, 1] and closed == [0, 1]
+
+
+def test_pool_times_out_when_exhausted() -> None:
+    async def run():
+        pool = _pool([], [], max_size=1)
+        await pool.acquire()
+        await pool.acquire()
+
+    with pytest.raises(db.PoolTimeout):
+        asyncio.run(run())
+
+
+def test_run_query_refuses_writes() -> None:
+    with pytest.raises(db.NotReadOnly):
+        asyncio.run(db.run_query("DELETE FROM contracts"))
+
+
+def test_aclose_closes_idle_connections_and_resets_the_pool(monkeypatch) -> None:
+    closed: List[int] = []
+    monkeypatch.setattr(db, "_POOL", _pool([], closed))
+
+    async def run():
+        pool = db.pool()
+        await pool.release(await pool.acquire())
+        await db.aclose()
+
+    asyncio.run(run())
+    assert closed == [0] and db._POOL is None
@@ -0,0 +1,41 @@
+import pytest
+
+from saop_core.mcp.facet_index import FacetIndex, InvalidFilter
+
+
+def _fill(index: FacetIndex) -> None:
+    index.add("s1", "c1", {"dpa_present": True, "controller": ["Acme Ltd"]}, 1)
+    index.add("s2", "c2", {"dpa_present": False, "controller": ["Beta GmbH"]}, 2)
+    index.add("s3", "c3", {"dpa_present": True, "controller": None}, 3)
+    index.add("s4", "c1", {"dpa_present": False, "controller": ["ACME  ltd"]}, 4)
+
+
+def _ids(res) -> list:
+    return [r["id"] for r in res["results"]]
+
+
+def test_filters_counts_and_superseded_documents() -> None:
+    index = FacetIndex(None)
+    _fill(index)
+    assert len(index) == 3
+    assert _ids(index.query({"field": "dpa_present", "value": True})) == ["s3"]
+    res = index.query(
+        {"field": "controller", "term": "acme"}, facet_keys=["dpa_present"]
+    )
+    assert _ids(res) == ["s4"] and res["facets"]["dpa_present"]
+    missing = index.query({"field": "controller", "exists": False})
+    assert _ids(missing) == ["s3"]
+    page = index.query(offset=1, limit=1)
+    assert page["total"] == 3 and _ids(page) == ["s3"]
+    with pytest.raises(InvalidFilter):
+        index.query({"field": "controller"})
+
+
+def test_snapshot_and_replay_restore_the_index(tmp_path) -> None:
+    index = FacetIndex(str(tmp_path), snapshot_every=2)
+    _fill(index)
+    assert (tmp_path / "snapshot.npz").exists()
+    reloaded = FacetIndex(str(tmp_path), snapshot_every=2)
+    res = reloaded.query({"field": "dpa_present", "value": False})
+    assert _ids(res) == ["s4", "s2"]
+    assert res["results"][0]["created_at"] == 4
@@ -0,0 +1,27 @@
+from saop_core.llm.fence import FenceScanner, extract_json_block
+
+
+def _streamed(md: str, size: int) -> object:
+    scanner = FenceScanner()
+    for i in range(0, len(md), size):
+        scanner.feed(md[i : i + size])
+    return scanner.close()
+
+
+def test_inline_backticks_do_not_flip_fence_parity() -> None:
+    md = 'use ``` inline\n```json\n{"a":1}\n```'
+    assert extract_json_block(md) == {"a": 1}
+    for size in (1, 2, 3, 5):
+        assert _streamed(md, size) == {"a": 1}
+
+
+def test_backticks_inside_the_block_do_not_close_it() -> None:
+    md = 'Summary\n```json\n{"s": "x ``` y"}\n```\n'
+    assert extract_json_block(md) == {"s": "x ``` y"}
+    assert _streamed(md, 1) == {"s": "x ``` y"}
+
+
+def test_indented_fence_and_unterminated_block() -> None:
+    assert extract_json_block('   ```json\n{"a":1}\n   ```') == {"a": 1}
+    assert extract_json_block('    ```json\n{"a":1}\n```') is None  # code block
+    assert extract_json_block('text\n```json\n{"a":1}') == {"a": 1}
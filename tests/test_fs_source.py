@@ -0,0 +1,40 @@
+import asyncio
+
+from saop_core.mcp import fs_source
+from saop_core.mcp import legal_tool_defs as tools
+
+
+def _fetch(path: str) -> dict:
+    return asyncio.run(tools.fetch_contract_text(source="fs", path_or_url=path))
+
+
+def test_unreadable_paths_are_reported_not_raised(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(fs_source, "ROOTS", [tmp_path.resolve()])
+    (tmp_path / "folder").mkdir()
+    assert _fetch("folder")["error"] == "not_a_file"
+    assert _fetch("/etc/passwd")["error"] == "path_not_allowed"
+
+    def denied(path, max_chars=None):
+        raise PermissionError(13, "Permission denied", str(path))
+
+    (tmp_path / "locked.txt").write_text("x")
+    monkeypatch.setattr(fs_source, "read_text", denied)
+    res = _fetch("locked.txt")
+    assert res["error"] == "permission_denied" and "locked.txt" in res["detail"]
+
+
+def test_fetch_reads_under_the_root(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(fs_source, "ROOTS", [tmp_path.resolve()])
+    (tmp_path / "c.txt").write_text("Data Processing Agreement", encoding="utf-8")
+    res = _fetch("c.txt")
+    assert res["text"] == "Data Processing Agreement" and not res["truncated"]
+
+
+def test_fs_hash_covers_the_whole_file_when_truncated(tmp_path):
+    text = "é clause " * 1000
+    path = tmp_path / "c.txt"
+    path.write_text(text, encoding="utf-8")
+    full = fs_source.read_text(path)
+    prefix = fs_source.read_text(path, max_chars=100)
+    assert prefix.truncated and prefix.text == text[:100]
+    assert prefix.sha256 == full.sha256
@@ -0,0 +1,21 @@
+from saop_core.llm.gdpr_scan import checked_gdpr_tags, scan_gdpr
+
+
+def test_scan_prefills_settled_values_and_locates_the_rest():
+    text = (
+        "The Processor shall process the date of birth of employees and rely "
+        "on standard contractual clauses. The Controller remains liable."
+    )
+    scan = scan_gdpr(text)
+    assert scan.prefill["cross_border_transfers"]
+    assert scan.prefill["personal_data_types"]
+    assert "controller" in scan.counts()  # located, never prefilled
+    assert "controller" not in scan.prefill
+    (start, end, keys), *_ = scan.passages(text, radius=20)
+    assert start == 0 and keys
+
+
+def test_checked_tags_coerce_booleans():
+    tags = checked_gdpr_tags({"dpa_present": "false", "controller": "ACME"})
+    assert tags is not None
+    assert tags["dpa_present"] is False
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+import pytest
+from aiohttp import ClientResponseError, web
+
+from saop_core.mcp import http_fetch
+from saop_core.mcp.url_cache import UrlCache
+
+Route = Callable[[web.Request], Awaitable[web.Response]]
+
+
+async def _serve(route: Route, test: Callable[[str], Awaitable[Any]]) -> Any:
+    app = web.Application()
+    app.router.add_get("/doc", route)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        return await test(f"http://127.0.0.1:{port}/doc")
+    finally:
+        await http_fetch.aclose()
+        await runner.cleanup()
+
+
+def test_304_without_the_blob_refetches_unconditionally(tmp_path) -> None:
+    seen: List[bool] = []
+
+    async def route(request: web.Request) -> web.Response:
+        seen.append("If-None-Match" in request.headers)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text="contract v1", headers={"ETag": '"v1"'})
+
+    async def test(url: str) -> List[str]:
+        cache = UrlCache(str(tmp_path), 1 << 20)
+        first = await http_fetch.fetch_text(url, cache=cache)
+        hit = await http_fetch.fetch_text(url, cache=cache)
+        for blob in cache.blobs.glob("*.txt"):
+            blob.unlink()
+        refetched = await http_fetch.fetch_text(url, cache=cache)
+        return [first.text, hit.text, hit.cache["status"], refetched.text]
+
+    assert asyncio.run(_serve(route, test)) == [
+        "contract v1",
+        "contract v1",
+        "hit",
+        "contract v1",
+    ]
+    assert seen == [False, True, True, False]
+
+
+def test_304_to_an_unconditional_get_is_an_error(tmp_path) -> None:
+    async def route(request: web.Request) -> web.Response:
+        return web.Response(status=304)
+
+    async def test(url: str) -> Any:
+        return await http_fetch.fetch_text(url, cache=UrlCache(str(tmp_path), 1 << 20))
+
+    with pytest.raises(ClientResponseError):
+        asyncio.run(_serve(route, test))
+
+
+def test_last_modified_revalidation_is_answered_from_disk(tmp_path) -> None:
+    stamp = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    async def route(request: web.Request) -> web.Response:
+        if request.headers.get("If-Modified-Since") == stamp:
+            return web.Response(status=304)
+        return web.Response(text="contract v1", headers={"Last-Modified": stamp})
+
+    async def test(url: str) -> Any:
+        cache = UrlCache(str(tmp_path), 1 << 20)
+        first = await http_fetch.fetch_text(url, cache=cache)
+        again = await http_fetch.fetch_text(url, cache=cache)
+        return first.cache, again.text, again.cache
+
+    first, text, again = asyncio.run(_serve(route, test))
+    assert first["status"] == "miss"
+    assert text == "contract v1"
+    assert again["status"] == "hit" and again["bytes_saved"] == len("contract v1")
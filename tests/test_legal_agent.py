@@ -0,0 +1,129 @@
+import random
+import string
+
+
+def _contract(seed: int, sections: int = 6) -> str:
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(500)]
+    return "\n\n".join(
+        f"ARTICLE {i} Terms\n\n" + " ".join(rng.choice(words) for _ in range(120))
+        for i in range(1, sections + 1)
+    )
+
+
+def test_identical_contract_is_answered_from_the_store(agent):
+    agent.docs["same-1"] = _contract(1)
+    first = agent.run("same-1")
+    assert first["path"] == "model"
+    agent.stored(first["summary_id"])
+    again = agent.run("same-1")
+    assert again["path"] == "summary_store"
+    assert again["summary_id"] == first["summary_id"]
+
+
+def test_focused_summary_is_not_served_as_a_full_one(agent):
+    agent.docs["focused-1"] = _contract(2)
+    focused = agent.run("focused-1", mode="focused")
+    assert focused["mode"] == "focused"
+    assert agent.stored(focused["summary_id"])["prompt_version"].endswith("+focused")
+    full = agent.run("focused-1")
+    assert full["path"] == "model" and full["mode"] in ("single", "chunked")
+
+
+def test_negated_dpa_mention_does_not_override_the_model(agent):
+    agent.docs["no-dpa"] = (
+        _contract(3) + "\n\nARTICLE 9 Data\n\nNo data processing agreement is "
+        "required, as the supplier does not process personal data."
+    )
+    agent.reply = '- summary\n```json\n{"dpa_present": false}\n```'
+    try:
+        res = agent.run("no-dpa")
+    finally:
+        agent.reply = "- summary\n```json\n{}\n```"
+    assert res["scan"]["prefilled"] == ["dpa_present"]
+    assert res["gdpr_json"]["dpa_present"] is False
+    stored = agent.stored(res["summary_id"])
+    assert stored["gdpr_json"]["dpa_present"] is False
+
+
+def test_scanned_dpa_fills_a_key_the_model_left_out(agent):
+    agent.docs["dpa-missing"] = (
+        _contract(4) + "\n\nARTICLE 9 Data\n\nThe parties signed a Data "
+        "Processing Agreement under Article 28."
+    )
+    res = agent.run("dpa-missing")
+    assert res["gdpr_json"]["dpa_present"] is True
+
+
+def test_near_copy_reuse_drops_the_other_contracts_parties(agent):
+    original = _contract(5, sections=12)
+    agent.docs["near-a"] = original
+    agent.reply = (
+        '- summary\n```json\n{"controller": ["Acme Ltd"], '
+        '"processors_or_subprocessors": ["Cloud Co"], "dpa_present": true}\n```'
+    )
+    try:
+        first = agent.run("near-a")
+    finally:
+        agent.reply = "- summary\n```json\n{}\n```"
+    agent.stored(first["summary_id"])
+
+    words = original.split(" ")
+    words[-3] = "changed"
+    agent.docs["near-b"] = " ".join(words)
+    res = agent.run("near-b", use_cache=True)
+    assert res["path"] == "near_duplicate"
+    assert res["reused_from"] == first["summary_id"]
+    assert res["summary_id"] is None
+    gdpr = res["gdpr_json"]
+    assert gdpr["controller"] is None and gdpr["processors_or_subprocessors"] is None
+    assert gdpr["dpa_present"] is True
+
+
+def test_run_stream_event_sequence(agent):
+    agent.docs["stream-1"] = _contract(6)
+    events = agent.stream("stream-1")
+    names = [name for name, _ in events]
+    assert names[:3] == ["fetched", "prior-context", "gdpr-scan"]
+    assert names[-3:] == ["gdpr_json", "stored", "done"]
+    assert set(names[3:-3]) == {"tokens"}
+    text = "".join(data["text"] for name, data in events if name == "tokens")
+    assert text == agent.reply
+    done = events[-1][1]
+    assert done["ok"] and done["summary_id"] == events[-2][1]["store"]["summary_id"]
+
+
+def test_run_stream_reports_a_model_timeout_as_an_error_event(agent):
+    agent.docs["stream-slow"] = _contract(7)
+    pipeline = agent.main.CFG.pipeline
+    timeout, pipeline.model_timeout = pipeline.model_timeout, 0.05
+    agent.delay = 0.5
+    try:
+        events = agent.stream("stream-slow")
+    finally:
+        pipeline.model_timeout, agent.delay = timeout, 0.0
+    name, data = events[-1]
+    assert name == "error" and data["status_code"] == 504
+    assert "model" in data["detail"]
+
+
+def test_revision_recomputes_only_the_changed_chunk(agent, monkeypatch):
+    pipeline = agent.main.CFG.pipeline
+    monkeypatch.setattr(pipeline, "chunk_tokens", 200)  # one chunk per article
+    monkeypatch.setattr(pipeline, "near_dup_delta", 0.0)  # not a near copy
+    monkeypatch.setattr(pipeline, "near_dup_reuse", 0.0)
+    original = _contract(8)
+    agent.docs["rev-1"] = original
+    first = agent.run("rev-1", mode="chunked")
+    assert first["chunks"] == {"total": 6, "reused": 0, "recomputed": 6}
+    agent.stored(first["summary_id"])
+
+    head, sep, tail = original.partition("ARTICLE 4 Terms\n\n")
+    agent.docs["rev-1"] = head + sep + "amended " + tail
+    del agent.prompts[:]
+    res = agent.run("rev-1", mode="chunked", use_cache=True)
+    assert res["path"] == "model"
+    assert res["chunks"] == {"total": 6, "reused": 5, "recomputed": 1}
+    parts = [p for p in agent.prompts if p.startswith("Contract part")]
+    assert len(parts) == 1 and "amended" in parts[0]
+    assert len(agent.prompts) == 2  # the changed chunk, then the reduce
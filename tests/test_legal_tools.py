@@ -0,0 +1,20 @@
+import asyncio
+
+from saop_core.mcp import legal_tool_defs as tools
+
+
+def test_concurrent_stores_get_distinct_ids() -> None:
+    async def run():
+        results = await asyncio.gather(
+            *(
+                tools.store_summary(f"id-collision-{i}", f"summary {i}")
+                for i in range(5)
+            )
+        )
+        stored = [await tools.SUMMARY_STORE.get_stored(id=r["id"]) for r in results]
+        return results, stored
+
+    results, stored = asyncio.run(run())
+    assert len({r["id"] for r in results}) == 5
+    assert [s["summary_md"] for s in stored] == [f"summary {i}" for i in range(5)]
+    assert all(isinstance(s["created_at"], int) for s in stored)
@@ -0,0 +1,39 @@
+import random
+import string
+
+import pytest
+
+from saop_core.mcp.lsh_index import LSHIndex, SignatureSizeMismatch
+from saop_core.minhash import signature
+
+
+def _text(seed: int, words: int = 600) -> str:
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=5)) for _ in range(400)]
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+def test_near_copy_is_found_and_filtered(tmp_path) -> None:
+    base = _text(1)
+    edited = base.replace(base.split()[10], "changed", 1)
+    index = LSHIndex(str(tmp_path))
+    index.add("s1", "c1", signature(base), [("ARTICLE 1", "fp")], prompt_version="v1")
+    index.add("s2", "c2", signature(_text(2)), prompt_version="v1")
+
+    hits = index.near(signature(edited), threshold=0.8)
+    assert [h["id"] for h in hits] == ["s1"] and hits[0]["similarity"] >= 0.8
+    assert hits[0]["sections"] == [["ARTICLE 1", "fp"]]
+    assert index.near(signature(edited), threshold=0.8, prompt_version="v2") == []
+
+    reloaded = LSHIndex(str(tmp_path))
+    assert [h["id"] for h in reloaded.near(signature(base))] == ["s1"]
+
+
+def test_restored_contract_supersedes_its_signature() -> None:
+    index = LSHIndex(None)
+    index.add("s1", "c1", signature(_text(3)))
+    index.add("s2", "c1", signature(_text(4)))
+    assert index.near(signature(_text(3))) == []
+    assert [h["id"] for h in index.near(signature(_text(4)))] == ["s2"]
+    with pytest.raises(SignatureSizeMismatch):
+        index.add("s3", "c3", [1, 2, 3])
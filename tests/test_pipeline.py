@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from saop_core.pipeline import Stages, StageTimeout, map_bounded
+
+
+async def _slow_source():
+    yield "first"
+    await asyncio.sleep(1)
+    yield "never"
+
+
+def test_stream_timeout_reaches_a_consumer_busy_between_items() -> None:
+    async def run():
+        stages = Stages()
+        got = []
+        with pytest.raises(StageTimeout):
+            async for item in stages.stream("model", _slow_source(), 0.05):
+                got.append(item)
+                await asyncio.sleep(0.2)  # e.g. sending the event to the client
+        return got, stages.timings
+
+    got, timings = asyncio.run(run())
+    assert got == ["first"] and "model" in timings
+
+
+def test_stream_passes_items_and_errors_through() -> None:
+    async def failing():
+        yield 1
+        raise ValueError("boom")
+
+    async def run():
+        seen = []
+        with pytest.raises(ValueError, match="boom"):
+            async for item in Stages().stream("s", failing()):
+                seen.append(item)
+        return seen
+
+    assert asyncio.run(run()) == [1]
+
+
+def test_map_bounded_reraises_the_failing_call() -> None:
+    async def fn(i):
+        if i == 2:
+            await asyncio.sleep(0.01)
+            raise KeyError(i)
+        return i * 10
+
+    async def run():
+        seen = []
+        with pytest.raises(KeyError):
+            async for i, res in map_bounded(fn, [0, 1, 2, 3], limit=2):
+                seen.append(res)
+                await asyncio.sleep(0.05)  # consumer busy when the call fails
+        return seen
+
+    assert asyncio.run(run())[0] in (0, 10)
+
+
+def test_map_bounded_limits_concurrency() -> None:
+    running, peak = 0, 0
+
+    async def fn(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.005)
+        running -= 1
+        return i
+
+    async def run():
+        return sorted([r async for _, r in map_bounded(fn, range(10), limit=3)])
+
+    assert asyncio.run(run()) == list(range(10)) and peak == 3
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from saop_core.agent_config import CallPolicyConfig
+from saop_core.llm.policy import CallPolicy, is_retryable
+
+
+def _policy(**kw) -> CallPolicy:
+    cfg = CallPolicyConfig(backoff_base=0.001, backoff_max=0.001, **kw)
+    return CallPolicy(cfg, name="test")
+
+
+def test_retries_retryable_errors_only():
+    assert is_retryable(httpx.ConnectError("down"))
+    assert not is_retryable(ValueError("bad request"))
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise httpx.ConnectError("down")
+        return "ok"
+
+    assert asyncio.run(_policy(max_attempts=3).run(flaky)) == "ok"
+    assert len(calls) == 3
+
+
+def test_hedge_loser_is_cancelled_and_reaped():
+    policy = _policy(
+        max_attempts=1, hedge_enabled=True, hedge_min_samples=1, hedge_max_ratio=1.0
+    )
+    policy.latency.observe(0.01)
+    started: list = []
+    cancelled: list = []
+
+    async def call():
+        i = len(started)
+        started.append(i)
+        try:
+            await asyncio.sleep(1.0 if i == 0 else 0.02)
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+        return i
+
+    async def run():
+        result = await policy.run(call)
+        # the loser was awaited inside run(): nothing is left pending
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return result, pending
+
+    assert asyncio.run(run()) == (1, [])
+    assert cancelled == [0]
+
+
+def test_non_retryable_error_fails_fast():
+    async def boom():
+        raise ValueError("no")
+
+    with pytest.raises(ValueError):
+        asyncio.run(_policy(max_attempts=1).run(boom))
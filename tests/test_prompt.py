@@ -0,0 +1,57 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import httpx
+
+from saop_core.llm.client import LLMClient
+from saop_core.llm.prompt import (
+    normalize,
+    prefix_fingerprint,
+    sorted_by_name,
+    stable_prefix,
+)
+
+
+class _Tool:
+    def __init__(self, name: str):
+        self.name = name
+
+
+def test_stable_prefix_is_byte_identical_across_whitespace_noise() -> None:
+    a = stable_prefix("You are a lawyer.\n", "", "Rules:\n- be brief  \n")
+    b = stable_prefix("You are a lawyer.\r\n\n", "Rules:\r\n- be brief\r\n")
+    assert a == b == "You are a lawyer.\n\nRules:\n- be brief"
+    assert normalize("x  \r\ny\r\n\n") == "x\ny"
+    assert prefix_fingerprint(a) == prefix_fingerprint(b)
+    assert len(prefix_fingerprint(a)) == 16
+    assert prefix_fingerprint(a + ".") != prefix_fingerprint(a)
+
+
+def test_tools_are_bound_in_name_order() -> None:
+    tools = [_Tool("search"), _Tool("db_query"), _Tool("fetch")]
+    assert [t.name for t in sorted_by_name(tools)] == ["db_query", "fetch", "search"]
+
+
+def test_system_prefix_goes_first_and_only_the_user_part_varies() -> None:
+    inputs: List[List[Dict[str, Any]]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs.append(json.loads(request.content)["input"])
+        return httpx.Response(200, json={"output": [{"content": [{"text": "ok"}]}]})
+
+    client = LLMClient(
+        "http://a/v1",
+        "",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    system = stable_prefix("You are a lawyer.", "Summarize the contract.")
+
+    async def run():
+        for contract in ("contract one", "contract two"):
+            await client.responses(system=system, user=contract, model="m")
+
+    asyncio.run(run())
+    assert [m["role"] for m in inputs[0]] == ["system", "user"]
+    assert inputs[0][0] == inputs[1][0] == {"role": "system", "content": system}
+    assert [i[1]["content"] for i in inputs] == ["contract one", "contract two"]
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from saop_core.agent_config import RateLimitConfig
+from saop_core.llm.ratelimit import ModelRateLimiter, rate_limit_info
+
+
+def _429() -> httpx.HTTPStatusError:
+    req = httpx.Request("POST", "http://llm/responses")
+    resp = httpx.Response(429, headers={"retry-after": "0"}, request=req)
+    return httpx.HTTPStatusError("429", request=req, response=resp)
+
+
+def test_rate_limit_info_reads_retry_after():
+    assert rate_limit_info(_429()) == (True, 0.0)
+    assert rate_limit_info(RuntimeError("boom")) == (False, None)
+
+
+def test_burst_of_429s_halves_limit_once():
+    limiter = ModelRateLimiter("m", RateLimitConfig(max_concurrency=16))
+
+    async def call():
+        async with limiter.slot():
+            await asyncio.sleep(0)
+            raise _429()
+
+    async def run():
+        results = await asyncio.gather(
+            *(call() for _ in range(8)), return_exceptions=True
+        )
+        assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+
+    asyncio.run(run())
+    assert limiter.limit == 8.0
+    assert limiter.in_flight == 0
+
+
+def test_other_failures_do_not_grow_the_limit():
+    limiter = ModelRateLimiter("m", RateLimitConfig(max_concurrency=16))
+    limiter.limit = 4.0
+
+    async def fail():
+        async with limiter.slot():
+            raise httpx.ReadTimeout("slow")
+
+    async def ok():
+        async with limiter.slot():
+            pass
+
+    for _ in range(4):
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(fail())
+    assert limiter.limit == 4.0
+    asyncio.run(ok())
+    assert limiter.limit == 4.25
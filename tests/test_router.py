@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from saop_core.agent_config import ModelEndpoint, RouterConfig
+from saop_core.llm.router import EndpointRouter
+
+
+def _router(*names: str, **cfg) -> EndpointRouter:
+    return EndpointRouter(
+        [ModelEndpoint(n, f"http://{n}/v1", "key") for n in names], RouterConfig(**cfg)
+    )
+
+
+def test_call_fails_over_and_ejects_the_failing_endpoint() -> None:
+    router = _router("a", "b", eject_after=1, cooldown_seconds=60)
+    down = router.endpoints[0]
+
+    async def fn(ep):
+        if ep is down:
+            raise httpx.ConnectError("refused")
+        return ep.name
+
+    for _ in range(5):
+        assert asyncio.run(router.call(fn)) == "b"
+    assert not down.healthy(time.monotonic())
+    assert router.pick() is router.endpoints[1]
+
+
+def test_request_errors_do_not_fail_over_or_count_against_the_endpoint() -> None:
+    router = _router("a", "b")
+    request = httpx.Request("POST", "http://a/v1")
+    calls = []
+
+    async def fn(ep):
+        calls.append(ep.name)
+        response = httpx.Response(400, request=request)
+        raise httpx.HTTPStatusError("bad request", request=request, response=response)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(router.call(fn))
+    assert len(calls) == 1
+    assert all(e.failures == 0 and e.in_flight == 0 for e in router.endpoints)
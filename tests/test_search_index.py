@@ -0,0 +1,23 @@
+from saop_core.mcp.search_index import BM25Index
+
+
+def test_restored_contract_replaces_its_previous_summary() -> None:
+    index = BM25Index()
+    index.add("s1", "c1", "indemnification cap for the supplier")
+    index.add("s2", "c2", "data retention and deletion duties")
+    index.add("s3", "c1", "termination for convenience")
+    assert len(index) == 2
+    assert index.search("indemnification") == []
+    assert [r["id"] for r in index.search("termination convenience")] == ["s3"]
+
+
+def test_index_survives_compaction_and_reload(tmp_path) -> None:
+    index = BM25Index(str(tmp_path), compact_every=2)
+    for i in range(5):
+        index.add(f"s{i}", f"c{i}", f"clause {i} governing law", title=f"MSA {i}")
+    index.add("s5", "c0", "arbitration in Geneva", parties=["Acme Ltd"])
+    reloaded = BM25Index(str(tmp_path), compact_every=2)
+    assert len(reloaded) == 5
+    assert [r["id"] for r in reloaded.search("acme arbitration")] == ["s5"]
+    hits = reloaded.search("governing law", k=10)
+    assert sorted(r["contract_id"] for r in hits) == ["c1", "c2", "c3", "c4"]
@@ -0,0 +1,36 @@
+import asyncio
+
+from saop_core.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call() -> None:
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        sf = SingleFlight("test")
+        results = await asyncio.gather(*(sf.do("k", work) for _ in range(5)))
+        return results, sf.in_flight()
+
+    results, in_flight = asyncio.run(run())
+    assert results == ["done"] * 5 and calls == [1] and in_flight == 0
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call() -> None:
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def run():
+        sf = SingleFlight("test")
+        first = asyncio.ensure_future(sf.do("k", work))
+        second = asyncio.ensure_future(sf.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == (42, True)
@@ -0,0 +1,49 @@
+import asyncio
+
+from saop_core.mcp.summary_log import SummaryLog
+from saop_core.mcp.summary_store import SummaryStore
+
+
+def test_records_are_found_by_every_key_after_reopen(tmp_path) -> None:
+    log = SummaryLog(str(tmp_path), batch_wait=0)
+    for i in range(20):
+        log.submit([f"id:s{i}", f"contract:c{i % 4}"], {"n": i}).result()
+    log.close()
+
+    log = SummaryLog(str(tmp_path), batch_wait=0)
+    try:
+        assert log.get("id:s3") == {"n": 3}
+        assert log.get("contract:c1") == {"n": 17}  # latest record wins
+        assert log.get("id:missing") is None
+    finally:
+        log.close()
+
+
+def test_compaction_keeps_live_records(tmp_path) -> None:
+    log = SummaryLog(str(tmp_path), segment_bytes=256, batch_wait=0)
+    try:
+        for i in range(40):
+            log.submit([f"contract:c{i % 3}"], {"n": i, "pad": "x" * 40}).result()
+        before = len(list((tmp_path / "segments").iterdir()))
+        log.compact()
+        after = len(list((tmp_path / "segments").iterdir()))
+        assert after < before
+        latest = [log.get(f"contract:c{k}") for k in range(3)]
+        assert [r["n"] if r else None for r in latest] == [39, 37, 38]
+    finally:
+        log.close()
+
+
+def test_store_aclose_flushes_the_log(tmp_path) -> None:
+    async def run():
+        store = SummaryStore(str(tmp_path))
+        await store.put_summary({"id": "s1", "contract_id": "c1", "summary_md": "x"})
+        await store.aclose()
+        reopened = SummaryStore(str(tmp_path))
+        try:
+            return await reopened.get_stored(contract_id="c1")
+        finally:
+            await reopened.aclose()
+
+    stored = asyncio.run(run())
+    assert stored is not None and stored["id"] == "s1"
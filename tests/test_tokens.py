@@ -0,0 +1,66 @@
+from saop_core.llm.tokens import (
+    Section,
+    estimate_tokens,
+    pack_prompt,
+    truncate_to_tokens,
+)
+
+
+def _words(n: int, prefix: str = "w") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_estimate_tokens() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a b c") == 4  # 3 * 1.33, rounded down, + 1
+    assert estimate_tokens("a, b.") == 5  # punctuation is one token each
+    assert estimate_tokens("x" * 40) == 11  # long words split every 4 chars
+
+
+def test_truncate_to_an_exact_token_count() -> None:
+    text = _words(500)
+    for budget in (10, 57, 100, 333):
+        cut = truncate_to_tokens(text, budget)
+        assert text.startswith(cut) and not cut.endswith(" ")
+        nxt = text[: text.find(" ", len(cut) + 1)]
+        assert estimate_tokens(cut) <= budget < estimate_tokens(nxt)
+    assert estimate_tokens(truncate_to_tokens(text, 100)) == 100
+    assert truncate_to_tokens(text, 0) == ""
+    assert truncate_to_tokens("short text", 10) == "short text"
+
+
+def test_truncate_slices_a_word_when_no_whitespace_fits() -> None:
+    cut = truncate_to_tokens("x" * 400, 20)
+    assert estimate_tokens(cut) == 20 and len(cut) == 79
+
+
+def test_pack_prompt_budget_boundary() -> None:
+    # window 1000 - 5% margin - 100 output - 2 * 8 message overhead = 834
+    fits = pack_prompt("", [Section("contract", "", _words(627))], 1000, 100)
+    assert fits.budget_tokens == 834 and not fits.truncated
+    assert fits.estimated_input_tokens == 16 + 834
+
+    over = pack_prompt("", [Section("contract", "", _words(628))], 1000, 100)
+    assert over.truncated == {"contract": len(" w627")}
+    assert over.user == _words(627)
+
+
+def test_pack_prompt_drops_low_share_sections_first() -> None:
+    prior = [_words(30, prefix=f"p{k}_") for k in range(5)]
+    plan = pack_prompt(
+        "",
+        [
+            Section("contract", "Contract:\n", _words(2000)),
+            Section("prior", "Prior:\n", "", share=0.1, items=prior),
+            Section("glossary", "Glossary:\n", "term", share=0.001),
+        ],
+        1000,
+        100,
+    )
+    # glossary's cap cannot hold its header; prior keeps whole items only
+    assert plan.truncated["glossary"] == len("term")
+    assert plan.truncated["prior"] == sum(len(p) for p in prior[1:])
+    assert "contract" in plan.truncated
+    contract, kept = plan.user.split("\n\n")
+    assert contract.startswith("Contract:\n") and kept == "Prior:\n" + prior[0]
+    assert plan.estimated_input_tokens <= 16 + plan.budget_tokens
@@ -0,0 +1,15 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from saop_core.transport import build_async_client, pool_stats, register_pool
+
+
+def test_registered_pool_is_scraped():
+    client = build_async_client()
+    register_pool("test-pool", client)
+    labels = {"pool": "test-pool", "state": "open"}
+    assert pool_stats(client) == {"open": 0, "idle": 0, "waiting": 0}
+    assert REGISTRY.get_sample_value("saop_http_pool_connections", labels) == 0
+    asyncio.run(client.aclose())
+    assert REGISTRY.get_sample_value("saop_http_pool_connections", labels) is None
@@ -0,0 +1,65 @@
+import hashlib
+
+from saop_core.mcp.url_cache import Entry, UrlCache
+
+
+def _put(cache: UrlCache, url: str, text: str, **validators: str) -> Entry:
+    data = text.encode("utf-8")
+    entry = Entry(
+        url=url,
+        sha256=hashlib.sha256(data).hexdigest(),
+        etag=validators.get("etag"),
+        last_modified=validators.get("last_modified"),
+        bytes=len(data),
+    )
+    tmp = cache.tmp_path()
+    tmp.write_bytes(data)
+    cache.commit(entry, tmp)
+    return entry
+
+
+def test_validators_are_stored_and_sent_back(tmp_path) -> None:
+    cache = UrlCache(str(tmp_path), 1 << 20)
+    _put(cache, "http://x/a", "text a", etag='"v1"')
+    _put(cache, "http://x/b", "text b", last_modified="Wed, 01 Jan 2025 00:00:00 GMT")
+    _put(cache, "http://x/c", "text c")
+
+    reopened = UrlCache(str(tmp_path), 1 << 20)  # the index survives restarts
+    a, b, c = (reopened.lookup(f"http://x/{k}") for k in "abc")
+    assert a is not None and b is not None and c is not None
+    assert UrlCache.conditional_headers(a) == {"If-None-Match": '"v1"'}
+    assert UrlCache.conditional_headers(b) == {
+        "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"
+    }
+    assert UrlCache.conditional_headers(c) == {}
+    assert reopened.read(a) == "text a" and reopened.total == 18
+
+
+def test_urls_serving_the_same_text_share_one_blob(tmp_path) -> None:
+    cache = UrlCache(str(tmp_path), 1 << 20)
+    _put(cache, "http://x/a", "same text", etag='"1"')
+    _put(cache, "http://x/b", "same text", etag='"2"')
+    assert len(list(cache.blobs.glob("*.txt"))) == 1
+    assert cache.total == len("same text")
+
+
+def test_a_vanished_blob_reads_as_none_and_drops_the_url(tmp_path) -> None:
+    cache = UrlCache(str(tmp_path), 1 << 20)
+    entry = _put(cache, "http://x/a", "text a", etag='"v1"')
+    cache.blob_path(entry.sha256).unlink()
+    assert cache.read(entry) is None
+    assert cache.lookup("http://x/a") is None and cache.total == 0
+
+
+def test_least_recently_used_blobs_are_evicted_past_max_bytes(tmp_path) -> None:
+    cache = UrlCache(str(tmp_path), max_bytes=25)
+    a = _put(cache, "http://x/a", "a" * 10, etag='"a"')
+    b = _put(cache, "http://x/b", "b" * 10, etag='"b"')
+    assert cache.read(a) == "a" * 10  # a is now the most recent
+    _put(cache, "http://x/c", "c" * 10, etag='"c"')
+
+    assert cache.lookup("http://x/b") is None
+    assert not cache.blob_path(b.sha256).exists()
+    assert cache.lookup("http://x/a") is not None
+    assert cache.total == 20
+    assert len(list(cache.urls.glob("*.json"))) == 2
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Optional
+
+import httpx
+from prometheus_client import REGISTRY
+
+from saop_core.agent_config import CacheConfig
+from saop_core.llm.cache import ResponseCache
+from saop_core.llm.client import LLMClient
+from saop_core.llm.usage import cached_tokens, record_usage, usage_tokens
+
+
+def _input_tokens(model: str, cache: str) -> float:
+    value: Optional[float] = REGISTRY.get_sample_value(
+        "agent_input_tokens_total", {"model": model, "cache": cache}
+    )
+    return value or 0.0
+
+
+def test_cached_tokens_from_every_usage_shape() -> None:
+    responses = {"input_tokens": 10, "input_tokens_details": {"cached_tokens": 6}}
+    chat = {"prompt_tokens": 10, "prompt_tokens_details": {"cached_tokens": 5}}
+    langchain = {"input_tokens": 10, "input_token_details": {"cache_read": 4}}
+    assert [cached_tokens(u) for u in (responses, chat, langchain)] == [6, 5, 4]
+    assert cached_tokens({"cached_tokens": 0, **responses}) == 0  # normalized
+    assert cached_tokens(None) == 0 and cached_tokens({"input_tokens": 3}) == 0
+
+
+def test_usage_tokens_prefers_the_reported_total() -> None:
+    assert usage_tokens({"input_tokens": 10, "output_tokens": 2}) == 12
+    assert usage_tokens({"prompt_tokens": 7, "completion_tokens": 1}) == 8
+    assert usage_tokens({"total_tokens": 30, "input_tokens": 10}) == 30
+
+
+def test_record_usage_splits_input_by_cache_status() -> None:
+    record_usage("m-split", {"input_tokens": 10, "cached_tokens": 25})
+    assert _input_tokens("m-split", "cached") == 10  # capped at the input
+    assert _input_tokens("m-split", "uncached") == 0
+    record_usage("m-split", {"prompt_tokens": 8, "prompt_tokens_details": {}})
+    assert _input_tokens("m-split", "uncached") == 8
+
+
+def test_client_counts_provider_cache_hits_but_not_local_ones() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        usage = {"input_tokens": 10, "input_tokens_details": {"cached_tokens": 6}}
+        return httpx.Response(
+            200, json={"output": [{"content": [{"text": "ok"}]}], "usage": usage}
+        )
+
+    client = LLMClient(
+        "http://a/v1",
+        "",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        cache=ResponseCache(CacheConfig(max_entries=8)),
+    )
+
+    async def run():
+        first = await client.responses(system="sys", user="u", model="m-client")
+        again = await client.responses(system="sys", user="u", model="m-client")
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert first["usage_metadata"]["cached_tokens"] == 6 and again["cached"]
+    assert _input_tokens("m-client", "cached") == 6
+    assert _input_tokens("m-client", "uncached") == 4
@@ -0,0 +1,28 @@
+from saop_core.mcp.embedding import HashingEmbedder
+from saop_core.mcp.vector_index import VectorIndex
+
+
+def _add(index: VectorIndex, doc_id: str, contract_id: str, summary: str) -> None:
+    index.add(
+        doc_id,
+        contract_id,
+        [
+            ("summary", "", summary),
+            ("chunk", "Article 7 Liability", "liability is capped at fees paid"),
+        ],
+    )
+
+
+def test_one_hit_per_contract_latest_summary_only(tmp_path) -> None:
+    index = VectorIndex(str(tmp_path), HashingEmbedder())
+    _add(index, "s1", "c1", "personal data transferred outside the EEA")
+    _add(index, "s2", "c2", "software licence with annual renewal")
+    _add(index, "s3", "c1", "international data transfers under SCCs")
+    hits = index.search("liability cap", k=5)
+    assert sorted(h["contract_id"] for h in hits) == ["c1", "c2"]
+    assert {h["id"] for h in hits} == {"s2", "s3"}
+    assert hits[0]["match"] == "chunk" and hits[0]["heading"] == "Article 7 Liability"
+
+    reloaded = VectorIndex(str(tmp_path), HashingEmbedder())
+    best = reloaded.search("data transfers", k=1)
+    assert [h["id"] for h in best] == ["s3"]
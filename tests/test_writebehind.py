@@ -0,0 +1,111 @@
+import asyncio
+
+from saop_core.agent_config import WriteBehindConfig
+from saop_core.mcp import legal_tool_defs as tools
+from saop_core.writebehind import WriteBehindQueue
+
+
+async def _until(cond, timeout=2.0):
+    for _ in range(int(timeout / 0.005)):
+        if cond():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("timed out")
+
+
+def _cfg(tmp_path, **kw) -> WriteBehindConfig:
+    return WriteBehindConfig(
+        journal_dir=str(tmp_path), backoff_base=0.001, backoff_max=0.001, **kw
+    )
+
+
+def test_failed_jobs_are_retried_with_the_same_id(tmp_path):
+    seen = []
+
+    async def handler(job_id, payload):
+        seen.append(job_id)
+        if len(seen) < 3:
+            raise RuntimeError("store down")
+
+    async def run():
+        q = WriteBehindQueue("t", handler, _cfg(tmp_path))
+        await q.start()
+        job_id = await q.submit({"x": 1})
+        await _until(lambda: len(seen) == 3 and not q.pending())
+        await q.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert seen == [job_id] * 3
+    assert not list(tmp_path.glob("*.json"))  # delivered: journal entry gone
+
+
+def test_jobs_past_max_attempts_are_buried(tmp_path):
+    async def handler(job_id, payload):
+        raise RuntimeError("store down")
+
+    async def run():
+        q = WriteBehindQueue("t", handler, _cfg(tmp_path, max_attempts=2))
+        await q.start()
+        job_id = await q.submit({"x": 1})
+        await _until(lambda: (tmp_path / "dead" / f"{job_id}.json").exists())
+        await q.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert (tmp_path / "dead" / f"{job_id}.json").exists()
+
+
+def test_replayed_job_is_not_stored_twice(tmp_path, monkeypatch):
+    """Stored, then crashed before the journal entry was removed."""
+    writes = []
+    put_summary = tools.SUMMARY_STORE.put_summary
+
+    async def counting_put(summary, *args):
+        writes.append(summary["id"])
+        await put_summary(summary, *args)
+
+    monkeypatch.setattr(tools.SUMMARY_STORE, "put_summary", counting_put)
+    results = []
+
+    async def deliver(job_id, args):
+        results.append(await tools.store_summary(**args, id=job_id))
+
+    args = {"contract_id": "replay-c1", "summary_md": "# Summary"}
+
+    async def run():
+        q = WriteBehindQueue("t", deliver, _cfg(tmp_path))
+        job_id = await q.submit(args)  # journaled; no worker running
+        await deliver(job_id, args)  # delivered, then the process dies
+        q = WriteBehindQueue("t", deliver, _cfg(tmp_path))
+        await q.start()  # replays the journal
+        await q.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert writes == [job_id]
+    assert [r["id"] for r in results] == [job_id, job_id]
+    assert results[1]["duplicate"] is True
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_overlapping_deliveries_store_once(monkeypatch):
+    writes = []
+    put_summary = tools.SUMMARY_STORE.put_summary
+
+    async def slow_put(summary, *args):
+        writes.append(summary["id"])
+        await asyncio.sleep(0.01)
+        await put_summary(summary, *args)
+
+    monkeypatch.setattr(tools.SUMMARY_STORE, "put_summary", slow_put)
+    args = {"contract_id": "overlap-c1", "summary_md": "# S", "id": "job-overlap"}
+
+    async def run():
+        return await asyncio.gather(
+            tools.store_summary(**args), tools.store_summary(**args)
+        )
+
+    first, second = asyncio.run(run())
+    assert writes == ["job-overlap"]
+    assert first == second and first["id"] == "job-overlap"